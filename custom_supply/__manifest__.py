@@ -27,6 +27,9 @@
         'mail',
         'web',
     ],
+    'external_dependencies': {
+        'python': ['numpy'],
+    },
     'data': [
         'data/ir_cron_data.xml',
         'data/activity_cron.xml',
@@ -36,9 +39,15 @@
         'data/branch_products_cron.xml',
         'security/custom_supply_groups.xml',
         'security/ir.model.access.csv',
+        'data/supply_window_occurrence_data.xml',
+        'data/forecast_cron.xml',
+        'data/supply_request_event_data.xml',
         'views/supply_branch_view.xml',
         'views/branch_supply_schedule_view.xml',
+        'views/supply_window_occurrence_views.xml',
         'views/branch_product_views.xml',
+        'views/branch_stock_move_views.xml',
+        'views/stock_count_views.xml',
         'views/supply_request_views.xml',
         'views/received_requests.xml',
         'views/supply_request_tracking_views.xml',
@@ -47,6 +56,10 @@
         'views/product_supply_view.xml',
         'views/branch_product_sync_settings_views.xml',
         'views/supply_branch_actions.xml',
+        'views/picking_wave_views.xml',
+        'views/route_plan_views.xml',
+        'views/branch_product_forecast_views.xml',
+        'views/forecast_backtest_views.xml',
         'views/menus.xml',
         'report/supply_vs_suggestion_report_views.xml',
         'report/high_manager_report_views.xml',
@@ -54,10 +67,12 @@
         'report/branch_product_supply_report_views.xml',
         'report/branch_supply_pivot_report_views.xml',
         'report/late_requests.xml',
+        'report/supply_stage_stat_views.xml',
         'report/supply_pivot_views.xml',
         'report/menu_reports.xml',
         'report/supply_request_report.xml',
         'report/supply_request_report_template.xml',
+        'report/picking_wave_report.xml',
     ],
     'assets': {
         'web.assets_backend': [
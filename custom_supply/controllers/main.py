@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from odoo import http
+from odoo.http import request
+
+
+class SupplyStockCountController(http.Controller):
+
+    @http.route('/custom_supply/stock_count', type='json', auth='user', methods=['POST'])
+    def stock_count(self, counts, request_id=None):
+        """🧮 جرد كامل للفرع في طلب JSON-RPC واحد.
+
+        ``counts``: قائمة [product_id, qty] أو {"product_id": .., "qty": ..}.
+        ``request_id`` اختياري: بدونه يُستخدم آخر طلب InBranch لفرع المستخدم أو يُنشأ طلب جديد.
+        الرد: الطلب، عدد الأسطر المحدّثة والمضافة، و [product_id, suggested_qty] لكل سطر معدود.
+        """
+        supply_request = request.env['custom_supply.supply_request']._get_stock_count_request(request_id)
+        return supply_request.apply_stock_count(counts)
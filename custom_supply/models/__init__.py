@@ -1,13 +1,22 @@
 # models/__init__.py
 from . import scheduled_sync_products
 from . import branch_supply_window
+from . import supply_window_occurrence
 from . import branch_product
+from . import branch_stock_move
+from . import branch_product_forecast
+from . import forecast_backtest
 from . import supply_branch
 from . import supply_request
 from . import supply_request_line
+from . import supply_request_event
+from . import stock_count
 from . import product_extension
 from . import supply_log
 from . import high_manager_report
 from . import branch_product_sync_settings
 from . import smart_engine
 from . import supply_days
+from . import supply_roles
+from . import picking_wave
+from . import route_plan
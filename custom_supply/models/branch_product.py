@@ -19,6 +19,14 @@ class BranchProduct(models.Model):
         ('unique_branch_product', 'unique(branch_id, product_id)', 'This product is already defined for this branch.')
     ]
 
+    def init(self):
+        # كتالوج الفرع النشط: فهرس جزئي تعتمد عليه domain منتجات أسطر الطلب
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS custom_supply_branch_product_active_catalogue_idx
+            ON custom_supply_branch_product (branch_id, product_id)
+            WHERE activate
+        """)
+
     # ==============================
     # COMPUTE FIELDS
     # ==============================
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+import numpy as np
+
+from odoo import models, fields, api
+
+from .forecast_models import METHOD_CODES, METHOD_NONE, fit_forecasts
+
+_logger = logging.getLogger(__name__)
+
+# عدد دورات التوريد الأخيرة لكل فرع التي تدخل في التنبؤ
+HISTORY_CYCLES = 52
+# حالات الطلب التي اعتمد فيها مدير التوريد الكميات
+PROCESSED_STATUSES = ('InWarehouse', 'OnRoad', 'Done')
+
+
+class BranchProductForecast(models.Model):
+    """تنبؤ الطلب لكل منتج فرع، يُحسب ليلاً لكل الكتالوج دفعة واحدة.
+
+    السلسلة هي supply_qty المعتمدة في كل طلب للفرع (صفر إن لم يكن المنتج في الطلب)،
+    لذلك الوحدة هي "دورة توريد" وليست يوماً.
+    """
+    _name = "custom_supply.branch_product_forecast"
+    _description = "Branch Product Demand Forecast"
+    _order = "branch_id, product_id"
+    _rec_name = "branch_product_id"
+    _log_access = False
+
+    branch_product_id = fields.Many2one('custom_supply.branch_product', string="Branch Product",
+                                        required=True, ondelete='cascade', readonly=True)
+    branch_id = fields.Many2one('custom_supply.branch', string="Branch", readonly=True, index=True)
+    product_id = fields.Many2one('product.product', string="Product", readonly=True)
+    method = fields.Selection([
+        ('none', 'No Demand'),
+        ('naive', 'Average (short history)'),
+        ('ses', 'Simple Exponential Smoothing'),
+        ('holt', 'Holt (trend)'),
+        ('croston', 'Croston (intermittent)'),
+    ], string="Model", readonly=True)
+    history_count = fields.Integer(string="Cycles", readonly=True)
+    forecast_qty = fields.Float(string="Forecast per Cycle", digits=(16, 2), readonly=True)
+    sigma = fields.Float(string="Forecast Error (σ)", digits=(16, 2), readonly=True)
+    safety_stock = fields.Float(string="Safety Stock", digits=(16, 2), readonly=True)
+    min_qty = fields.Float(string="Forecast Min", digits=(16, 2), readonly=True)
+    max_qty = fields.Float(string="Forecast Max", digits=(16, 2), readonly=True)
+    computed_at = fields.Datetime(string="Computed On", readonly=True)
+
+    _sql_constraints = [
+        ('branch_product_uniq', 'unique(branch_product_id)', 'Only one forecast per branch product.'),
+    ]
+
+    # ============================
+    # History
+    # ============================
+    @api.model
+    def _load_history(self, cycles=HISTORY_CYCLES):
+        """📥 تاريخ كل منتجات الفروع النشطة كمصفوفات (bp_ids, Y, mask).
+
+        العمود الأخير هو أحدث طلب للفرع؛ الفروع ذات الطلبات الأقل مبطّنة من اليسار.
+        """
+        self.env['custom_supply.supply_request'].flush_model(['branch_id', 'request_date', 'status'])
+        self.env['custom_supply.supply_request_line'].flush_model(['request_id', 'product_id', 'supply_qty'])
+        cr = self.env.cr
+
+        cr.execute("""
+            SELECT bp.id, LEAST(COUNT(r.id), %s)
+            FROM custom_supply_branch_product bp
+            LEFT JOIN custom_supply_supply_request r
+                   ON r.branch_id = bp.branch_id AND r.status IN %s
+            WHERE bp.activate
+            GROUP BY bp.id
+            ORDER BY bp.id
+        """, (cycles, PROCESSED_STATUSES))
+        rows = cr.fetchall()
+        bp_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        lengths = np.array([r[1] for r in rows], dtype=np.int64)
+
+        # الكميات غير الصفرية فقط: (منتج الفرع، ترتيب الطلب من الأحدث، الكمية)
+        cr.execute("""
+            WITH req AS (
+                SELECT id, branch_id,
+                       ROW_NUMBER() OVER (PARTITION BY branch_id ORDER BY request_date DESC, id DESC) AS rn
+                FROM custom_supply_supply_request
+                WHERE status IN %s
+            )
+            SELECT bp.id, req.rn, SUM(l.supply_qty)
+            FROM req
+            JOIN custom_supply_supply_request_line l ON l.request_id = req.id
+            JOIN custom_supply_branch_product bp
+              ON bp.branch_id = req.branch_id AND bp.product_id = l.product_id AND bp.activate
+            WHERE req.rn <= %s AND l.supply_qty > 0
+            GROUP BY bp.id, req.rn
+        """, (PROCESSED_STATUSES, cycles))
+        obs = np.array(cr.fetchall(), dtype=float).reshape(-1, 3)
+
+        N = len(bp_ids)
+        Y = np.zeros((N, cycles))
+        mask = np.arange(cycles)[None, :] >= (cycles - lengths)[:, None]
+        if len(obs):
+            rows_idx = np.searchsorted(bp_ids, obs[:, 0].astype(np.int64))
+            cols_idx = cycles - obs[:, 1].astype(np.int64)
+            Y[rows_idx, cols_idx] = obs[:, 2]
+        return bp_ids, Y, mask
+
+    # ============================
+    # Nightly Job
+    # ============================
+    @api.model
+    def cron_compute_forecasts(self):
+        """🌙 تنبؤ ليلي لكل منتجات الفروع النشطة وكتابته في الجدول باستعلام upsert واحد."""
+        started = time.monotonic()
+        bp_ids, Y, mask = self._load_history()
+        if not len(bp_ids):
+            return True
+        result = fit_forecasts(Y, mask)
+        methods = [METHOD_CODES[m] for m in result['method'].tolist()]
+
+        self.flush_model()
+        cr = self.env.cr
+        cr.execute("""
+            INSERT INTO custom_supply_branch_product_forecast (
+                branch_product_id, branch_id, product_id, method, history_count,
+                forecast_qty, sigma, safety_stock, min_qty, max_qty, computed_at
+            )
+            SELECT bp.id, bp.branch_id, bp.product_id, f.method, f.history_count,
+                   f.forecast_qty, f.sigma, f.safety_stock, f.min_qty, f.max_qty, now() AT TIME ZONE 'UTC'
+            FROM unnest(%s::int[], %s::varchar[], %s::int[], %s::float8[], %s::float8[],
+                        %s::float8[], %s::float8[], %s::float8[])
+                 AS f(bp_id, method, history_count, forecast_qty, sigma, safety_stock, min_qty, max_qty)
+            JOIN custom_supply_branch_product bp ON bp.id = f.bp_id
+            ON CONFLICT (branch_product_id) DO UPDATE SET
+                method = EXCLUDED.method,
+                history_count = EXCLUDED.history_count,
+                forecast_qty = EXCLUDED.forecast_qty,
+                sigma = EXCLUDED.sigma,
+                safety_stock = EXCLUDED.safety_stock,
+                min_qty = EXCLUDED.min_qty,
+                max_qty = EXCLUDED.max_qty,
+                computed_at = EXCLUDED.computed_at
+        """, (
+            bp_ids.tolist(), methods, result['history'].tolist(),
+            result['forecast'].tolist(), result['sigma'].tolist(), result['safety_stock'].tolist(),
+            result['min_qty'].tolist(), result['max_qty'].tolist(),
+        ))
+        # منتجات عُطّلت في الفرع لم تعد تُحسب
+        cr.execute("""
+            DELETE FROM custom_supply_branch_product_forecast f
+            USING custom_supply_branch_product bp
+            WHERE bp.id = f.branch_product_id AND NOT bp.activate
+        """)
+        self.invalidate_model()
+        _logger.info("Demand forecast: %s series in %.2fs (%s without demand)",
+                     len(bp_ids), time.monotonic() - started, int((result['method'] == METHOD_NONE).sum()))
+        return True
+
+    # ============================
+    # Lookups
+    # ============================
+    @api.model
+    def _get_max_qty_map(self, branch_product_ids):
+        """{branch_product_id: max_qty} للمنتجات التي لها طلب متوقع."""
+        if not branch_product_ids:
+            return {}
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT branch_product_id, max_qty
+            FROM custom_supply_branch_product_forecast
+            WHERE branch_product_id = ANY(%s) AND method != 'none'
+        """, (list(branch_product_ids),))
+        return dict(self.env.cr.fetchall())
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+# تحديث الرصيد الجاري لكل منتج فرع من حركات {moves} المضافة (balance لآخر حركة)،
+# مع requested_quantity بنفس معادلة _compute_requested_quantity لأن التحديث يتجاوز الـ ORM
+_APPLY_BALANCE_SQL = """
+    WITH {moves},
+    last AS (
+        SELECT DISTINCT ON (branch_product_id) branch_product_id, balance
+        FROM moves
+        ORDER BY branch_product_id, id DESC
+    )
+    UPDATE custom_supply_branch_product bp
+       SET current_quantity = last.balance,
+           requested_quantity = GREATEST(0, COALESCE(bp.max_quantity, 0) - last.balance),
+           stock_date = %(now)s
+      FROM last
+     WHERE bp.id = last.branch_product_id
+"""
+
+
+class BranchStockMove(models.Model):
+    """دفتر مخزون الفرع (إضافة فقط).
+
+    - receipt: الكمية المستلمة لكل سطر عند انتقال الطلب إلى Done.
+    - count: جرد دوري؛ الحركة = الفرق بين المعدود والرصيد، والرصيد يصبح المعدود.
+
+    current_quantity في منتج الفرع هو الرصيد الجاري (balance لآخر حركة)، ويُحدَّث
+    مع كل إضافة بنفس الاستعلام بدل إعادة جمع الدفتر.
+    """
+    _name = "custom_supply.branch_stock_move"
+    _description = "Branch Stock Ledger Move"
+    _order = "date desc, id desc"
+    _rec_name = "product_id"
+    _log_access = False
+
+    branch_product_id = fields.Many2one('custom_supply.branch_product', string="Branch Product", required=True,
+                                        ondelete='cascade', readonly=True)
+    branch_id = fields.Many2one('custom_supply.branch', string="Branch", readonly=True, index=True)
+    product_id = fields.Many2one('product.product', string="Product", readonly=True)
+    move_type = fields.Selection([
+        ('receipt', 'Receipt'),
+        ('count', 'Count Adjustment'),
+    ], string="Type", required=True, readonly=True)
+    quantity = fields.Float(string="Quantity", readonly=True, help="Signed change applied to the branch stock")
+    balance = fields.Float(string="Balance", readonly=True, help="Branch stock after this move")
+    date = fields.Datetime(string="Date", required=True, readonly=True)
+    request_id = fields.Many2one('custom_supply.supply_request', string="Request", ondelete='set null',
+                                 readonly=True, index=True)
+    request_line_id = fields.Many2one('custom_supply.supply_request_line', string="Request Line",
+                                      ondelete='set null', readonly=True)
+    user_id = fields.Many2one('res.users', string="User", readonly=True)
+
+    _sql_constraints = [
+        ('unique_line_move', 'unique(request_line_id, move_type)',
+         'A request line can only be posted once per move type.'),
+    ]
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS custom_supply_branch_stock_move_bp_idx
+            ON custom_supply_branch_stock_move (branch_product_id, id)
+        """)
+        # مرة واحدة عند التثبيت/الترقية: الطلبات التي في الطريق قبل الدفتر لم يُملأ لها received_qty
+        params = self.env['ir.config_parameter'].sudo()
+        if not params.get_param('custom_supply.received_qty_prefilled'):
+            self.env.cr.execute("""
+                UPDATE custom_supply_supply_request_line l
+                   SET received_qty = COALESCE(l.export_qty, l.supply_qty, 0)
+                  FROM custom_supply_supply_request r
+                 WHERE r.id = l.request_id AND r.status = 'OnRoad' AND COALESCE(l.received_qty, 0) = 0
+            """)
+            params.set_param('custom_supply.received_qty_prefilled', '1')
+
+    def write(self, vals):
+        raise UserError("Branch stock moves are append-only.")
+
+    def unlink(self):
+        raise UserError("Branch stock moves are append-only.")
+
+    def _flush_sources(self):
+        self.env['custom_supply.branch_product'].flush_model(['current_quantity', 'max_quantity', 'stock_date'])
+        self.env['custom_supply.supply_request_line'].flush_model(
+            ['request_id', 'branch_product_id', 'current_qty', 'supply_qty', 'export_qty', 'received_qty'])
+
+    def _invalidate_balances(self):
+        self.env['custom_supply.branch_product'].invalidate_model(
+            ['current_quantity', 'requested_quantity', 'stock_date'])
+        self.invalidate_model()
+
+    # ============================
+    # Receipts
+    # ============================
+    @api.model
+    def _post_receipts(self, requests):
+        """📥 حركة استلام لكل سطر في ``requests`` وتحديث الأرصدة، باستعلام واحد.
+
+        الكمية: received_qty كما هي (0 = لم يصل شيء)؛ تُملأ مسبقاً من export_qty عند التصدير.
+        الأسطر المرحّلة سابقاً تُتجاهل، فإعادة الاستدعاء آمنة.
+        """
+        if not requests:
+            return
+        self._flush_sources()
+        self.env.cr.execute(_APPLY_BALANCE_SQL.format(moves="""
+            src AS (
+                SELECT l.id AS line_id, l.request_id, l.branch_product_id,
+                       COALESCE(l.received_qty, 0) AS qty
+                FROM custom_supply_supply_request_line l
+                WHERE l.request_id = ANY(%(ids)s) AND l.branch_product_id IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM custom_supply_branch_stock_move m
+                                   WHERE m.request_line_id = l.id AND m.move_type = 'receipt')
+            ),
+            moves AS (
+                INSERT INTO custom_supply_branch_stock_move
+                    (branch_product_id, branch_id, product_id, move_type, quantity, balance,
+                     date, request_id, request_line_id, user_id)
+                SELECT bp.id, bp.branch_id, bp.product_id, 'receipt', s.qty,
+                       COALESCE(bp.current_quantity, 0)
+                           + SUM(s.qty) OVER (PARTITION BY bp.id ORDER BY s.line_id),
+                       %(now)s, s.request_id, s.line_id, %(uid)s
+                FROM src s
+                JOIN custom_supply_branch_product bp ON bp.id = s.branch_product_id
+                WHERE s.qty > 0
+                ORDER BY bp.id, s.line_id
+                RETURNING id, branch_product_id, balance
+            )
+        """), {
+            'ids': requests.ids,
+            'now': fields.Datetime.now(),
+            'uid': self.env.uid,
+        })
+        self._invalidate_balances()
+
+    @api.model
+    def _prefill_received(self, requests):
+        """received_qty = الكمية المصدّرة لكل أسطر ``requests`` بتحديث واحد، والفرع يعدّلها عند الاستلام.
+
+        received_qty افتراضيه 0، فلا يمكن التمييز بين "لم يُدخل" و"لم يصل شيء" عند Done.
+        """
+        if not requests:
+            return
+        Line = self.env['custom_supply.supply_request_line']
+        Line.flush_model(['request_id', 'export_qty', 'supply_qty'])
+        self.env.cr.execute("""
+            UPDATE custom_supply_supply_request_line
+               SET received_qty = COALESCE(export_qty, supply_qty, 0)
+             WHERE request_id = ANY(%s)
+        """, (requests.ids,))
+        Line.invalidate_model(['received_qty'])
+
+    # ============================
+    # Count reconciliation
+    # ============================
+    @api.model
+    def _post_counts(self, counts):
+        """🧮 جرد: ``counts`` قائمة (branch_product_id, counted_qty[, request_line_id]).
+
+        حركة count بالفرق (المعدود − الرصيد) والرصيد يصبح المعدود، باستعلام واحد.
+        الكميات السالبة (غير معدودة) تُتجاهل؛ عند تكرار منتج الفرع يُعتمد آخر عدّ.
+        """
+        counts = [c for c in counts if c[0] and c[1] is not None and c[1] >= 0]
+        if not counts:
+            return
+        self._flush_sources()
+        self.env.cr.execute(_APPLY_BALANCE_SQL.format(moves="""
+            src AS (
+                SELECT DISTINCT ON (c.branch_product_id) c.branch_product_id, c.counted, c.line_id
+                FROM unnest(%(bp_ids)s::int[], %(counted)s::float8[], %(line_ids)s::int[])
+                     WITH ORDINALITY AS c(branch_product_id, counted, line_id, n)
+                ORDER BY c.branch_product_id, c.n DESC
+            ),
+            moves AS (
+                INSERT INTO custom_supply_branch_stock_move
+                    (branch_product_id, branch_id, product_id, move_type, quantity, balance,
+                     date, request_id, request_line_id, user_id)
+                SELECT bp.id, bp.branch_id, bp.product_id, 'count',
+                       s.counted - COALESCE(bp.current_quantity, 0), s.counted,
+                       %(now)s, l.request_id, s.line_id, %(uid)s
+                FROM src s
+                JOIN custom_supply_branch_product bp ON bp.id = s.branch_product_id
+                LEFT JOIN custom_supply_supply_request_line l ON l.id = s.line_id
+                ON CONFLICT (request_line_id, move_type) DO NOTHING
+                RETURNING id, branch_product_id, balance
+            )
+        """), {
+            'bp_ids': [c[0] for c in counts],
+            'counted': [float(c[1]) for c in counts],
+            'line_ids': [c[2] if len(c) > 2 and c[2] else None for c in counts],
+            'now': fields.Datetime.now(),
+            'uid': self.env.uid,
+        })
+        self._invalidate_balances()
+
+    @api.model
+    def _post_line_counts(self, lines):
+        """الكميات الحالية التي أرسلها الفرع في ``lines`` (غير البدائية) تُعتبر جرداً."""
+        self._post_counts([
+            (line.branch_product_id.id, line.current_qty, line.id)
+            for line in lines
+            if line.branch_product_id and line.current_qty >= 0
+        ])
+
+
+class BranchProduct(models.Model):
+    _inherit = "custom_supply.branch_product"
+
+    stock_date = fields.Datetime(string="Stock Updated On", readonly=True,
+                                 help="Date of the last ledger move (receipt or count) for this product")
+    stock_move_ids = fields.One2many('custom_supply.branch_stock_move', 'branch_product_id', string="Stock Moves")
+
+    def _stock_for_request(self):
+        """الكمية الحالية المقترحة لسطر جديد: الرصيد إن كان معروفاً، وإلا القيمة البدائية."""
+        self.ensure_one()
+        if self.stock_date or self.current_quantity:
+            return self.current_quantity
+        return self.env['custom_supply.supply_request_line'].PRIMITIVE_CURRENT_QTY
+
+    def action_view_stock_moves(self):
+        action = self.env['ir.actions.act_window']._for_xml_id('custom_supply.action_branch_stock_moves')
+        action['domain'] = [('branch_product_id', 'in', self.ids)]
+        action['context'] = {}
+        return action
+
+
+class SupplyRequest(models.Model):
+    _inherit = "custom_supply.supply_request"
+
+    def write(self, vals):
+        status = vals.get('status')
+        if status not in ('Supply', 'OnRoad', 'Done'):
+            return super().write(vals)
+        moving = self.filtered(lambda r: r.status != status)
+        res = super().write(vals)
+        Ledger = self.env['custom_supply.branch_stock_move'].sudo()
+        if status == 'Supply':
+            # الكميات الحالية المرسلة من الفرع = جرد
+            Ledger._post_line_counts(moving.line_ids)
+        elif status == 'OnRoad':
+            Ledger._prefill_received(moving)
+        else:
+            Ledger._post_receipts(moving)
+        return res
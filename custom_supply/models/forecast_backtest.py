@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from collections import deque
+
+import numpy as np
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+from .branch_product_forecast import HISTORY_CYCLES, PROCESSED_STATUSES
+from .forecast_models import forecast_variant
+
+_logger = logging.getLogger(__name__)
+
+SMART_ENGINE_VARIANT = 'smart_engine'
+VARIANT_SELECTION = [
+    (SMART_ENGINE_VARIANT, 'SmartEngine (compute_ideal_and_suggestion)'),
+    ('auto', 'Auto (nightly forecast)'),
+    ('ses', 'Simple Exponential Smoothing'),
+    ('holt', 'Holt'),
+    ('croston', 'Croston'),
+]
+# نفس معاملات استدعاء SmartEngine من أسطر الطلب
+SMART_ENGINE_LAST_N = 10
+SMART_ENGINE_MIN_HISTORY = 5
+SYNTHETIC_PATTERNS = ('stable', 'trend', 'intermittent')
+
+
+def make_synthetic_history(series=300, cycles=HISTORY_CYCLES, seed=0):
+    """📦 تاريخ اصطناعي بنفس شكل _load_history (لتشغيل الاختبار بدون بيانات إنتاج).
+
+    ثلث السلاسل مستقر، وثلث باتجاه صاعد، وثلث متقطع.
+    """
+    rng = np.random.default_rng(seed)
+    pattern = np.arange(series) % len(SYNTHETIC_PATTERNS)
+    base = rng.uniform(5.0, 50.0, series)
+    t = np.arange(cycles)
+    noise = rng.normal(0.0, 1.0, (series, cycles))
+    Y = np.select(
+        [pattern[:, None] == 0, pattern[:, None] == 1],
+        [base[:, None] + 0.1 * base[:, None] * noise,
+         base[:, None] * (1.0 + 0.02 * t) + 0.1 * base[:, None] * noise],
+        (rng.random((series, cycles)) < 0.3) * base[:, None] * (1.0 + 0.2 * noise),
+    )
+    Y = np.round(np.maximum(Y, 0.0))
+    lengths = rng.integers(cycles // 2, cycles + 1, series)
+    mask = t[None, :] >= (cycles - lengths)[:, None]
+    rows, cols = np.nonzero(mask)
+    return {
+        'Y': np.where(mask, Y, 0.0),
+        'mask': mask,
+        'line_row': rows,
+        'line_col': cols,
+        'line_supply': Y[rows, cols],
+        'line_current': np.round(rng.uniform(0.0, 0.5, len(rows)) * base[rows]),
+        'line_training': np.zeros(len(rows)),
+        'row_max_qty': np.zeros(series),
+        'row_group': pattern,
+        'groups': [(False, False, SYNTHETIC_PATTERNS[p]) for p in range(len(SYNTHETIC_PATTERNS))],
+    }
+
+
+def group_metrics(group_idx, group_count, predicted, actual):
+    """(count, MAE, MAPE %, bias) لكل مجموعة بـ bincount.
+
+    MAPE على الأسطر ذات الكمية الفعلية الموجبة فقط.
+    """
+    err = predicted - actual
+    count = np.bincount(group_idx, minlength=group_count)
+    safe = np.maximum(count, 1)
+    mae = np.bincount(group_idx, np.abs(err), group_count) / safe
+    bias = np.bincount(group_idx, err, group_count) / safe
+    positive = actual > 0
+    ape = np.where(positive, np.abs(err) / np.where(positive, actual, 1.0), 0.0)
+    pos_count = np.bincount(group_idx, positive.astype(float), group_count)
+    mape = 100.0 * np.bincount(group_idx, ape, group_count) / np.maximum(pos_count, 1)
+    return count, mae, mape, bias
+
+
+class ForecastBacktest(models.Model):
+    """📊 إعادة تشغيل التاريخ بأصول متدحرجة (rolling origin) لمقارنة محركات الاقتراح.
+
+    لكل دورة من آخر ``origin_count`` دورات يتنبأ كل نموذج بـ supply_qty من التاريخ السابق فقط،
+    ثم تُحسب MAE و MAPE و bias لكل فرع/فئة، وسرعة كل نموذج (اقتراح/ثانية).
+    """
+    _name = "custom_supply.forecast_backtest"
+    _description = "Forecast Backtest Run"
+    _order = "id desc"
+
+    name = fields.Char(string="Run", required=True, default=lambda self: fields.Datetime.now().strftime('Backtest %Y-%m-%d %H:%M'))
+    mode = fields.Selection([
+        ('history', 'Supply History'),
+        ('synthetic', 'Synthetic Data'),
+    ], string="Data", required=True, default='history')
+    origin_count = fields.Integer(string="Rolling Origins", default=12, help="Number of most recent cycles replayed.")
+    synthetic_series = fields.Integer(string="Synthetic Series", default=300)
+    seed = fields.Integer(string="Random Seed", default=0)
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], string="Status", default='draft', readonly=True)
+    point_count = fields.Integer(string="Evaluated Lines", readonly=True)
+    duration = fields.Float(string="Duration (s)", digits=(16, 2), readonly=True)
+    variant_ids = fields.One2many('custom_supply.forecast_backtest_variant', 'run_id', string="Variants", readonly=True)
+    result_ids = fields.One2many('custom_supply.forecast_backtest_result', 'run_id', string="Results", readonly=True)
+
+    # ============================
+    # Data
+    # ============================
+    @api.model
+    def _load_history_data(self, cycles=HISTORY_CYCLES):
+        """تاريخ الإنتاج: السلاسل من جدول التنبؤ + أسطر الطلب الفعلية كنقاط تقييم."""
+        bp_ids, Y, mask = self.env['custom_supply.branch_product_forecast']._load_history(cycles)
+        cr = self.env.cr
+        cr.execute("""
+            WITH req AS (
+                SELECT id, branch_id,
+                       ROW_NUMBER() OVER (PARTITION BY branch_id ORDER BY request_date DESC, id DESC) AS rn
+                FROM custom_supply_supply_request
+                WHERE status IN %s
+            )
+            SELECT bp.id, req.rn, COALESCE(l.supply_qty, 0), COALESCE(l.current_qty, 0),
+                   COALESCE(l.suggested_qty_training, 0)
+            FROM req
+            JOIN custom_supply_supply_request_line l ON l.request_id = req.id
+            JOIN custom_supply_branch_product bp
+              ON bp.branch_id = req.branch_id AND bp.product_id = l.product_id AND bp.activate
+            WHERE req.rn <= %s
+            ORDER BY bp.id, req.rn DESC
+        """, (PROCESSED_STATUSES, cycles))
+        lines = np.array(cr.fetchall(), dtype=float).reshape(-1, 5)
+
+        cr.execute("""
+            SELECT id, branch_id, category_id, max_quantity
+            FROM custom_supply_branch_product
+            WHERE id = ANY(%s)
+        """, (bp_ids.tolist(),))
+        info = {r[0]: r[1:] for r in cr.fetchall()}
+        keys = [(info[bp][0], info[bp][1] or False, False) for bp in bp_ids.tolist()]
+        groups = sorted(set(keys), key=lambda k: (k[0], k[1] or 0))
+        group_index = {k: i for i, k in enumerate(groups)}
+
+        return {
+            'Y': Y,
+            'mask': mask,
+            'line_row': np.searchsorted(bp_ids, lines[:, 0].astype(np.int64)),
+            'line_col': cycles - lines[:, 1].astype(np.int64),
+            'line_supply': lines[:, 2],
+            'line_current': lines[:, 3],
+            'line_training': lines[:, 4],
+            'row_max_qty': np.array([info[bp][2] or 0.0 for bp in bp_ids.tolist()]),
+            'row_group': np.array([group_index[k] for k in keys], dtype=np.int64),
+            'groups': groups,
+        }
+
+    # ============================
+    # Replay
+    # ============================
+    @api.model
+    def _replay_numpy(self, variant, data, origins):
+        """تنبؤ كل السلاسل عند كل أصل بتاريخ ما قبله فقط؛ يعيد تنبؤات نقاط التقييم."""
+        Y, mask = data['Y'], data['mask']
+        cols = data['line_col']
+        predicted = np.zeros(len(cols))
+        for origin in origins:
+            at = cols == origin
+            if not at.any():
+                continue
+            forecast = forecast_variant(variant, Y[:, :origin], mask[:, :origin])
+            predicted[at] = forecast[data['line_row'][at]]
+        return predicted
+
+    @api.model
+    def _replay_smart_engine(self, data, first_origin):
+        """SmartEngine على نفس النقاط: آخر 10 أسطر سابقة بكمية توريد موجبة لكل منتج فرع."""
+        engine = self.env['custom_supply.smart_engine']
+        rows, cols = data['line_row'], data['line_col']
+        supply, current, training = data['line_supply'], data['line_current'], data['line_training']
+        max_qty = data['row_max_qty']
+        predicted = np.zeros(len(rows))
+        history = {}
+        # الأقدم أولاً داخل كل سلسلة
+        for i in np.lexsort((cols, rows)).tolist():
+            row = int(rows[i])
+            past = history.setdefault(row, deque(maxlen=SMART_ENGINE_LAST_N))
+            if cols[i] >= first_origin:
+                values = [v for v, _t in past]
+                suggestions = [t for _v, t in past]
+                predicted[i] = engine._suggest_from_values(
+                    values, suggestions, max(float(current[i]), 0.0), float(max_qty[row]),
+                    min_history=SMART_ENGINE_MIN_HISTORY,
+                )['suggested_qty']
+            if supply[i] > 0:
+                past.append((float(supply[i]) + max(float(current[i]), 0.0), float(training[i])))
+        return predicted
+
+    def _evaluate(self, data):
+        """تشغيل كل النماذج على البيانات؛ يعيد (نقاط، ملخص النماذج، نتائج المجموعات) كقيم جاهزة للإنشاء."""
+        self.ensure_one()
+        cycles = data['Y'].shape[1]
+        origin_count = max(1, min(self.origin_count, cycles - 1))
+        origins = list(range(cycles - origin_count, cycles))
+        points = data['line_col'] >= origins[0]
+        # معدل الاقتراحات لكل النماذج = نقاط التقييم نفسها / الزمن، حتى تكون الأرقام قابلة للمقارنة
+        predictions = int(points.sum())
+        actual = data['line_supply'][points]
+        group_idx = data['row_group'][data['line_row'][points]]
+        groups = data['groups']
+
+        variant_vals, result_vals = [], []
+        for variant, _label in VARIANT_SELECTION:
+            started = time.perf_counter()
+            if variant == SMART_ENGINE_VARIANT:
+                predicted = self._replay_smart_engine(data, origins[0])
+            else:
+                predicted = self._replay_numpy(variant, data, origins)
+            seconds = time.perf_counter() - started
+            predicted = predicted[points]
+
+            count, mae, mape, bias = group_metrics(np.zeros(len(actual), dtype=np.int64), 1, predicted, actual)
+            variant_vals.append({
+                'run_id': self.id,
+                'variant': variant,
+                'count': int(count[0]),
+                'mae': float(mae[0]),
+                'mape': float(mape[0]),
+                'bias': float(bias[0]),
+                'seconds': seconds,
+                'per_second': predictions / seconds if seconds > 0 else 0.0,
+            })
+            count, mae, mape, bias = group_metrics(group_idx, len(groups), predicted, actual)
+            for g, (branch_id, category_id, segment) in enumerate(groups):
+                if not count[g]:
+                    continue
+                result_vals.append({
+                    'run_id': self.id,
+                    'variant': variant,
+                    'branch_id': branch_id,
+                    'category_id': category_id,
+                    'segment': segment,
+                    'count': int(count[g]),
+                    'mae': float(mae[g]),
+                    'mape': float(mape[g]),
+                    'bias': float(bias[g]),
+                })
+        return int(points.sum()), variant_vals, result_vals
+
+    # ============================
+    # Actions
+    # ============================
+    def action_run(self):
+        for run in self:
+            started = time.perf_counter()
+            if run.mode == 'synthetic':
+                data = make_synthetic_history(series=max(run.synthetic_series, 1), seed=run.seed)
+            else:
+                data = self._load_history_data()
+            if not len(data['line_row']):
+                raise UserError("There is no supply history to replay.")
+            point_count, variant_vals, result_vals = run._evaluate(data)
+            run.variant_ids.unlink()
+            run.result_ids.unlink()
+            self.env['custom_supply.forecast_backtest_variant'].create(variant_vals)
+            self.env['custom_supply.forecast_backtest_result'].create(result_vals)
+            run.write({
+                'state': 'done',
+                'point_count': point_count,
+                'duration': time.perf_counter() - started,
+            })
+            _logger.info("Forecast backtest %s: %s points in %.2fs", run.name, point_count, run.duration)
+        return True
+
+    def action_open_results(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': "Backtest Results",
+            'res_model': 'custom_supply.forecast_backtest_result',
+            'view_mode': 'graph,pivot,tree',
+            'domain': [('run_id', '=', self.id)],
+        }
+
+
+class ForecastBacktestVariant(models.Model):
+    _name = "custom_supply.forecast_backtest_variant"
+    _description = "Forecast Backtest Variant Summary"
+    _order = "run_id, mae"
+
+    run_id = fields.Many2one('custom_supply.forecast_backtest', string="Run", required=True, ondelete='cascade', index=True)
+    variant = fields.Selection(VARIANT_SELECTION, string="Engine", required=True, readonly=True)
+    count = fields.Integer(string="Lines", readonly=True)
+    mae = fields.Float(string="MAE", digits=(16, 2), readonly=True, group_operator='avg')
+    mape = fields.Float(string="MAPE (%)", digits=(16, 2), readonly=True, group_operator='avg')
+    bias = fields.Float(string="Bias", digits=(16, 2), readonly=True, group_operator='avg')
+    seconds = fields.Float(string="Time (s)", digits=(16, 3), readonly=True)
+    per_second = fields.Float(string="Suggestions / s", digits=(16, 0), readonly=True, group_operator='avg')
+
+
+class ForecastBacktestResult(models.Model):
+    _name = "custom_supply.forecast_backtest_result"
+    _description = "Forecast Backtest Result"
+    _order = "run_id, variant, branch_id, category_id"
+
+    run_id = fields.Many2one('custom_supply.forecast_backtest', string="Run", required=True, ondelete='cascade', index=True)
+    variant = fields.Selection(VARIANT_SELECTION, string="Engine", required=True, readonly=True)
+    branch_id = fields.Many2one('custom_supply.branch', string="Branch", readonly=True)
+    category_id = fields.Many2one('product.category', string="Category", readonly=True)
+    segment = fields.Char(string="Synthetic Pattern", readonly=True)
+    count = fields.Integer(string="Lines", readonly=True)
+    mae = fields.Float(string="MAE", digits=(16, 2), readonly=True, group_operator='avg')
+    mape = fields.Float(string="MAPE (%)", digits=(16, 2), readonly=True, group_operator='avg')
+    bias = fields.Float(string="Bias", digits=(16, 2), readonly=True, group_operator='avg')
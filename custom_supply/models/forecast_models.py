@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""نماذج التنبؤ بالطلب، محسوبة بـ numpy على كل السلاسل دفعة واحدة.
+
+كل سلسلة صف في مصفوفة (N × H): العمود الأخير هو أحدث دورة توريد،
+و mask يحدد الخلايا الموجودة فعلاً (السلاسل الأقصر مبطّنة من اليسار).
+الحلقة الوحيدة على الزمن (H) وعلى شبكة المعاملات؛ كل خطوة عملية على N سلسلة.
+"""
+import numpy as np
+
+METHOD_NONE = 0
+METHOD_NAIVE = 1
+METHOD_SES = 2
+METHOD_HOLT = 3
+METHOD_CROSTON = 4
+METHOD_CODES = {
+    METHOD_NONE: 'none',
+    METHOD_NAIVE: 'naive',
+    METHOD_SES: 'ses',
+    METHOD_HOLT: 'holt',
+    METHOD_CROSTON: 'croston',
+}
+
+ALPHAS = (0.1, 0.2, 0.3, 0.5)
+BETAS = (0.05, 0.1, 0.2)
+# أقل عدد دورات لملاءمة نموذج، وأقل عدد لتجربة Holt (اتجاه)
+MIN_HISTORY = 4
+MIN_HISTORY_HOLT = 8
+# متوسط الفاصل بين دورات الطلب غير الصفري؛ فوقه تُعامل السلسلة كطلب متقطع (Syntetos-Boylan)
+INTERMITTENT_ADI = 1.32
+# Holt يُختار فقط إذا خفّض الخطأ بهذه النسبة على الأقل مقابل SES
+HOLT_MIN_GAIN = 0.9
+SERVICE_Z = 1.65  # 95%
+
+
+def _ses(Y, mask, alpha):
+    """(التنبؤ التالي، مجموع مربعات أخطاء الخطوة الواحدة، عدد الأخطاء)."""
+    N, H = Y.shape
+    level = np.full(N, np.nan)
+    sse = np.zeros(N)
+    count = np.zeros(N)
+    for t in range(H):
+        y, m = Y[:, t], mask[:, t]
+        ready = m & ~np.isnan(level)
+        err = np.where(ready, y - level, 0.0)
+        sse += err ** 2
+        count += ready
+        level = np.where(ready, level + alpha * err, level)
+        level = np.where(m & ~ready, y, level)
+    return np.nan_to_num(level), sse, count
+
+
+def _holt(Y, mask, alpha, beta):
+    N, H = Y.shape
+    level = np.full(N, np.nan)
+    trend = np.zeros(N)
+    sse = np.zeros(N)
+    count = np.zeros(N)
+    for t in range(H):
+        y, m = Y[:, t], mask[:, t]
+        ready = m & ~np.isnan(level)
+        forecast = level + trend
+        err = np.where(ready, y - forecast, 0.0)
+        sse += err ** 2
+        count += ready
+        new_level = np.where(ready, forecast + alpha * err, level)
+        trend = np.where(ready, beta * (new_level - level) + (1 - beta) * trend, trend)
+        level = np.where(m & ~ready, y, new_level)
+    return np.maximum(np.nan_to_num(level + trend), 0.0), sse, count
+
+
+def _croston(Y, mask, alpha):
+    """Croston بتصحيح Syntetos-Boylan (SBA) للطلب المتقطع."""
+    N, H = Y.shape
+    size = np.full(N, np.nan)
+    interval = np.full(N, np.nan)
+    since = np.zeros(N)
+    sse = np.zeros(N)
+    count = np.zeros(N)
+    factor = 1.0 - alpha / 2.0
+    for t in range(H):
+        y, m = Y[:, t], mask[:, t]
+        since = since + m
+        started = ~np.isnan(size)
+        forecast = np.where(started, factor * size / np.where(started, interval, 1.0), 0.0)
+        ready = m & started
+        err = np.where(ready, y - forecast, 0.0)
+        sse += err ** 2
+        count += ready
+        demand = m & (y > 0)
+        first = demand & ~started
+        update = demand & started
+        size = np.where(first, y, np.where(update, size + alpha * (y - size), size))
+        interval = np.where(first, since, np.where(update, interval + alpha * (since - interval), interval))
+        since = np.where(demand, 0.0, since)
+    started = ~np.isnan(size)
+    forecast = np.where(started, factor * size / np.where(started, interval, 1.0), 0.0)
+    return forecast, sse, count
+
+
+def _best(fits):
+    """أفضل ملاءمة لكل سلسلة من بين عدة ملاءمات (أقل MSE)."""
+    forecasts = np.stack([f[0] for f in fits])
+    mse = np.stack([f[1] / np.maximum(f[2], 1.0) for f in fits])
+    pick = np.argmin(mse, axis=0)
+    cols = np.arange(forecasts.shape[1])
+    return forecasts[pick, cols], mse[pick, cols]
+
+
+def fit_forecasts(Y, mask):
+    """ملاءمة كل السلاسل واختيار النموذج لكل سلسلة.
+
+    :param Y: مصفوفة (N × H) بكميات كل دورة
+    :param mask: مصفوفة منطقية بنفس الشكل، True للدورات الموجودة
+    :return: dict من مصفوفات طولها N:
+             method (رموز METHOD_*)، forecast، sigma، safety_stock، min_qty، max_qty، history
+    """
+    Y = np.where(mask, np.asarray(Y, dtype=float), 0.0)
+    mask = np.asarray(mask, dtype=bool)
+    N = Y.shape[0]
+    history = mask.sum(axis=1)
+    nonzero = ((Y > 0) & mask).sum(axis=1)
+
+    ses_f, ses_mse = _best([_ses(Y, mask, a) for a in ALPHAS])
+    holt_f, holt_mse = _best([_holt(Y, mask, a, b) for a in ALPHAS for b in BETAS])
+    cro_f, cro_mse = _best([_croston(Y, mask, a) for a in ALPHAS])
+
+    naive_f = np.where(history > 0, Y.sum(axis=1) / np.maximum(history, 1), 0.0)
+    naive_var = np.where(
+        history > 1,
+        (((Y - naive_f[:, None]) ** 2) * mask).sum(axis=1) / np.maximum(history - 1, 1),
+        0.0,
+    )
+
+    adi = np.where(nonzero > 0, history / np.maximum(nonzero, 1), np.inf)
+    use_holt = (history >= MIN_HISTORY_HOLT) & (holt_mse < HOLT_MIN_GAIN * ses_mse)
+
+    method = np.full(N, METHOD_SES)
+    method = np.where(use_holt, METHOD_HOLT, method)
+    method = np.where(adi > INTERMITTENT_ADI, METHOD_CROSTON, method)
+    method = np.where(history < MIN_HISTORY, METHOD_NAIVE, method)
+    method = np.where(nonzero == 0, METHOD_NONE, method)
+
+    forecast = np.select(
+        [method == METHOD_SES, method == METHOD_HOLT, method == METHOD_CROSTON, method == METHOD_NAIVE],
+        [ses_f, holt_f, cro_f, naive_f],
+        0.0,
+    )
+    mse = np.select(
+        [method == METHOD_SES, method == METHOD_HOLT, method == METHOD_CROSTON, method == METHOD_NAIVE],
+        [ses_mse, holt_mse, cro_mse, naive_var],
+        0.0,
+    )
+    forecast = np.maximum(forecast, 0.0)
+    sigma = np.sqrt(mse)
+    safety = SERVICE_Z * sigma
+    # مراجعة دورية بدورة واحدة: الحد الأدنى = مخزون الأمان، الحد الأعلى = طلب الدورة + مخزون الأمان
+    return {
+        'method': method,
+        'forecast': forecast,
+        'sigma': sigma,
+        'safety_stock': safety,
+        'min_qty': safety,
+        'max_qty': forecast + safety,
+        'history': history,
+    }
+
+
+# نماذج منفردة بمعاملات ثابتة، للمقارنة مع الاختيار التلقائي في fit_forecasts
+FIXED_ALPHA = 0.2
+FIXED_BETA = 0.1
+VARIANTS = ('auto', 'ses', 'holt', 'croston')
+
+
+def forecast_variant(variant, Y, mask):
+    """تنبؤ الدورة التالية لكل السلاسل بنموذج واحد (``variant`` من VARIANTS)."""
+    Y = np.where(mask, np.asarray(Y, dtype=float), 0.0)
+    mask = np.asarray(mask, dtype=bool)
+    if variant == 'auto':
+        return fit_forecasts(Y, mask)['forecast']
+    if variant == 'ses':
+        return _ses(Y, mask, FIXED_ALPHA)[0]
+    if variant == 'holt':
+        return _holt(Y, mask, FIXED_ALPHA, FIXED_BETA)[0]
+    if variant == 'croston':
+        return _croston(Y, mask, FIXED_ALPHA)[0]
+    raise ValueError(f"Unknown forecast variant: {variant}")
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+
+class PickingWave(models.Model):
+    """موجة تجهيز: مجموعة طلبات InWarehouse تُجهَّز وتُصدَّر معاً.
+
+    قائمة التجهيز الموحّدة تُبنى باستعلام تجميعي واحد على أسطر الطلبات،
+    والتصدير يمر عبر action_export دفعة واحدة ضمن نفس الـ transaction.
+    """
+    _name = "custom_supply.picking_wave"
+    _description = "Warehouse Picking Wave"
+    _inherit = ['mail.thread']
+    _order = "id desc"
+
+    name = fields.Char(string="Wave Number", required=True, copy=False, readonly=True, default='New')
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('exported', 'Exported'),
+    ], string="Status", default='draft', readonly=True, tracking=True)
+    request_ids = fields.Many2many(
+        'custom_supply.supply_request', 'custom_supply_picking_wave_request_rel', 'wave_id', 'request_id',
+        string="Supply Requests", domain="[('status', '=', 'InWarehouse')]")
+    line_ids = fields.One2many('custom_supply.picking_wave_line', 'wave_id', string="Pick List", readonly=True)
+    request_count = fields.Integer(string="Requests", compute="_compute_counts")
+    branch_count = fields.Integer(string="Branches", compute="_compute_counts")
+    user_id = fields.Many2one('res.users', string="Exported By", readonly=True)
+    export_date = fields.Datetime(string="Exported On", readonly=True)
+
+    @api.depends('request_ids')
+    def _compute_counts(self):
+        for wave in self:
+            wave.request_count = len(wave.request_ids)
+            wave.branch_count = len(wave.request_ids.branch_id)
+
+    # ============================
+    # Create / Write
+    # ============================
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', 'New') in ('New', False):
+                vals['name'] = self.env['ir.sequence'].next_by_code('custom_supply.picking_wave') or 'New'
+        waves = super().create(vals_list)
+        waves._rebuild_lines()
+        return waves
+
+    def write(self, vals):
+        if 'request_ids' in vals and any(w.state == 'exported' for w in self):
+            raise UserError("You cannot change the requests of an exported wave.")
+        res = super().write(vals)
+        if 'request_ids' in vals:
+            self._rebuild_lines()
+        return res
+
+    # ============================
+    # Pick List
+    # ============================
+    def _rebuild_lines(self):
+        """🔄 إعادة بناء قائمة التجهيز لكل الموجات باستعلام تجميعي واحد."""
+        if not self:
+            return
+        Line = self.env['custom_supply.supply_request_line']
+        request_wave = {r.id: w.id for w in self for r in w.request_ids}
+        groups = Line._read_group(
+            [('request_id', 'in', list(request_wave)), ('supply_qty', '>', 0)],
+            ['request_id', 'product_id'],
+            ['supply_qty:sum'],
+        ) if request_wave else []
+
+        # تجميع نتائج (طلب، منتج) إلى (موجة، منتج)
+        totals = {}
+        for request, product, qty in groups:
+            key = (request_wave[request.id], product.id)
+            total = totals.setdefault(key, {'qty': 0.0, 'requests': 0, 'branches': set()})
+            total['qty'] += qty
+            total['requests'] += 1
+            total['branches'].add(request.branch_id.id)
+
+        self.line_ids.unlink()
+        products = self.env['product.product'].browse({p for _w, p in totals})
+        units = {p.id: p.product_tmpl_id.supply_unit_id.name or '' for p in products}
+        self.env['custom_supply.picking_wave_line'].create([{
+            'wave_id': wave_id,
+            'product_id': product_id,
+            'unit_name': units[product_id],
+            'total_qty': total['qty'],
+            'request_count': total['requests'],
+            'branch_count': len(total['branches']),
+        } for (wave_id, product_id), total in totals.items()])
+
+    def _get_branch_breakdown(self):
+        """📦 توزيع كميات الموجة على الفروع: [(branch, [(product, unit, qty), ...]), ...]."""
+        self.ensure_one()
+        groups = self.env['custom_supply.supply_request_line']._read_group(
+            [('request_id', 'in', self.request_ids.ids), ('supply_qty', '>', 0)],
+            ['branch_id', 'category_id', 'product_id'],
+            ['supply_qty:sum'],
+            order='branch_id, category_id, product_id',
+        )
+        breakdown = {}
+        for branch, _category, product, qty in groups:
+            unit = product.product_tmpl_id.supply_unit_id.name or ''
+            breakdown.setdefault(branch, []).append((product, unit, qty))
+        return list(breakdown.items())
+
+    # ============================
+    # Actions
+    # ============================
+    def action_refresh_lines(self):
+        self.filtered(lambda w: w.state == 'draft')._rebuild_lines()
+        return True
+
+    def action_export_wave(self):
+        """🚚 تصدير كل طلبات الموجة دفعة واحدة.
+
+        إذا خرج أي طلب من حالة InWarehouse منذ إنشاء الموجة لا يُصدَّر شيء.
+        """
+        if not self.env.user._get_supply_roles().is_warehouse:
+            raise UserError("Only Warehouse Employee can export a picking wave.")
+        for wave in self:
+            if wave.state != 'draft':
+                continue
+            if not wave.request_ids:
+                raise UserError(f"Wave {wave.name} has no supply requests.")
+            stale = wave.request_ids.filtered(lambda r: r.status != 'InWarehouse')
+            if stale:
+                raise UserError(
+                    f"These requests are no longer in the warehouse, remove them from wave {wave.name} first: "
+                    f"{', '.join(stale.mapped('name'))}"
+                )
+        waves = self.filtered(lambda w: w.state == 'draft')
+        waves.request_ids.action_export()
+        waves.write({
+            'state': 'exported',
+            'user_id': self.env.user.id,
+            'export_date': fields.Datetime.now(),
+        })
+        for wave in waves:
+            wave.message_post(body=f"{len(wave.request_ids)} requests exported by {self.env.user.name}.")
+        return True
+
+    def action_print_wave(self):
+        return self.env.ref('custom_supply.action_report_picking_wave_pdf').report_action(self)
+
+    def action_plan_routes(self):
+        """خطة توزيع لطلبات الموجة بعد تصديرها."""
+        self.ensure_one()
+        plan = self.env['custom_supply.route_plan'].create({
+            'request_ids': [fields.Command.set(self.request_ids.filtered(lambda r: r.status == 'OnRoad').ids)],
+        })
+        if plan.request_ids:
+            plan.action_plan_routes()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'custom_supply.route_plan',
+            'res_id': plan.id,
+            'view_mode': 'form',
+        }
+
+    def action_open_branch_breakdown(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': "Branch Breakdown",
+            'res_model': 'custom_supply.supply_request_line',
+            'view_mode': 'tree',
+            'views': [(self.env.ref('custom_supply.view_picking_wave_breakdown_tree').id, 'tree')],
+            'domain': [('request_id', 'in', self.request_ids.ids), ('supply_qty', '>', 0)],
+            'context': {'group_by': ['branch_id'], 'create': False, 'edit': False},
+        }
+
+
+class PickingWaveLine(models.Model):
+    _name = "custom_supply.picking_wave_line"
+    _description = "Warehouse Picking Wave Line"
+    _order = "category_id, product_id"
+
+    wave_id = fields.Many2one('custom_supply.picking_wave', string="Wave", required=True, ondelete='cascade', index=True)
+    product_id = fields.Many2one('product.product', string="Product", required=True, readonly=True)
+    category_id = fields.Many2one('product.category', string="Category", related='product_id.categ_id', store=True)
+    unit_name = fields.Char(string="Unit", readonly=True)
+    total_qty = fields.Float(string="Total Supply Quantity", readonly=True)
+    request_count = fields.Integer(string="Requests", readonly=True)
+    branch_count = fields.Integer(string="Branches", readonly=True)
+
+
+class SupplyRequest(models.Model):
+    _inherit = "custom_supply.supply_request"
+
+    def action_create_picking_wave(self):
+        """إنشاء موجة تجهيز من الطلبات المحددة (طلبات InWarehouse فقط)."""
+        requests = self.filtered(lambda r: r.status == 'InWarehouse')
+        if not requests:
+            raise UserError("Select at least one request that is In Warehouse.")
+        wave = self.env['custom_supply.picking_wave'].create({
+            'request_ids': [fields.Command.set(requests.ids)],
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'custom_supply.picking_wave',
+            'res_id': wave.id,
+            'view_mode': 'form',
+        }
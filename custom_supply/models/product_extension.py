@@ -87,6 +87,17 @@ class ProductTemplate(models.Model):
         return res
 
 
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    # 🔹 ربط المتغير بمنتجات الفروع، تستخدمه domain أسطر الطلب (كتالوج الفرع النشط)
+    supply_branch_product_ids = fields.One2many(
+        'custom_supply.branch_product',
+        'product_id',
+        string="Supply Branch Products"
+    )
+
+
 class SupplyUnit(models.Model):
     _name = "custom_supply.unit"
     _description = "Supply Unit"
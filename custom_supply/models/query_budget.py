@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""عدّاد استعلامات SQL للعمليات الساخنة في التوريد، مع ميزانية لكل عملية.
+
+- count_queries: context manager يعدّ الاستعلامات (cr.sql_log_count) وزمن عملية مسمّاة.
+- query_budget: decorator لدوال النماذج يلفّ الاستدعاء بـ count_queries.
+
+كل عملية تُسجَّل في السجل (INFO)، وتجاوز الميزانية يُسجَّل كتحذير.
+الاختبارات (tests/test_query_budget.py) تتحقق من الميزانيات ومن أن العدد لا يكبر مع عدد الأسطر.
+"""
+import functools
+import logging
+import time
+from contextlib import contextmanager
+
+_logger = logging.getLogger(__name__)
+
+# عملية → (استعلامات ثابتة لكل استدعاء، استعلامات لكل سجل في self)
+# لا توجد ميزانية لكل سطر: عدد أسطر الطلب يجب ألا يغيّر عدد الاستعلامات
+QUERY_BUDGETS = {
+    'supply_request.create': (10, 40),
+    'supply_request.submit': (5, 30),
+    'supply_request.mark_in_warehouse': (5, 35),
+    'supply_request.export': (15, 15),
+    'supply_request.order_received': (5, 35),
+    'supply_request.stock_count': (25, 25),
+}
+
+
+def get_budget(operation, records=1):
+    """أقصى عدد استعلامات مسموح لـ ``operation`` على ``records`` سجلاً (None = بلا ميزانية)."""
+    budget = QUERY_BUDGETS.get(operation)
+    if budget is None:
+        return None
+    fixed, per_record = budget
+    return fixed + per_record * max(records, 1)
+
+
+class QueryCounter:
+    """نتيجة عدّ عملية واحدة."""
+
+    __slots__ = ('operation', 'records', 'queries', 'seconds', 'budget')
+
+    def __init__(self, operation, records):
+        self.operation = operation
+        self.records = records
+        self.queries = 0
+        self.seconds = 0.0
+        self.budget = get_budget(operation, records)
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+
+@contextmanager
+def count_queries(env, operation, records=1):
+    """⏱️ عدّ استعلامات العملية وزمنها.
+
+    الكتابات المؤجلة تُفرَّغ (flush) قبل العدّ وبعده حتى تُنسب لعمليتها.
+    """
+    env.flush_all()
+    cr = env.cr
+    counter = QueryCounter(operation, records)
+    start_count = cr.sql_log_count
+    started = time.perf_counter()
+    yield counter
+    env.flush_all()
+    counter.queries = cr.sql_log_count - start_count
+    counter.seconds = time.perf_counter() - started
+    if counter.over_budget:
+        _logger.warning("Query budget exceeded for %s: %s queries for %s record(s) (budget %s) in %.3fs",
+                        operation, counter.queries, records, counter.budget, counter.seconds)
+    else:
+        _logger.info("%s: %s queries for %s record(s) in %.3fs",
+                     operation, counter.queries, records, counter.seconds)
+
+
+def query_budget(operation, count=None):
+    """Decorator لدوال النماذج: يعدّ استعلامات الاستدعاء تحت اسم ``operation``.
+
+    ``count(self, *args)`` عدد السجلات التي تُحسب عليها الميزانية (افتراضياً len(self))،
+    مثلاً ``lambda self, vals_list: len(vals_list)`` لدالة create.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            records = count(self, *args) if count else len(self)
+            with count_queries(self.env, operation, records=records):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
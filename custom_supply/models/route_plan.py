@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+from .route_solver import haversine_matrix, solve_vrptw
+
+_logger = logging.getLogger(__name__)
+
+DEPOT_LATITUDE_PARAM = 'custom_supply.depot_latitude'
+DEPOT_LONGITUDE_PARAM = 'custom_supply.depot_longitude'
+
+
+def _float_to_minutes(value):
+    return float(value or 0.0) * 60.0
+
+
+class RoutePlan(models.Model):
+    """خطة توزيع يومية: ترتيب محطات كل شاحنة لطلبات OnRoad حسب نوافذ توريد الأفرع."""
+    _name = "custom_supply.route_plan"
+    _description = "Delivery Route Plan"
+    _inherit = ['mail.thread']
+    _order = "date desc, id desc"
+
+    name = fields.Char(string="Plan Number", required=True, copy=False, readonly=True, default='New')
+    date = fields.Date(string="Delivery Date", required=True, default=fields.Date.context_today, tracking=True)
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('planned', 'Planned'),
+    ], string="Status", default='draft', readonly=True, tracking=True)
+    request_ids = fields.Many2many(
+        'custom_supply.supply_request', 'custom_supply_route_plan_request_rel', 'plan_id', 'request_id',
+        string="Supply Requests", domain="[('status', '=', 'OnRoad')]")
+
+    # ============================
+    # Parameters
+    # ============================
+    depot_latitude = fields.Float(string="Warehouse Latitude", digits=(10, 7),
+                                  default=lambda self: self._default_depot(DEPOT_LATITUDE_PARAM))
+    depot_longitude = fields.Float(string="Warehouse Longitude", digits=(10, 7),
+                                   default=lambda self: self._default_depot(DEPOT_LONGITUDE_PARAM))
+    departure_time = fields.Float(string="Departure Time", default=7.0)
+    speed_kmh = fields.Float(string="Average Speed (km/h)", default=40.0)
+    service_minutes = fields.Float(string="Unloading Time (min)", default=15.0)
+    max_stops = fields.Integer(string="Max Stops per Truck", default=0, help="0 means no limit.")
+
+    # ============================
+    # Result
+    # ============================
+    stop_ids = fields.One2many('custom_supply.route_plan_stop', 'plan_id', string="Stops", readonly=True)
+    unplanned_branch_ids = fields.Many2many(
+        'custom_supply.branch', 'custom_supply_route_plan_unplanned_rel', 'plan_id', 'branch_id',
+        string="Branches Without Coordinates", readonly=True)
+    truck_count = fields.Integer(string="Trucks", readonly=True)
+    total_distance = fields.Float(string="Total Distance (km)", digits=(16, 1), readonly=True)
+    late_stop_count = fields.Integer(string="Late Stops", readonly=True)
+
+    @api.model
+    def _default_depot(self, param):
+        return float(self.env['ir.config_parameter'].sudo().get_param(param, 0.0) or 0.0)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', 'New') in ('New', False):
+                vals['name'] = self.env['ir.sequence'].next_by_code('custom_supply.route_plan') or 'New'
+        return super().create(vals_list)
+
+    # ============================
+    # Inputs
+    # ============================
+    def _get_branch_windows(self, branches):
+        """{branch_id: (start_min, end_min)} لنوافذ يوم التوزيع، من أول بداية إلى آخر نهاية."""
+        self.ensure_one()
+        windows = self.env['custom_supply.branch_supply_window'].search_read(
+            [('branch_id', 'in', branches.ids), ('supply_day_id.day_of_week', '=', self.date.weekday())],
+            ['branch_id', 'start_time', 'end_time'],
+        )
+        result = {}
+        for w in windows:
+            start, end = _float_to_minutes(w['start_time']), _float_to_minutes(w['end_time'])
+            branch_id = w['branch_id'][0]
+            if branch_id in result:
+                start = min(start, result[branch_id][0])
+                end = max(end, result[branch_id][1])
+            result[branch_id] = (start, end)
+        return result
+
+    # ============================
+    # Actions
+    # ============================
+    def action_load_requests(self):
+        """تحميل كل الطلبات التي خرجت من المستودع ولم تُستلم بعد."""
+        requests = self.env['custom_supply.supply_request'].search([('status', '=', 'OnRoad')])
+        self.write({'request_ids': [fields.Command.set(requests.ids)]})
+        return True
+
+    def action_plan_routes(self):
+        for plan in self:
+            plan._plan_routes()
+        return True
+
+    def _plan_routes(self):
+        self.ensure_one()
+        if not self.request_ids:
+            raise UserError("Add the On Road supply requests to plan first.")
+        if not (self.depot_latitude or self.depot_longitude):
+            raise UserError("Set the warehouse coordinates before planning routes.")
+        if self.speed_kmh <= 0:
+            raise UserError("Average speed must be greater than zero.")
+
+        branches = self.request_ids.branch_id
+        # _compute_coordinates يضع 0,0 عندما لا يحتوي رابط الخريطة على إحداثيات
+        located = branches.filtered(lambda b: b.latitude or b.longitude)
+        unplanned = branches - located
+        windows = self._get_branch_windows(located)
+        located = list(located)
+
+        # 🧮 النقطة 0 هي المستودع، النوافذ والأوقات بالدقائق منذ منتصف الليل
+        day_start, day_end = 0.0, 24 * 60.0
+        lats = [self.depot_latitude] + [b.latitude for b in located]
+        lons = [self.depot_longitude] + [b.longitude for b in located]
+        ready = [day_start] + [windows.get(b.id, (day_start, day_end))[0] for b in located]
+        due = [day_end] + [windows.get(b.id, (day_start, day_end))[1] for b in located]
+        service = [0.0] + [self.service_minutes] * len(located)
+
+        started = time.monotonic()
+        routes = solve_vrptw(
+            lats, lons, ready, due, service,
+            departure=_float_to_minutes(self.departure_time),
+            speed_kmh=self.speed_kmh,
+            max_stops=self.max_stops,
+        ) if located else []
+        _logger.info("Route plan %s: %s branches, %s trucks in %.2fs",
+                     self.name, len(located), len(routes), time.monotonic() - started)
+
+        requests_by_branch = {}
+        for request in self.request_ids:
+            requests_by_branch.setdefault(request.branch_id.id, []).append(request.id)
+
+        stop_vals = []
+        for truck, route in enumerate(routes, start=1):
+            for sequence, (node, arrival, start, late, leg_km) in enumerate(route, start=1):
+                branch = located[node - 1]
+                window = windows.get(branch.id)
+                stop_vals.append({
+                    'plan_id': self.id,
+                    'truck': truck,
+                    'sequence': sequence,
+                    'branch_id': branch.id,
+                    'request_ids': [fields.Command.set(requests_by_branch[branch.id])],
+                    'arrival_time': arrival / 60.0,
+                    'start_time': start / 60.0,
+                    'window_start': window[0] / 60.0 if window else 0.0,
+                    'window_end': window[1] / 60.0 if window else 0.0,
+                    'no_window': not window,
+                    # مثل late_delivery: لا نافذة في هذا اليوم = تأخير
+                    'late': late > 0 or not window,
+                    'leg_distance': leg_km,
+                })
+
+        self.stop_ids.unlink()
+        stops = self.env['custom_supply.route_plan_stop'].create(stop_vals)
+        total_distance = sum(stops.mapped('leg_distance'))
+        if routes:
+            # مسافة العودة إلى المستودع من آخر محطة لكل شاحنة
+            depot_km = haversine_matrix(lats, lons)[0]
+            total_distance += float(sum(depot_km[route[-1][0]] for route in routes))
+        self.write({
+            'state': 'planned',
+            'unplanned_branch_ids': [fields.Command.set(unplanned.ids)],
+            'truck_count': len(routes),
+            'total_distance': total_distance,
+            'late_stop_count': len(stops.filtered('late')),
+        })
+
+    def action_open_stops(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': "Stops",
+            'res_model': 'custom_supply.route_plan_stop',
+            'view_mode': 'tree',
+            'domain': [('plan_id', '=', self.id)],
+            'context': {'group_by': ['truck']},
+        }
+
+
+class RoutePlanStop(models.Model):
+    _name = "custom_supply.route_plan_stop"
+    _description = "Delivery Route Stop"
+    _order = "plan_id, truck, sequence"
+
+    plan_id = fields.Many2one('custom_supply.route_plan', string="Plan", required=True, ondelete='cascade', index=True)
+    truck = fields.Integer(string="Truck", readonly=True)
+    sequence = fields.Integer(string="Stop", readonly=True)
+    branch_id = fields.Many2one('custom_supply.branch', string="Branch", readonly=True)
+    request_ids = fields.Many2many(
+        'custom_supply.supply_request', 'custom_supply_route_plan_stop_request_rel', 'stop_id', 'request_id',
+        string="Supply Requests", readonly=True)
+    arrival_time = fields.Float(string="Arrival", readonly=True)
+    start_time = fields.Float(string="Unloading Starts", readonly=True)
+    window_start = fields.Float(string="Window From", readonly=True)
+    window_end = fields.Float(string="Window To", readonly=True)
+    no_window = fields.Boolean(string="No Window Today", readonly=True)
+    late = fields.Boolean(string="Late", readonly=True)
+    leg_distance = fields.Float(string="Distance (km)", digits=(16, 1), readonly=True)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""حلّ مسارات التوزيع (VRPTW) لطلبات التوريد الخارجة من المستودع.
+
+دوال بايثون بحتة (بدون ORM) حتى يمكن تشغيلها وقياسها خارج Odoo:
+- haversine_matrix: مصفوفة المسافات (كم) بين كل النقاط دفعة واحدة.
+- solve_vrptw: خوارزمية التوفير (Clarke-Wright) مع نوافذ التوريد،
+  ثم بحث محلي (نقل نقطة بين المسارات + 2-opt داخل المسار).
+
+الفهرس 0 دائماً هو المستودع، والأوقات بالدقائق منذ منتصف الليل.
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+# غرامة كل دقيقة تأخير خارج النافذة، بوحدة الكيلومتر حتى تُجمع مع المسافة
+LATE_PENALTY_KM = 1000.0
+# عدد أقرب الجيران الذين نجرّب الإدراج بجانبهم في البحث المحلي
+NEIGHBOURS = 10
+MAX_LOCAL_SEARCH_PASSES = 50
+
+
+def haversine_matrix(lats, lons):
+    """مصفوفة المسافات (كم) بين كل زوج من النقاط (n × n)."""
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2.0) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class _Problem:
+    """بيانات المسألة بعد التحويل إلى قوائم بايثون (أسرع من numpy في الحلقات القصيرة)."""
+
+    def __init__(self, dist, travel, ready, due, service, departure, max_stops):
+        self.dist = dist.tolist()
+        self.travel = travel.tolist()
+        self.ready = list(ready)
+        self.due = list(due)
+        self.service = list(service)
+        self.departure = departure
+        self.max_stops = max_stops or 0
+
+    def evaluate(self, route):
+        """(المسافة مع العودة للمستودع، دقائق التأخير) لمسار واحد."""
+        dist, travel = self.dist, self.travel
+        t = self.departure
+        prev = 0
+        km = 0.0
+        late = 0.0
+        for node in route:
+            km += dist[prev][node]
+            t += travel[prev][node]
+            if t < self.ready[node]:
+                t = self.ready[node]
+            elif t > self.due[node]:
+                late += t - self.due[node]
+            t += self.service[node]
+            prev = node
+        km += dist[prev][0]
+        return km, late
+
+    def cost(self, route):
+        if not route:
+            return 0.0
+        km, late = self.evaluate(route)
+        return km + LATE_PENALTY_KM * late
+
+    def schedule(self, route):
+        """[(node, arrival, start, late_minutes, leg_km), ...] لمسار واحد."""
+        t = self.departure
+        prev = 0
+        rows = []
+        for node in route:
+            arrival = t + self.travel[prev][node]
+            start = max(arrival, self.ready[node])
+            rows.append((node, arrival, start, max(0.0, arrival - self.due[node]), self.dist[prev][node]))
+            t = start + self.service[node]
+            prev = node
+        return rows
+
+
+def _savings(problem, dist):
+    """دمج المسارات بترتيب التوفير s(i,j) = d(0,i) + d(0,j) - d(i,j) (محسوب بـ numpy)."""
+    n = dist.shape[0] - 1
+    routes = {i: [i] for i in range(1, n + 1)}
+    route_of = list(range(n + 1))
+    late = {i: problem.evaluate([i])[1] for i in routes}
+    if n < 2:
+        return list(routes.values())
+
+    saving = dist[0, 1:, None] + dist[0, None, 1:] - dist[1:, 1:]
+    iu, ju = np.nonzero(~np.eye(n, dtype=bool))
+    values = saving[iu, ju]
+    keep = values > 0
+    order = np.argsort(-values[keep], kind='stable')
+    pairs = np.stack([iu[keep][order] + 1, ju[keep][order] + 1], axis=1).tolist()
+
+    for i, j in pairs:
+        ri, rj = route_of[i], route_of[j]
+        if ri == rj:
+            continue
+        a, b = routes[ri], routes[rj]
+        # المسارات موجّهة بسبب النوافذ: نربط نهاية مسار i ببداية مسار j فقط
+        if a[-1] != i or b[0] != j:
+            continue
+        if problem.max_stops and len(a) + len(b) > problem.max_stops:
+            continue
+        merged = a + b
+        merged_late = problem.evaluate(merged)[1]
+        # لا نقبل دمجاً يضيف تأخيراً جديداً
+        if merged_late > late[ri] + late[rj] + 1e-9:
+            continue
+        routes[ri] = merged
+        late[ri] = merged_late
+        for node in b:
+            route_of[node] = ri
+        del routes[rj], late[rj]
+    return list(routes.values())
+
+
+def _two_opt(problem, route):
+    """2-opt داخل المسار (عكس مقطع) طالما الكلفة تتحسن."""
+    best = problem.cost(route)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(route) - 1):
+            for j in range(i + 1, len(route)):
+                candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                cost = problem.cost(candidate)
+                if cost < best - 1e-9:
+                    route, best, improved = candidate, cost, True
+    return route
+
+
+def _relocate(problem, routes, neighbours):
+    """نقل نقطة واحدة بجانب أحد أقرب جيرانها (في نفس المسار أو مسار آخر)."""
+    improved_any = False
+    position = {node: (r, k) for r, route in enumerate(routes) for k, node in enumerate(route)}
+    costs = [problem.cost(route) for route in routes]
+    for node in list(position):
+        src, k = position[node]
+        source = routes[src]
+        reduced = source[:k] + source[k + 1:]
+        reduced_cost = problem.cost(reduced)
+        best = None
+        for other in neighbours[node]:
+            if other == 0 or other == node:
+                continue
+            dst, m = position[other]
+            target = reduced if dst == src else routes[dst]
+            if dst != src and problem.max_stops and len(target) >= problem.max_stops:
+                continue
+            m = target.index(other)
+            for at in (m, m + 1):
+                candidate = target[:at] + [node] + target[at:]
+                if dst == src:
+                    delta = problem.cost(candidate) - costs[src]
+                else:
+                    delta = (reduced_cost - costs[src]) + (problem.cost(candidate) - costs[dst])
+                if delta < -1e-9 and (best is None or delta < best[0]):
+                    best = (delta, dst, candidate)
+        if best is None:
+            continue
+        _delta, dst, candidate = best
+        if dst == src:
+            routes[src] = candidate
+        else:
+            routes[src] = reduced
+            routes[dst] = candidate
+        for r in {src, dst}:
+            costs[r] = problem.cost(routes[r])
+            for idx, n in enumerate(routes[r]):
+                position[n] = (r, idx)
+        improved_any = True
+    return improved_any
+
+
+def solve_vrptw(lats, lons, ready, due, service, departure=360.0, speed_kmh=40.0, max_stops=0):
+    """حل VRPTW تقريبي.
+
+    :param lats, lons: إحداثيات النقاط، الفهرس 0 هو المستودع
+    :param ready, due: بداية ونهاية نافذة كل نقطة بالدقائق (للمستودع أي قيمة)
+    :param service: مدة التفريغ في كل نقطة بالدقائق
+    :param departure: وقت خروج الشاحنات من المستودع بالدقائق
+    :param max_stops: أقصى عدد محطات للشاحنة الواحدة (0 = بلا حد)
+    :return: قائمة مسارات، كل مسار قائمة [(node, arrival, start, late_minutes, leg_km), ...]
+    """
+    dist = haversine_matrix(lats, lons)
+    travel = dist / float(speed_kmh) * 60.0
+    problem = _Problem(dist, travel, ready, due, service, departure, max_stops)
+
+    routes = _savings(problem, dist)
+
+    # أقرب الجيران لكل نقطة (بدون المستودع) لتقليص مساحة البحث المحلي
+    n = dist.shape[0]
+    k = min(NEIGHBOURS, n - 1)
+    neighbours = np.argsort(dist, axis=1)[:, :k + 1].tolist() if n > 1 else [[]]
+
+    for _pass in range(MAX_LOCAL_SEARCH_PASSES):
+        routes = [_two_opt(problem, route) for route in routes]
+        if not _relocate(problem, routes, neighbours):
+            break
+        routes = [route for route in routes if route]
+
+    routes = [route for route in routes if route]
+    routes.sort(key=lambda route: problem.ready[route[0]])
+    return [problem.schedule(route) for route in routes]
@@ -126,6 +126,16 @@ class SmartEngine(models.Model):
             except Exception:
                 values.append(0.0)
 
+        max_q = float(getattr(bp, 'max_quantity', 0.0) or 0.0)
+        return self._suggest_from_values(values, past_suggestions, cur_qty, max_q, min_history=min_history)
+
+    @api.model
+    def _suggest_from_values(self, values, past_suggestions, cur_qty, max_q, min_history=5):
+        """
+        Core of compute_ideal_and_suggestion on plain numbers (no ORM access),
+        so it can be replayed on historical data by the backtest.
+        values: actual quantities (supply_qty + current_qty), oldest->newest
+        """
         stats = self._compute_basic_stats(values)
         weighted = self._weighted_recent_average(values, decay=0.65) if values else 0.0
 
@@ -136,7 +146,6 @@ class SmartEngine(models.Model):
 
         # fallback path: insufficient history
         if stats['count'] < int(min_history):
-            max_q = float(getattr(bp, 'max_quantity', 0.0) or 0.0)
             fallback_qty = max(0.0, max_q - cur_qty) if max_q > 0 else 0.0
             return {
                 'suggested_qty': float(round(fallback_qty, 3)),
@@ -192,7 +201,6 @@ class SmartEngine(models.Model):
         min_req = max(0.0, safety_stock - cur_qty)
 
         # Apply soft cap only if max_quantity >0
-        max_q = float(getattr(bp, 'max_quantity', 0.0) or 0.0)
         soft_cap = max_q * 1.5 if max_q > 0 else None
         if soft_cap is not None:
             suggested = min(suggested, soft_cap)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+from .query_budget import query_budget
+
+
+class SupplyRequest(models.Model):
+    _inherit = "custom_supply.supply_request"
+
+    # ============================
+    # Bulk stock count
+    # ============================
+    @api.model
+    def _normalize_counts(self, counts):
+        """{product_id: qty} من قائمة (product_id, qty) أو {'product_id', 'qty'}؛ عند التكرار يُعتمد الأخير."""
+        if counts and not isinstance(counts, (list, tuple)):
+            raise UserError("Stock counts must be a list of (product_id, qty) entries.")
+        result = {}
+        for item in counts or []:
+            try:
+                if isinstance(item, dict):
+                    product_id, qty = item.get('product_id'), item.get('qty')
+                else:
+                    product_id, qty = item
+                result[int(product_id)] = float(qty) if qty is not None and qty is not False else -1.0
+            except (TypeError, ValueError):
+                raise UserError(f"Invalid stock count entry: {item!r}")
+        return result
+
+    @api.model
+    def _get_stock_count_request(self, request_id=None):
+        """طلب الجرد: المحدد، أو آخر طلب InBranch لفرع المستخدم، أو طلب جديد."""
+        if request_id:
+            try:
+                request = self.browse(int(request_id)).exists()
+            except (TypeError, ValueError):
+                request = self.browse()
+            if not request:
+                raise UserError(f"Supply request {request_id!r} not found.")
+            return request
+        branch_id = self.env.user._get_supply_roles().branch_id
+        if not branch_id:
+            raise UserError("Your user is not linked to a branch.")
+        request = self.search([('branch_id', '=', branch_id), ('status', '=', 'InBranch')],
+                              order='request_date desc, id desc', limit=1)
+        return request or self.create({'branch_id': branch_id})
+
+    @query_budget('supply_request.stock_count')
+    def apply_stock_count(self, counts):
+        """🧮 جرد كامل للفرع دفعة واحدة: ``counts`` قائمة (product_id, qty).
+
+        - التحقق من كتالوج الفرع باستعلام واحد (منتج غير معرّف أو معطّل → خطأ بكل الأسماء).
+        - الأسطر الموجودة: current_qty بتحديث SQL واحد، ثم إعادة حساب suggested_qty دفعة واحدة.
+        - المنتجات بلا سطر: إنشاء أسطرها دفعة واحدة (الكميات السالبة = غير معدود، لا تُنشأ).
+        التحقق من الصلاحيات مرة واحدة للطلب بدل write لكل سطر.
+        """
+        self.ensure_one()
+        roles = self.env.user._get_supply_roles()
+        if not roles.is_branch:
+            raise UserError("Only Branch Employee can enter stock counts.")
+        if self.status != 'InBranch':
+            raise UserError("Stock counts can only be entered while the request is in the branch.")
+        if roles.branch_id != self.branch_id.id:
+            raise UserError("You cannot enter stock counts for another branch.")
+
+        Line = self.env['custom_supply.supply_request_line']
+        primitive = Line.PRIMITIVE_CURRENT_QTY
+        qty_of = {pid: (qty if qty >= 0 else primitive) for pid, qty in self._normalize_counts(counts).items()}
+        result = {'request_id': self.id, 'name': self.name, 'updated': 0, 'created': 0, 'suggestions': []}
+        if not qty_of:
+            return result
+
+        # 1️⃣ كتالوج الفرع: استعلام واحد لكل المنتجات
+        cr = self.env.cr
+        cr.execute("""
+            SELECT product_id, id, activate
+            FROM custom_supply_branch_product
+            WHERE branch_id = %s AND product_id = ANY(%s)
+        """, (self.branch_id.id, list(qty_of)))
+        catalogue = {product_id: (bp_id, active) for product_id, bp_id, active in cr.fetchall()}
+        invalid = [pid for pid in qty_of if not catalogue.get(pid, (None, False))[1]]
+        if invalid:
+            names = ", ".join(self.env['product.product'].browse(invalid).exists().mapped('display_name'))
+            raise UserError(f"These products are not active in branch '{self.branch_id.name}': {names or invalid}")
+
+        # 2️⃣ الأسطر الموجودة: تحديث current_qty بتحديث واحد
+        Line.flush_model(['request_id', 'product_id', 'current_qty'])
+        cr.execute("""
+            SELECT product_id, id FROM custom_supply_supply_request_line WHERE request_id = %s
+        """, (self.id,))
+        line_of = dict(cr.fetchall())
+        updated = Line.browse([line_of[pid] for pid in qty_of if pid in line_of])
+        if updated:
+            cr.execute("""
+                UPDATE custom_supply_supply_request_line l
+                   SET current_qty = v.qty, write_uid = %s, write_date = now() AT TIME ZONE 'UTC'
+                  FROM unnest(%s::int[], %s::float8[]) AS v(id, qty)
+                 WHERE l.id = v.id
+            """, (self.env.uid, updated.ids, [qty_of[pid] for pid in qty_of if pid in line_of]))
+            updated.invalidate_recordset(['current_qty', 'write_uid', 'write_date'])
+            self.env.add_to_compute(Line._fields['suggested_qty'], updated)
+            updated.flush_recordset(['suggested_qty'])
+
+        # 3️⃣ المنتجات المعدودة بلا سطر: إنشاء دفعة واحدة
+        created = Line.create([{
+            'request_id': self.id,
+            'product_id': pid,
+            'branch_product_id': catalogue[pid][0],
+            'current_qty': qty,
+        } for pid, qty in qty_of.items() if pid not in line_of and qty >= 0])
+
+        lines = updated | created
+        result.update(
+            updated=len(updated),
+            created=len(created),
+            suggestions=[[line.product_id.id, line.suggested_qty] for line in lines],
+        )
+        return result
+
+    def action_open_stock_count(self):
+        """فتح شاشة الجرد (جدول بكل منتجات الفرع النشطة) للطلب."""
+        self.ensure_one()
+        wizard = self.env['custom_supply.stock_count_wizard'].create({'request_id': self.id})
+        wizard._fill_lines()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f"Stock Count – {self.name}",
+            'res_model': 'custom_supply.stock_count_wizard',
+            'res_id': wizard.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class StockCountWizard(models.TransientModel):
+    _name = "custom_supply.stock_count_wizard"
+    _description = "Branch Stock Count"
+
+    request_id = fields.Many2one('custom_supply.supply_request', string="Request", required=True, ondelete='cascade')
+    branch_id = fields.Many2one(related='request_id.branch_id', string="Branch")
+    line_ids = fields.One2many('custom_supply.stock_count_wizard_line', 'wizard_id', string="Products")
+
+    def _fill_lines(self):
+        """سطر لكل منتج نشط في الفرع: كمية السطر الحالية إن وُجد، وإلا -1 (غير معدود).
+
+        رصيد الدفتر يُعرض للمرجعية فقط، حتى لا يتحول تطبيق الجدول دون تعديل إلى جرد وأسطر جديدة.
+        """
+        self.ensure_one()
+        current_of = {line.product_id.id: line.current_qty for line in self.request_id.line_ids}
+        branch_products = self.env['custom_supply.branch_product'].search([
+            ('branch_id', '=', self.request_id.branch_id.id), ('activate', '=', True),
+        ], order='category_id, product_id')
+        self.env['custom_supply.stock_count_wizard_line'].create([{
+            'wizard_id': self.id,
+            'product_id': bp.product_id.id,
+            'stock_qty': bp.current_quantity,
+            'current_qty': current_of.get(bp.product_id.id, -1.0),
+        } for bp in branch_products])
+
+    def action_apply(self):
+        self.ensure_one()
+        result = self.request_id.apply_stock_count([(line.product_id.id, line.current_qty) for line in self.line_ids])
+        self.request_id.message_post(
+            body=f"Stock count entered by {self.env.user.name}: "
+                 f"{result['updated']} line(s) updated, {result['created']} added.")
+        return {'type': 'ir.actions.act_window_close'}
+
+
+class StockCountWizardLine(models.TransientModel):
+    _name = "custom_supply.stock_count_wizard_line"
+    _description = "Branch Stock Count Line"
+
+    wizard_id = fields.Many2one('custom_supply.stock_count_wizard', required=True, ondelete='cascade')
+    product_id = fields.Many2one('product.product', string="Product", required=True, readonly=True)
+    category_id = fields.Many2one(related='product_id.categ_id', string="Category")
+    supply_unit_id = fields.Many2one(related='product_id.product_tmpl_id.supply_unit_id', string="Unit")
+    stock_qty = fields.Float(string="Stock Balance", readonly=True, help="Branch stock according to the ledger")
+    current_qty = fields.Float(string="Counted Quantity", default=-1.0,
+                               help="Leave at -1 for products that were not counted")
@@ -3,9 +3,13 @@ import logging
 import random
 
 from odoo import models, fields, api
+from odoo.tools import html_escape
 from datetime import timedelta
 _logger = logging.getLogger(__name__)
 
+# عدد رسائل التذكير التي تُنشأ في طابور البريد دفعة واحدة
+REMINDER_CHUNK_SIZE = 100
+
 class BranchNotificationSettings(models.Model):
     _name = "custom_supply.branch_notification_settings"
     _description = "Branch Notification Settings"
@@ -21,6 +25,46 @@ class BranchNotification(models.Model):
     _name = "custom_supply.branch_notification"
     _description = "Branch Weekly Notification"
 
+    @api.model
+    def _format_hour(self, value):
+        # الساعات والدقائق معاً حتى لا تظهر 8.999 كـ 08:60
+        hours, minutes = divmod(round(value * 60), 60)
+        return f'{hours:02d}:{minutes:02d}'
+
+    @api.model
+    def _get_tomorrow_windows(self, weekday):
+        """نوافذ توريد الغد لكل الفروع باستعلام واحد: [(branch_id, name, user_id, start, end), ...]."""
+        self.env['custom_supply.branch_supply_window'].flush_model(['branch_id', 'supply_day_id', 'start_time', 'end_time'])
+        self.env.cr.execute("""
+            SELECT b.id, b.name, b.user_id, w.start_time, w.end_time
+            FROM custom_supply_branch_supply_window w
+            JOIN custom_supply_supply_day sd ON sd.id = w.supply_day_id
+            JOIN custom_supply_branch b ON b.id = w.branch_id
+            WHERE sd.day_of_week = %s
+            ORDER BY b.name, w.start_time
+        """, (weekday,))
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _build_digests(self, rows):
+        """ملخص واحد لكل مستلم: {partner: [(branch_name, start, end), ...]}.
+
+        مدير التوريد يستلم كل الفروع، ومسؤول الفرع يستلم فرعه فقط.
+        """
+        managers = self.env.ref('custom_supply.group_supply_manager').users.partner_id
+        branch_users = self.env['res.users'].browse({r[2] for r in rows if r[2]})
+        user_partner = {u.id: u.partner_id for u in branch_users}
+
+        digests = {}
+        for _branch_id, name, user_id, start, end in rows:
+            line = (name, start, end)
+            for partner in managers:
+                digests.setdefault(partner, []).append(line)
+            partner = user_partner.get(user_id)
+            if partner and partner not in managers:
+                digests.setdefault(partner, []).append(line)
+        return digests
+
     @api.model
     def send_weekly_notifications(self, force_send=False):
         settings_active = self.env['custom_supply.branch_notification_settings'].get_active()
@@ -29,34 +73,49 @@ class BranchNotification(models.Model):
 
         today = fields.Date.context_today(self)
         tomorrow = today + timedelta(days=1)
-        tomorrow_weekday = tomorrow.weekday()
 
-        # الفروع التي يجب توريدها غداً
-        branches_tomorrow = self.env['custom_supply.branch'].search([]).filtered(
-            lambda b: tomorrow_weekday in b.windows_ids.mapped('supply_day_id.day_of_week')
-        )
+        # الفروع التي يجب توريدها غداً مع أوقات نوافذها الفعلية
+        rows = self._get_tomorrow_windows(tomorrow.weekday())
+        if not rows:
+            return
 
-        for branch in branches_tomorrow:
-            # شركاء المستلمين
-            partners = self.env.ref('custom_supply.group_supply_manager').users.mapped('partner_id')
-            if branch.user_id and branch.user_id.partner_id:
-                partners |= branch.user_id.partner_id
-
-            if not partners:
-                continue
-
-            self.env['mail.message'].create({
-                'subject': f'تذكير توريد الفرع غداً: {branch.name}',
-                'body': (
-                    f'⚠️ تذكير !!\n'
-                    f'يجب أن يتم توريد الفرع "{branch.name}" غداً بين '
-                    f'{int(branch.supply_time_from):02d}:{int((branch.supply_time_from%1*60)):02d} و '
-                    f'{int(branch.supply_time_to):02d}:{int((branch.supply_time_to%1*60)):02d}.'
-                ),
-                'message_type': 'notification',
-                'subtype_id': self.env.ref('mail.mt_comment').id,
-                'partner_ids': [(6, 0, partners.ids)]
-            })
+        subject = f'تذكير توريد الأفرع غداً ({tomorrow})'
+        mt_comment = self.env.ref('mail.mt_comment').id
+        mail_vals, inbox_vals = [], []
+        for partner, lines in self._build_digests(rows).items():
+            items = ''.join(
+                f'<li>{html_escape(name)}: {self._format_hour(start)} - {self._format_hour(end)}</li>'
+                for name, start, end in lines
+            )
+            body = f'<p>⚠️ تذكير !!</p><p>يجب توريد الأفرع التالية غداً ضمن الأوقات المحددة:</p><ul>{items}</ul>'
+            if partner.email:
+                mail_vals.append({
+                    'subject': subject,
+                    'body_html': body,
+                    'recipient_ids': [(6, 0, partner.ids)],
+                    'auto_delete': True,
+                })
+            else:
+                # بلا بريد إلكتروني: إشعار داخل Odoo كما كان سابقاً
+                inbox_vals.append({
+                    'subject': subject,
+                    'body': body,
+                    'message_type': 'notification',
+                    'subtype_id': mt_comment,
+                    'partner_ids': [(6, 0, partner.ids)],
+                    'notification_ids': [(0, 0, {'res_partner_id': partner.id, 'notification_type': 'inbox'})],
+                })
+
+        # إرسال عبر طابور البريد على دفعات بدل رسالة لكل فرع
+        Mail = self.env['mail.mail'].sudo()
+        for i in range(0, len(mail_vals), REMINDER_CHUNK_SIZE):
+            Mail.create(mail_vals[i:i + REMINDER_CHUNK_SIZE])
+        if mail_vals:
+            self.env.ref('mail.ir_cron_mail_scheduler_action')._trigger()
+        if inbox_vals:
+            self.env['mail.message'].sudo().create(inbox_vals)
+        _logger.info("Branch reminders: %s branches, %s digests queued, %s in-app",
+                     len({r[0] for r in rows}), len(mail_vals), len(inbox_vals))
 
 class SupplyBranch(models.Model):
     _inherit = "custom_supply.branch"
@@ -64,6 +123,30 @@ class SupplyBranch(models.Model):
     product_ids = fields.One2many('custom_supply.branch_product','branch_id',string="Products in Branch")
     search_product = fields.Char(string="Search Product",help="Filter products by name or category",store=False,)
 
+    # ==============================
+    # Roles snapshot invalidation
+    # ==============================
+    # res.users._get_supply_roles يحمل فرع المستخدم في الـ ormcache
+    @api.model_create_multi
+    def create(self, vals_list):
+        branches = super().create(vals_list)
+        if any(vals.get('user_id') for vals in vals_list):
+            self.env.registry.clear_cache()
+        return branches
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'user_id' in vals:
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        had_users = any(self.mapped('user_id'))
+        res = super().unlink()
+        if had_users:
+            self.env.registry.clear_cache()
+        return res
+
     # ==============================
     # Sync Branch Products
     # ==============================
@@ -6,6 +6,8 @@ from odoo.exceptions import UserError
 from lxml import etree
 import logging
 
+from .query_budget import query_budget
+
 _logger = logging.getLogger(__name__)
 
 LATE_DELAY = timedelta(hours=24)
@@ -55,29 +57,11 @@ class SupplyRequest(models.Model):
     # ============================
     @api.depends('branch_id', 'request_date')
     def _compute_expected_delivery_date(self):
-        now = fields.Datetime.now()
+        # أول تكرار نافذة قادم لكل فرع (استعلام واحد على جدول التكرارات بتوقيت UTC)
+        next_start = self.env['custom_supply.supply_window_occurrence'].sudo()._next_start_by_branch(
+            self.branch_id.ids, fields.Datetime.now())
         for rec in self:
-            rec.expected_delivery_date = False
-            if not rec.branch_id:
-                continue
-
-            # جلب كل النوافذ للفرع الحالي
-            windows = self.env['custom_supply.branch_supply_window'].search([
-                ('branch_id', '=', rec.branch_id.id)
-            ])
-
-            # تحويل start_datetime_display إلى datetime object
-            future_windows = []
-            for w in windows:
-                if w.start_datetime_display:
-                    dt = fields.Datetime.from_string(w.start_datetime_display)
-                    if dt >= now:
-                        future_windows.append((dt, w.end_datetime_display))
-
-            if future_windows:
-                # اختيار أول نافذة مستقبلية
-                future_windows.sort(key=lambda x: x[0])
-                rec.expected_delivery_date = future_windows[0][0]
+            rec.expected_delivery_date = next_start.get(rec.branch_id.id, False)
 
     # ============================
     # Compute Late Status
@@ -85,6 +69,11 @@ class SupplyRequest(models.Model):
     @api.depends('request_date','supply_confirm_date','warehouse_export_date','received_date','status')
     def _compute_late_status(self):
         now = fields.Datetime.now()
+        # الطلبات المستلمة داخل نافذة توريد، دفعة واحدة لكل السجلات
+        on_time = self.env['custom_supply.supply_window_occurrence'].sudo()._on_time_keys([
+            (rec.branch_id.id, rec.received_date) for rec in self
+            if rec.status in ['OnRoad', 'Done'] and rec.warehouse_export_date and rec.received_date
+        ])
 
         for rec in self:
             late_supply = False
@@ -117,26 +106,7 @@ class SupplyRequest(models.Model):
             # 3️⃣ Late Delivery (Day + Time Window)
             # ----------------------------------------
             if rec.status in ['OnRoad', 'Done'] and rec.warehouse_export_date and rec.received_date:
-
-                received_weekday = rec.received_date.weekday()
-
-                windows = self.env['custom_supply.branch_supply_window'].search([
-                    ('branch_id', '=', rec.branch_id.id)
-                ])
-
-                allowed_days = windows.mapped('supply_day_id.day_of_week')
-
-                if received_weekday not in allowed_days:
-                    late_delivery = True
-                else:
-                    todays_windows = windows.filtered(
-                        lambda w: w.supply_day_id.day_of_week == received_weekday
-                    )
-                    match = todays_windows.filtered(
-                        lambda w: w.start_datetime_display <= rec.received_date <= w.end_datetime_display
-                    )
-                    if not match:
-                        late_delivery = True
+                late_delivery = (rec.branch_id.id, rec.received_date) not in on_time
 
 
             # ----------------------------------------
@@ -165,6 +135,7 @@ class SupplyRequest(models.Model):
             })
 
     @api.model
+    @query_budget('supply_request.late_cron')
     def cron_check_late_requests(self):
         """
         Cron job that sends late notifications for:
@@ -313,11 +284,7 @@ class SupplyRequest(models.Model):
     # ============================
     @api.model
     def _default_branch(self):
-        user = self.env.user
-        if getattr(user, 'branch_id', False):
-            return user.branch_id.id
-        branch = self.env['custom_supply.branch'].search([('user_id', '=', user.id)], limit=1)
-        return branch.id if branch else False
+        return self.env.user._get_supply_roles().branch_id or False
 
     # ============================
     # Default_get
@@ -342,6 +309,7 @@ class SupplyRequest(models.Model):
     # Create
     # ============================
     @api.model_create_multi
+    @query_budget('supply_request.create', count=lambda self, vals_list: len(vals_list))
     def create(self, vals_list):
         seq_code = 'custom_supply.supply_request'
         seq = self.env['ir.sequence'].search([('code', '=', seq_code)], limit=1)
@@ -424,7 +392,8 @@ class SupplyRequest(models.Model):
                 prod = product_map.get(bp.product_id.id)
                 lines.append((0, 0, {
                     'product_id': bp.product_id.id,
-                    'current_qty': float(bp.current_quantity or -1.0),
+                    # رصيد دفتر المخزون إن كان معروفاً، وإلا القيمة البدائية
+                    'current_qty': bp._stock_for_request(),
                     'suggested_qty': getattr(bp, 'max_quantity', 0.0) or 0.0,
                     'requested_qty': 0.0,
                     'branch_product_id': bp.id,
@@ -518,6 +487,7 @@ class SupplyRequest(models.Model):
     # ============================
     # Actions
     # ============================
+    @query_budget('supply_request.submit')
     def action_submit_request(self):
         for rec in self:
             _logger.info("Export START for request %s (id=%s). lines_before=%s", rec.name, rec.id, len(rec.line_ids))
@@ -528,11 +498,10 @@ class SupplyRequest(models.Model):
                 continue
 
             if rec.status == 'InBranch':
-                for line in rec.line_ids:
-                    line._compute_suggested_qty()
-                    line.supply_qty = line.suggested_qty or 0.0
+                # إعادة حساب الاقتراح لكل الأسطر دفعة واحدة ثم نسخه إلى supply_qty بتحديث واحد
+                rec.line_ids._set_supply_from_suggestion()
 
-            if not self.env.user.has_group('custom_supply.group_branch_employee'):
+            if not self.env.user._get_supply_roles().is_branch:
                 raise UserError("Only Branch Employee can submit this request.")
             if not rec.line_ids:
                 raise UserError("Cannot submit an empty request. Please add products before submitting.")
@@ -543,6 +512,7 @@ class SupplyRequest(models.Model):
             _logger.info("Export END for request %s (id=%s). lines_after=%s", rec.name, rec.id, len(rec.line_ids))
         return True
 
+    @query_budget('supply_request.mark_in_warehouse')
     def action_mark_in_warehouse(self):
         for rec in self:
             if self.env.context.get('from_order_tracking'):
@@ -551,7 +521,7 @@ class SupplyRequest(models.Model):
             if rec.status != 'Supply':
                 continue
 
-            if not self.env.user.has_group('custom_supply.group_supply_manager'):
+            if not self.env.user._get_supply_roles().is_supply:
                 raise UserError("Only Supply Manager can confirm this stage.")
 
             # ============================================================
@@ -594,6 +564,7 @@ class SupplyRequest(models.Model):
 
         return True
 
+    @query_budget('supply_request.export')
     def action_export(self):
         # SmartEngine = self.env['custom_supply.smart_engine']
         #
@@ -630,24 +601,27 @@ class SupplyRequest(models.Model):
         # # أخيراً
         # self.write({"state": "done"})
 
-        for rec in self:
-            if self.env.context.get('from_order_tracking'):
-                raise UserError("This action is disabled in Order Tracking view.")
-
-            if rec.status != 'InWarehouse':
-                continue
-            if not self.env.user.has_group('custom_supply.group_warehouse_employee'):
-                raise UserError("Only Warehouse Employee can export this request.")
+        if self and self.env.context.get('from_order_tracking'):
+            raise UserError("This action is disabled in Order Tracking view.")
 
-            rec.warehouse_user_id = self.env.user.id
-            rec.warehouse_export_date = fields.Datetime.now()
+        to_export = self.filtered(lambda r: r.status == 'InWarehouse')
+        if not to_export:
+            return True
+        if not self.env.user._get_supply_roles().is_warehouse:
+            raise UserError("Only Warehouse Employee can export this request.")
 
-            # تغيير الحالة باستخدام write مع context
-            rec.with_context(allow_status_change=True).write({'status': 'OnRoad'})
+        # كتابة واحدة لكل الطلبات (طلب واحد أو موجة تجهيز كاملة) بدل كتابة لكل سجل
+        to_export.with_context(allow_status_change=True).write({
+            'warehouse_user_id': self.env.user.id,
+            'warehouse_export_date': fields.Datetime.now(),
+            'status': 'OnRoad',
+        })
 
+        for rec in to_export:
             rec.message_post(body=f"Supply Request '{rec.name}' exported by {self.env.user.name} and marked as On Road.")
         return True
 
+    @query_budget('supply_request.order_received')
     def action_order_received(self):
         user = self.env.user
 
@@ -661,7 +635,7 @@ class SupplyRequest(models.Model):
             if rec.status != 'OnRoad':
                 continue
 
-            if not user.has_group('custom_supply.group_branch_employee'):
+            if not user._get_supply_roles().is_branch:
                 raise UserError("Only Branch Employee can submit this request.")
 
             if not rec.line_ids:
@@ -687,31 +661,11 @@ class SupplyRequest(models.Model):
             # --------------------------
             # 2) Late Delivery Check (same logic as compute method)
             # --------------------------
-            late_delivery = False
             received_dt = rec.received_date
+            Occurrence = rec.env['custom_supply.supply_window_occurrence'].sudo()
 
-            windows = rec.env['custom_supply.branch_supply_window'].search([
-                ('branch_id', '=', rec.branch_id.id)
-            ])
-
-            if not windows:
-                # If no defined windows: treat as late
-                late_delivery = True
-            else:
-                received_weekday = received_dt.weekday()
-                allowed_days = windows.mapped('supply_day_id.day_of_week')
-
-                if received_weekday not in allowed_days:
-                    late_delivery = True
-                else:
-                    todays_windows = windows.filtered(
-                        lambda w: w.supply_day_id.day_of_week == received_weekday
-                    )
-                    match = todays_windows.filtered(
-                        lambda w: w.start_datetime_display <= received_dt <= w.end_datetime_display
-                    )
-                    if not match:
-                        late_delivery = True
+            # No occurrence covering the reception time (or no window at all) → late
+            late_delivery = not Occurrence._on_time_keys([(rec.branch_id.id, received_dt)])
 
             # --------------------------
             # 3) If late → send chatter notification ONCE
@@ -719,13 +673,11 @@ class SupplyRequest(models.Model):
             if late_delivery and not rec.delivery_late_notified:
 
                 # Build allowed windows description
-                day_windows = windows.filtered(
-                    lambda w: w.supply_day_id.day_of_week == received_dt.weekday()
-                )
+                day_windows = Occurrence._occurrences_on_day(rec.branch_id.id, received_dt)
 
                 if day_windows:
                     win_desc = ", ".join([
-                        f"{w.start_datetime_display} → {w.end_datetime_display}"
+                        f"{w.start_datetime} → {w.end_datetime}"
                         for w in day_windows
                     ])
                 else:
@@ -769,20 +721,20 @@ class SupplyRequest(models.Model):
         if not tab:
             return []
 
-        branch = getattr(user, 'branch_id', False)
-
-        # Identify roles
-        is_branch = user.has_group('custom_supply.group_branch_employee')
-        is_supply = user.has_group('custom_supply.group_supply_manager')
-        is_warehouse = user.has_group('custom_supply.group_warehouse_employee')
-        is_high = user.has_group('custom_supply.group_high_manager')
+        # Identify roles (cached snapshot)
+        roles = user._get_supply_roles()
+        branch_id = roles.branch_id or 0
+        is_branch = roles.is_branch
+        is_supply = roles.is_supply
+        is_warehouse = roles.is_warehouse
+        is_high = roles.is_high
 
         # =============== Branch Employee ==================
         if is_branch:
             if tab == 'supply_request':
-                return [('branch_id', '=', branch.id if branch else 0), ('status', '=', 'InBranch')]
+                return [('branch_id', '=', branch_id), ('status', '=', 'InBranch')]
             elif tab == 'order_tracking':
-                return [('branch_id', '=', branch.id if branch else 0), ('status', 'in', ['Supply', 'InWarehouse', 'Done'])]
+                return [('branch_id', '=', branch_id), ('status', 'in', ['Supply', 'InWarehouse', 'Done'])]
             else:
                 return [('id', '=', 0)]
 
@@ -827,11 +779,11 @@ class SupplyRequest(models.Model):
             return domain
 
         # 🔹 إذا اليوزر Branch Employee
-        if user.has_group('custom_supply.group_branch_employee'):
-            branch_id = getattr(user, 'branch_id', False)
-            if branch_id:
+        roles = user._get_supply_roles()
+        if roles.is_branch:
+            if roles.branch_id:
                 # تطبيق الفلترة على الطلبات حسب الفرع
-                domain += [('branch_id', '=', branch_id.id)]
+                domain += [('branch_id', '=', roles.branch_id)]
             else:
                 domain += [('id', '=', 0)]  # لا يعرض أي طلب إذا لا يوجد فرع
 
@@ -873,8 +825,9 @@ class SupplyRequest(models.Model):
         res = super().fields_view_get(view_id=view_id, view_type=view_type, toolbar=toolbar, submenu=submenu)
         context = self.env.context or {}
         user = self.env.user
-        if context.get("from_order_tracking") and user.has_group("custom_supply.group_branch_employee"):
-            branch_id = user.branch_id.id if user.branch_id else False
+        roles = user._get_supply_roles() if context.get("from_order_tracking") else None
+        if roles and roles.is_branch:
+            branch_id = roles.branch_id
             if branch_id:
                 doc = etree.XML(res['arch'])
                 if view_type in ('kanban', 'tree'):
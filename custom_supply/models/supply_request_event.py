@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+# أساس مقاطع المدرّج اللوغاريتمي: المقطع k يغطي (γ^(k-1), γ^k] ثانية،
+# والقيمة الممثلة 2γ^k / (γ+1) بخطأ نسبي أقل من (γ-1)/(γ+1) ≈ 2.4%
+BUCKET_GAMMA = 1.05
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def _status_selection(self):
+    return self.env['custom_supply.supply_request']._fields['status'].selection
+
+
+# تجميع صفوف (stage, branch_id, week, dwell_seconds) من {source} في المدرّج والملخص الأسبوعي
+_AGGREGATE_SQL = """
+    WITH {source},
+    staged AS (
+        SELECT stage, branch_id, week, dwell_seconds,
+               GREATEST(0, CEIL(LN(GREATEST(dwell_seconds, 1)) / LN(%(gamma)s)))::int AS bucket
+        FROM src
+        WHERE stage IS NOT NULL AND dwell_seconds IS NOT NULL
+    ),
+    buckets AS (
+        INSERT INTO custom_supply_supply_stage_dwell_bucket AS d (stage, branch_id, week, bucket, count)
+        SELECT stage, branch_id, week, bucket, COUNT(*)
+        FROM staged
+        GROUP BY stage, branch_id, week, bucket
+        ON CONFLICT (stage, branch_id, week, bucket) DO UPDATE SET count = d.count + EXCLUDED.count
+    )
+    INSERT INTO custom_supply_supply_stage_stat AS s (stage, branch_id, week, count, total_seconds, max_seconds)
+    SELECT stage, branch_id, week, COUNT(*), SUM(dwell_seconds), MAX(dwell_seconds)
+    FROM staged
+    GROUP BY stage, branch_id, week
+    ON CONFLICT (stage, branch_id, week) DO UPDATE SET
+        count = s.count + EXCLUDED.count,
+        total_seconds = s.total_seconds + EXCLUDED.total_seconds,
+        max_seconds = GREATEST(s.max_seconds, EXCLUDED.max_seconds)
+    RETURNING s.id
+"""
+
+
+class SupplyRequestEvent(models.Model):
+    """سجل انتقالات حالة طلب التوريد (إضافة فقط).
+
+    كل تغيير لـ status (كل دوال action_*) يضيف سطراً: من، إلى، المستخدم، الوقت،
+    والمدة التي قضاها الطلب في الحالة السابقة. الملخص الأسبوعي يُحدَّث مع كل إضافة.
+    """
+    _name = "custom_supply.supply_request_event"
+    _description = "Supply Request Lifecycle Event"
+    _order = "event_date desc, id desc"
+    _rec_name = "request_id"
+    _log_access = False
+
+    request_id = fields.Many2one('custom_supply.supply_request', string="Request", required=True,
+                                 ondelete='cascade', readonly=True)
+    branch_id = fields.Many2one('custom_supply.branch', string="Branch", readonly=True, index=True)
+    from_status = fields.Selection(_status_selection, string="From", readonly=True)
+    to_status = fields.Selection(_status_selection, string="To", required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string="User", readonly=True)
+    event_date = fields.Datetime(string="Date", required=True, readonly=True)
+    week = fields.Date(string="Week", readonly=True)
+    dwell_seconds = fields.Float(string="Time in Previous Status (s)", readonly=True)
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS custom_supply_supply_request_event_request_date_idx
+            ON custom_supply_supply_request_event (request_id, event_date)
+        """)
+
+    def write(self, vals):
+        raise UserError("Supply request events are append-only.")
+
+    def unlink(self):
+        raise UserError("Supply request events are append-only.")
+
+    # ============================
+    # Logging
+    # ============================
+    @api.model
+    def _log_transitions(self, transitions, to_status):
+        """➕ سطر لكل (request_id, from_status) واحتساب مدته في الملخص، باستعلامين.
+
+        المدة = من آخر حدث للطلب (أو تاريخ الطلب) حتى الآن.
+        """
+        if not transitions:
+            return
+        self.env['custom_supply.supply_request'].flush_model(['branch_id', 'request_date'])
+        self.env.cr.execute(_AGGREGATE_SQL.format(source="""
+            src AS (
+                INSERT INTO custom_supply_supply_request_event
+                    (request_id, branch_id, from_status, to_status, user_id, event_date, week, dwell_seconds)
+                SELECT r.id, r.branch_id, v.from_status, %(to_status)s, %(uid)s, %(now)s,
+                       date_trunc('week', %(now)s::timestamp)::date,
+                       CASE WHEN v.from_status IS NOT NULL THEN EXTRACT(EPOCH FROM %(now)s::timestamp - COALESCE(
+                           (SELECT MAX(e.event_date) FROM custom_supply_supply_request_event e
+                             WHERE e.request_id = r.id),
+                           r.request_date, %(now)s::timestamp)) END
+                FROM unnest(%(ids)s::int[], %(from)s::varchar[]) AS v(id, from_status)
+                JOIN custom_supply_supply_request r ON r.id = v.id
+                RETURNING from_status AS stage, branch_id, week, dwell_seconds
+            )
+        """), {
+            'gamma': BUCKET_GAMMA,
+            'to_status': to_status,
+            'uid': self.env.uid,
+            'now': fields.Datetime.now(),
+            'ids': [t[0] for t in transitions],
+            'from': [t[1] or None for t in transitions],
+        })
+        self.env['custom_supply.supply_stage_stat']._refresh_percentiles([r[0] for r in self.env.cr.fetchall()])
+        self.env['custom_supply.supply_stage_dwell_bucket'].invalidate_model()
+        self.invalidate_model()
+
+    # ============================
+    # Backfill / Rebuild
+    # ============================
+    @api.model
+    def _backfill_from_dates(self):
+        """أحداث تقريبية للطلبات القديمة من حقول التواريخ (بدون سجل انتقالات).
+
+        وقت الإرسال (InBranch → Supply) غير محفوظ، لذلك مرحلة Supply تبدأ من تاريخ الطلب.
+        """
+        self.env['custom_supply.supply_request'].flush_model()
+        self.env.cr.execute("""
+            INSERT INTO custom_supply_supply_request_event
+                (request_id, branch_id, from_status, to_status, user_id, event_date, week, dwell_seconds)
+            SELECT id, branch_id, from_status, to_status, user_id, event_at, date_trunc('week', event_at)::date,
+                   EXTRACT(EPOCH FROM event_at - LAG(event_at) OVER (PARTITION BY id ORDER BY seq))
+            FROM (
+                SELECT r.id, r.branch_id, t.seq, t.from_status, t.to_status, t.user_id, t.event_at
+                FROM custom_supply_supply_request r
+                CROSS JOIN LATERAL (VALUES
+                    (0, NULL::varchar, 'InBranch'::varchar, r.create_uid, r.request_date),
+                    (1, 'Supply', 'InWarehouse', r.supply_manager_id, r.supply_confirm_date),
+                    (2, 'InWarehouse', 'OnRoad', r.warehouse_user_id, r.warehouse_export_date),
+                    (3, 'OnRoad', 'Done', r.received_user_id, r.received_date)
+                ) AS t(seq, from_status, to_status, user_id, event_at)
+                WHERE t.event_at IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM custom_supply_supply_request_event e WHERE e.request_id = r.id)
+            ) AS history
+        """)
+        self.invalidate_model()
+
+    @api.model
+    def action_rebuild_stats(self):
+        """بناء كامل للمدرّج والملخص من كل الأحداث (بعد التثبيت أو لإصلاح البيانات)."""
+        self._backfill_from_dates()
+        cr = self.env.cr
+        cr.execute("DELETE FROM custom_supply_supply_stage_dwell_bucket")
+        cr.execute("DELETE FROM custom_supply_supply_stage_stat")
+        cr.execute(_AGGREGATE_SQL.format(source="""
+            src AS (
+                SELECT from_status AS stage, branch_id, week, dwell_seconds
+                FROM custom_supply_supply_request_event
+            )
+        """), {'gamma': BUCKET_GAMMA})
+        self.env['custom_supply.supply_stage_stat']._refresh_percentiles([r[0] for r in cr.fetchall()])
+        self.env['custom_supply.supply_stage_dwell_bucket'].invalidate_model()
+        return True
+
+
+class SupplyStageDwellBucket(models.Model):
+    """مدرّج مدة البقاء لكل (مرحلة، فرع، أسبوع): عدد الأحداث في كل مقطع لوغاريتمي."""
+    _name = "custom_supply.supply_stage_dwell_bucket"
+    _description = "Supply Stage Dwell Histogram Bucket"
+    _log_access = False
+
+    stage = fields.Selection(_status_selection, required=True)
+    branch_id = fields.Many2one('custom_supply.branch', ondelete='cascade')
+    week = fields.Date(required=True)
+    bucket = fields.Integer(required=True)
+    count = fields.Integer(default=0)
+
+    _sql_constraints = [
+        ('bucket_uniq', 'unique(stage, branch_id, week, bucket)', 'One histogram bucket per stage, branch and week.'),
+    ]
+
+
+class SupplyStageStat(models.Model):
+    """ملخص أسبوعي لمدة البقاء في كل مرحلة لكل فرع: العدد، المتوسط، p50 / p90 / p99، الأقصى.
+
+    الأسبوع هو أسبوع خروج الطلب من المرحلة.
+    """
+    _name = "custom_supply.supply_stage_stat"
+    _description = "Supply Stage Dwell Time per Branch and Week"
+    _order = "week desc, branch_id, stage"
+    _rec_name = "branch_id"
+    _log_access = False
+
+    stage = fields.Selection(_status_selection, string="Stage", required=True, readonly=True)
+    branch_id = fields.Many2one('custom_supply.branch', string="Branch", readonly=True, ondelete='cascade')
+    week = fields.Date(string="Week", required=True, readonly=True)
+    count = fields.Integer(string="Requests", readonly=True)
+    total_seconds = fields.Float(string="Total (s)", readonly=True)
+    max_seconds = fields.Float(string="Max (s)", readonly=True)
+    avg_hours = fields.Float(string="Average (h)", digits=(16, 2), readonly=True, group_operator='avg')
+    p50_hours = fields.Float(string="p50 (h)", digits=(16, 2), readonly=True, group_operator='avg')
+    p90_hours = fields.Float(string="p90 (h)", digits=(16, 2), readonly=True, group_operator='avg')
+    p99_hours = fields.Float(string="p99 (h)", digits=(16, 2), readonly=True, group_operator='avg')
+    max_hours = fields.Float(string="Max (h)", digits=(16, 2), readonly=True, group_operator='max')
+
+    _sql_constraints = [
+        ('stat_uniq', 'unique(stage, branch_id, week)', 'One summary per stage, branch and week.'),
+    ]
+
+    @api.model
+    def _refresh_percentiles(self, stat_ids):
+        """📊 إعادة حساب المتوسط والنسب المئوية للصفوف المعدّلة فقط، من مدرّجها."""
+        if not stat_ids:
+            return
+        self.env.cr.execute("""
+            WITH b AS (
+                SELECT s.id AS stat_id, d.bucket,
+                       SUM(d.count) OVER (PARTITION BY s.id ORDER BY d.bucket) AS cum,
+                       SUM(d.count) OVER (PARTITION BY s.id) AS total
+                FROM custom_supply_supply_stage_stat s
+                JOIN custom_supply_supply_stage_dwell_bucket d
+                  ON d.stage = s.stage AND d.branch_id IS NOT DISTINCT FROM s.branch_id AND d.week = s.week
+                WHERE s.id = ANY(%(ids)s)
+            ),
+            p AS (
+                SELECT stat_id,
+                       MIN(bucket) FILTER (WHERE cum >= %(q1)s * total) AS b1,
+                       MIN(bucket) FILTER (WHERE cum >= %(q2)s * total) AS b2,
+                       MIN(bucket) FILTER (WHERE cum >= %(q3)s * total) AS b3
+                FROM b
+                GROUP BY stat_id
+            )
+            UPDATE custom_supply_supply_stage_stat s
+               SET avg_hours = s.total_seconds / GREATEST(s.count, 1) / 3600.0,
+                   p50_hours = 2 * power(%(gamma)s, p.b1) / (%(gamma)s + 1) / 3600.0,
+                   p90_hours = 2 * power(%(gamma)s, p.b2) / (%(gamma)s + 1) / 3600.0,
+                   p99_hours = 2 * power(%(gamma)s, p.b3) / (%(gamma)s + 1) / 3600.0,
+                   max_hours = s.max_seconds / 3600.0
+              FROM p
+             WHERE s.id = p.stat_id
+        """, {
+            'ids': list(stat_ids),
+            'gamma': BUCKET_GAMMA,
+            'q1': PERCENTILES[0],
+            'q2': PERCENTILES[1],
+            'q3': PERCENTILES[2],
+        })
+        self.invalidate_model()
+
+
+class SupplyRequest(models.Model):
+    _inherit = "custom_supply.supply_request"
+
+    event_ids = fields.One2many('custom_supply.supply_request_event', 'request_id', string="Lifecycle Events")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        requests = super().create(vals_list)
+        for status in set(requests.mapped('status')):
+            self.env['custom_supply.supply_request_event'].sudo()._log_transitions(
+                [(r.id, False) for r in requests if r.status == status], status)
+        return requests
+
+    def write(self, vals):
+        if 'status' not in vals:
+            return super().write(vals)
+        previous = [(rec.id, rec.status) for rec in self]
+        res = super().write(vals)
+        self.env['custom_supply.supply_request_event'].sudo()._log_transitions(
+            [(rid, status) for rid, status in previous if status != vals['status']], vals['status'])
+        return res
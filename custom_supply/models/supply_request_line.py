@@ -8,6 +8,7 @@ from odoo.exceptions import UserError
 class SupplyRequestLine(models.Model):
     _name = "custom_supply.supply_request_line"
     _description = "Supply Request Line"
+    _order = "sequence, id"
 
     PRIMITIVE_CURRENT_QTY = -1.0
 
@@ -16,16 +17,21 @@ class SupplyRequestLine(models.Model):
     # ==============================================================
 
     request_id = fields.Many2one('custom_supply.supply_request',string="Request",ondelete='cascade')
-    branch_id = fields.Many2one(string='Branch',related='request_id.branch_id',store=True,readonly=True)
-    request_date = fields.Datetime(related="request_id.request_date",store=True,readonly=True)
-    request_name = fields.Char(string="Request Number",related="request_id.name",store=True,readonly=True)
-    allowed_product_ids = fields.Many2many('product.product',string='Allowed Products',compute='_compute_allowed_products',store=True)
-    product_id = fields.Many2one('product.product',string="Product",required=True,)
-    category_id = fields.Many2one('product.category',string="Category",related='product_id.categ_id',store=True,readonly=True)
+    # ترتيب السطر داخل الطلب (Category → Name)، يُحسب مرة واحدة لكل طلب عند الإضافة
+    sequence = fields.Integer(string="Sequence", default=0, readonly=True)
+    # الحقول المحسوبة المخزنة تُحسب قبل الإدراج (precompute): أسطر الطلب تُنشأ بـ INSERT واحد
+    # بدل UPDATE لاحق لكل سطر (القيم تختلف من سطر لآخر فلا تُجمع في تحديث واحد)
+    branch_id = fields.Many2one(string='Branch',related='request_id.branch_id',store=True,readonly=True,precompute=True)
+    request_date = fields.Datetime(related="request_id.request_date",store=True,readonly=True,precompute=True)
+    request_name = fields.Char(string="Request Number",related="request_id.name",store=True,readonly=True,precompute=True)
+    # المنتجات المسموحة تُقرأ من كتالوج الفرع النشط (فهرس جزئي على branch_product) بدل نسخة مخزنة لكل سطر
+    product_id = fields.Many2one('product.product',string="Product",required=True,
+                                 domain="[('supply_branch_product_ids', 'any', [('branch_id', '=', branch_id), ('activate', '=', True)])]")
+    category_id = fields.Many2one('product.category',string="Category",related='product_id.categ_id',store=True,readonly=True,precompute=True)
     unit_name = fields.Char(string="Unit", readonly=True, store=True)
     display_unit_name = fields.Char(string="Unit", readonly=True, store=True)
     current_qty = fields.Float(string="Current Quantity",required=True, default=PRIMITIVE_CURRENT_QTY, store=True)
-    suggested_qty = fields.Float(string="Suggested Quantity",compute="_compute_suggested_qty",store=True)
+    suggested_qty = fields.Float(string="Suggested Quantity",compute="_compute_suggested_qty",store=True,precompute=True)
     suggested_qty_training = fields.Float(string="Suggested Qty For Training",help="Quantity used by the smart engine for machine learning instead of suggested_qty.")
     requested_qty = fields.Float(string="Requested Quantity",required=True,default=0.0)
     received_qty = fields.Float(string="Received Quantity", default=0.0)
@@ -57,26 +63,21 @@ class SupplyRequestLine(models.Model):
                 )
 
     # ==============================================================
-    # Compute Allowed Products per Branch
+    # Allowed Products per Branch
     # ==============================================================
-    @api.depends('request_id.branch_id')
-    def _compute_allowed_products(self):
-        Product = self.env['product.product']
-        for rec in self:
-            branch = rec.request_id.branch_id if rec.request_id else self.env.context.get('branch_id')
-            if branch:
-                rec.allowed_product_ids = branch.product_ids.filtered('activate').mapped('product_id') or Product
-            else:
-                rec.allowed_product_ids = Product
-
-    @api.onchange('request_id')
-    def _onchange_request_id(self):
-        for rec in self:
-            branch = rec.request_id.branch_id if rec.request_id else self.env.context.get('branch_id')
-            if branch:
-                rec.allowed_product_ids = branch.product_ids.filtered('activate').mapped('product_id')
-            else:
-                rec.allowed_product_ids = self.env['product.product']
+    def init(self):
+        # جدول العلاقة القديم لـ allowed_product_ids (نسخة من كتالوج الفرع لكل سطر) لم يعد مستخدماً
+        self.env.cr.execute("DROP TABLE IF EXISTS custom_supply_supply_request_line_product_product_rel")
+        # أسطر الطلبات المفتوحة من قبل حقل sequence (كلها 0) تُرقَّم مرة واحدة حتى يعمل _order
+        self.env.cr.execute("""
+            SELECT DISTINCT l.request_id
+            FROM custom_supply_supply_request_line l
+            JOIN custom_supply_supply_request r ON r.id = l.request_id
+            WHERE COALESCE(l.sequence, 0) = 0 AND r.status != 'Done'
+        """)
+        request_ids = [row[0] for row in self.env.cr.fetchall()]
+        if request_ids:
+            self._resequence_requests(self.env['custom_supply.supply_request'].browse(request_ids))
 
 
     # ==============================================================
@@ -102,6 +103,13 @@ class SupplyRequestLine(models.Model):
 
     @api.depends('product_id', 'current_qty', 'request_id.branch_id')
     def _compute_suggested_qty(self):
+        missing = self.filtered(lambda l: not l.branch_product_id and l.product_id and l.request_id.branch_id)
+        bp_map = self._get_branch_product_map(
+            [(l.request_id.branch_id.id, l.product_id.id) for l in missing]
+        ) if missing else {}
+        # الحد الأعلى المتنبأ به (جدول التنبؤ الليلي) لكل منتجات الفروع في الدفعة، قراءة واحدة
+        bp_ids = set(self.branch_product_id.ids) | {bp.id for bp in bp_map.values()}
+        forecast_max = self.env['custom_supply.branch_product_forecast'].sudo()._get_max_qty_map(bp_ids)
         for line in self:
             # أي قيمة سالبة → تحويلها إلى القيمة البدائية
             if line.current_qty < 0:
@@ -117,13 +125,12 @@ class SupplyRequestLine(models.Model):
                 line.suggested_qty = 0.0
                 continue
 
-            branch_product = self.env['custom_supply.branch_product'].search([
-                ('branch_id', '=', line.request_id.branch_id.id),
-                ('product_id', '=', line.product_id.id)
-            ], limit=1)
+            branch_product = line.branch_product_id or bp_map.get(
+                (line.request_id.branch_id.id, line.product_id.id))
 
             if branch_product:
-                max_q = branch_product.max_quantity or 0.0
+                # التنبؤ إن وُجد، وإلا الحد الأعلى المدخل يدوياً للفرع
+                max_q = forecast_max.get(branch_product.id, branch_product.max_quantity or 0.0)
                 line.suggested_qty = max(0.0, max_q - line.current_qty)
             else:
                 line.suggested_qty = 0.0
@@ -181,110 +188,167 @@ class SupplyRequestLine(models.Model):
     #             line.suggested_qty_training = 0.0
 
     # ==============================================================
-    # CREATE rules for SupplyRequestLine
+    # Submit: Suggestion → Supply Quantity
+    # ==============================================================
+    def _set_supply_from_suggestion(self):
+        """إعادة حساب suggested_qty (التنبؤ أو الحد الأعلى قد تغيّر) ونسخه إلى supply_qty.
+
+        الحساب دفعة واحدة لكل الأسطر، والنسخ بتحديث SQL واحد بدل كتابة لكل سطر.
+        """
+        if not self:
+            return
+        self.env.add_to_compute(self._fields['suggested_qty'], self)
+        self.flush_recordset(['suggested_qty', 'current_qty'])
+        self.env.cr.execute("""
+            UPDATE custom_supply_supply_request_line
+               SET supply_qty = COALESCE(suggested_qty, 0)
+             WHERE id = ANY(%s)
+        """, (self.ids,))
+        self.invalidate_recordset(['supply_qty'])
+
+    # ==============================================================
+    # Branch products lookup
     # ==============================================================
     @api.model
-    def create(self, vals):
-        request = self.env['custom_supply.supply_request'].browse(vals.get('request_id'))
-        user = self.env.user
+    def _get_branch_product_map(self, pairs):
+        """{(branch_id, product_id): branch_product} لكل الأزواج المطلوبة باستعلام واحد"""
+        pairs = {(b, p) for b, p in pairs if b and p}
+        if not pairs:
+            return {}
+        bps = self.env['custom_supply.branch_product'].search([
+            ('branch_id', 'in', list({b for b, p in pairs})),
+            ('product_id', 'in', list({p for b, p in pairs})),
+        ])
+        result = {}
+        for bp in bps:
+            key = (bp.branch_id.id, bp.product_id.id)
+            if key in pairs:
+                result.setdefault(key, bp)
+        return result
 
+    # ==============================================================
+    # Ordering (Category → Name)
+    # ==============================================================
+    @api.model
+    def _resequence_requests(self, requests):
+        """إعادة ترقيم أسطر الطلبات حسب الفئة ثم اسم المنتج بتحديث SQL واحد"""
+        ids, seqs = [], []
+        for request in requests:
+            sorted_lines = request.line_ids.sorted(
+                key=lambda l: (
+                    l.product_id.categ_id.id if l.product_id else 0,
+                    l.product_id.name if l.product_id else '',
+                    l.id,
+                )
+            )
+            for seq, line in enumerate(sorted_lines, start=1):
+                if line.sequence != seq:
+                    ids.append(line.id)
+                    seqs.append(seq)
+        if not ids:
+            return
+        self.flush_model(['sequence'])
+        self.env.cr.execute("""
+            UPDATE custom_supply_supply_request_line l
+               SET sequence = v.seq
+              FROM unnest(%s::int[], %s::int[]) AS v(id, seq)
+             WHERE l.id = v.id
+        """, (ids, seqs))
+        self.browse(ids).invalidate_recordset(['sequence'])
+
+    # ==============================================================
+    # CREATE rules for SupplyRequestLine
+    # ==============================================================
+    @api.model_create_multi
+    def create(self, vals_list):
         # ==========================
-        # 1️⃣ التحقق من حالة الطلب
+        # 6️⃣ منع الإنشاء من Order Tracking
         # ==========================
-        if request and request.status not in ('InBranch', 'Supply'):
-            raise UserError("You cannot add new lines when the request is not in 'InBranch' or 'Supply' status.")
+        if self.env.context.get('from_order_tracking'):
+            raise UserError("Cannot create request lines from Order Tracking (read-only).")
+
+        user = self.env.user
+        requests = self.env['custom_supply.supply_request'].browse(
+            {vals['request_id'] for vals in vals_list if vals.get('request_id')}
+        )
 
         # ==========================
-        # 2️⃣ التحقق من صلاحيات المستخدم
+        # 1️⃣ + 2️⃣ التحقق من حالة الطلب والصلاحيات (مرة واحدة لكل طلب)
         # ==========================
-        if request:
-            if request.status == 'InBranch' and not user.has_group('custom_supply.group_branch_employee'):
+        roles = user._get_supply_roles()
+        is_branch_employee = roles.is_branch
+        is_supply_manager = roles.is_supply
+        for request in requests:
+            if request.status not in ('InBranch', 'Supply'):
+                raise UserError("You cannot add new lines when the request is not in 'InBranch' or 'Supply' status.")
+            if request.status == 'InBranch' and not is_branch_employee:
                 raise UserError("Only Branch Employee can add lines in 'InBranch' status.")
-            if request.status == 'Supply' and not user.has_group('custom_supply.group_supply_manager'):
+            if request.status == 'Supply' and not is_supply_manager:
                 raise UserError("Only Supply Manager can add lines in 'Supply' status.")
 
         # ==========================
-        # 3️⃣ التحقق من صلاحية المنتج للفرع
+        # 3️⃣ منتجات الفروع لكل الأسطر باستعلام واحد
         # ==========================
-        product_id = vals.get('product_id')
-        branch_product_id = vals.get('branch_product_id')
-
-        if request and product_id:
-            bp = self.env['custom_supply.branch_product'].search([
-                ('branch_id', '=', request.branch_id.id),
-                ('product_id', '=', product_id)
-            ], limit=1)
-
-            if not bp:
-                raise UserError(f"Cannot add product not defined in branch '{request.branch_id.name}'")
+        branch_of = {request.id: request.branch_id for request in requests}
+        bp_map = self._get_branch_product_map(
+            (branch_of[vals['request_id']].id, vals.get('product_id'))
+            for vals in vals_list if vals.get('request_id')
+        )
+        products = self.env['product.product'].browse(
+            {vals['product_id'] for vals in vals_list if vals.get('product_id')}
+        )
+        products.mapped('product_tmpl_id.supply_unit_id.name')  # prefetch
 
-            if not bp.activate:
-                raise UserError(f"Product '{bp.product_id.name}' is disabled in branch '{request.branch_id.name}' and cannot be added.")
-
-            if not branch_product_id:
-                vals['branch_product_id'] = bp.id
-
-        # ==========================
-        # 4️⃣ ملء current_qty تلقائياً
-        # ==========================
         primitive = self.PRIMITIVE_CURRENT_QTY
-        current_qty_val = vals.get('current_qty')
-
-        if current_qty_val is None:
-            # لم يدخل المستخدم أي قيمة → ضع القيمة البدائية
-            if request and product_id:
-                bp = self.env['custom_supply.branch_product'].search([
-                    ('branch_id', '=', request.branch_id.id),
-                    ('product_id', '=', product_id)
-                ], limit=1)
+        for vals in vals_list:
+            branch = branch_of.get(vals.get('request_id'))
+            product_id = vals.get('product_id')
+            bp = bp_map.get((branch.id, product_id)) if branch and product_id else None
+
+            # التحقق من صلاحية المنتج للفرع
+            if branch and product_id:
+                if not bp:
+                    raise UserError(f"Cannot add product not defined in branch '{branch.name}'")
+                if not bp.activate:
+                    raise UserError(f"Product '{bp.product_id.name}' is disabled in branch '{branch.name}' and cannot be added.")
+                if not vals.get('branch_product_id'):
+                    vals['branch_product_id'] = bp.id
+
+            # ==========================
+            # 4️⃣ ملء current_qty تلقائياً
+            # ==========================
+            current_qty_val = vals.get('current_qty')
+            if current_qty_val is None:
+                # لم يدخل المستخدم أي قيمة → ضع القيمة البدائية
                 vals['current_qty'] = bp.current_quantity if bp else primitive
-            else:
-                vals['current_qty'] = primitive
-        else:
-            # إذا أدخل المستخدم قيمة سالبة → حولها للقيمة البدائية
-            if current_qty_val < 0:
+            elif current_qty_val < 0:
+                # إذا أدخل المستخدم قيمة سالبة → حولها للقيمة البدائية
                 vals['current_qty'] = primitive
 
-        # ==========================
-        # 5️⃣ ملء unit_name مرة واحدة
-        # ==========================
-        if product_id:
-            product = self.env['product.product'].browse(product_id)
-            vals['unit_name'] = product.product_tmpl_id.supply_unit_id.name if product.product_tmpl_id.supply_unit_id else ''
+            # ==========================
+            # 5️⃣ ملء unit_name مرة واحدة
+            # ==========================
+            if product_id:
+                product = self.env['product.product'].browse(product_id)
+                vals['unit_name'] = product.product_tmpl_id.supply_unit_id.name if product.product_tmpl_id.supply_unit_id else ''
 
-        # ==========================
-        # 6️⃣ منع الإنشاء من Order Tracking
-        # ==========================
-        if self.env.context.get('from_order_tracking'):
-            raise UserError("Cannot create request lines from Order Tracking (read-only).")
+            # ==========================
+            #  7️⃣ ضمان عدم وجود قيم فارغة
+            # ==========================
+            vals.setdefault('current_qty', primitive)
+            vals.setdefault('requested_qty', 0.0)
 
         # ==========================
-        #  7️⃣ ضمان عدم وجود قيم فارغة
+        #  8️⃣ إنشاء الأسطر
         # ==========================
-        vals.setdefault('current_qty', primitive)
-        vals.setdefault('requested_qty', 0.0)
+        lines = super(SupplyRequestLine, self).create(vals_list)
 
         # ==========================
-        #  8️⃣ إنشاء السطر
+        # 🔹 ترتيب أسطر كل طلب مرة واحدة (حقل sequence المخزن بدل إعادة كتابة line_ids)
         # ==========================
-        line = super(SupplyRequestLine, self).create(vals)
+        self._resequence_requests(requests)
 
-        # ==========================
-        # 🔹 ترتيب جميع الأسطر بعد الإضافة
-        # ==========================
-        if request:
-            # استرجاع كل الأسطر بعد الإنشاء، وترتيبها بدون الكتابة مباشرة على line_ids
-            sorted_lines = request.line_ids.sorted(
-                key=lambda l: (
-                    l.product_id.categ_id.id if l.product_id else 0,
-                    l.product_id.name if l.product_id else ''
-                )
-            )
-            # استخدام write بدلاً من إعادة assignment مباشر
-            if sorted_lines.ids != request.line_ids.ids:
-                request.write({'line_ids': [(6, 0, sorted_lines.ids)]})
-
-        return line
+        return lines
 
     # ==============================================================
     # Unlink logging
@@ -309,7 +373,7 @@ class SupplyRequestLine(models.Model):
         - Branch Employee and Warehouse Employee restrictions remain.
         - Supply Manager can write any fields; front-end will handle allowed fields.
         """
-        user = self.env.user
+        roles = self.env.user._get_supply_roles()
 
         for rec in self:
             request = rec.request_id
@@ -319,12 +383,12 @@ class SupplyRequestLine(models.Model):
                 raise UserError("You cannot modify lines after done.")
 
             # Branch Employee restrictions
-            if user.has_group('custom_supply.group_branch_employee'):
+            if roles.is_branch:
                 if status not in ['InBranch', 'OnRoad']:
                     raise UserError("Branch Employee can only modify lines in 'InBranch or OnRoad'.")
 
             # Warehouse Employee restrictions
-            if user.has_group('custom_supply.group_warehouse_employee'):
+            if roles.is_warehouse:
                 if status == 'InWarehouse':
                     allowed_fields = ['export_qty', 'warehouse_note']
                     for field, value in vals.items():
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+from odoo import models, tools
+
+# لقطة أدوار المستخدم في التوريد + فرعه، تُحسب مرة واحدة وتبقى في الـ ormcache
+SupplyRoles = namedtuple('SupplyRoles', [
+    'is_branch', 'is_supply', 'is_warehouse', 'is_high', 'branch_id',
+])
+
+
+class ResUsers(models.Model):
+    _inherit = 'res.users'
+
+    @tools.ormcache('self.id')
+    def _get_supply_roles(self):
+        """أدوار المستخدم في التوريد (SupplyRoles).
+
+        تُمسح تلقائياً عند تغيير مجموعات المستخدم (Odoo يفرغ الـ cache)،
+        وعند تغيير مسؤول الفرع (انظر custom_supply.branch.write).
+        """
+        self.ensure_one()
+        branch = self.env['custom_supply.branch'].sudo().search([('user_id', '=', self.id)], limit=1)
+        return SupplyRoles(
+            is_branch=self.has_group('custom_supply.group_branch_employee'),
+            is_supply=self.has_group('custom_supply.group_supply_manager'),
+            is_warehouse=self.has_group('custom_supply.group_warehouse_employee'),
+            is_high=self.has_group('custom_supply.group_high_manager'),
+            branch_id=branch.id,
+        )
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+import pytz
+
+from odoo import models, fields, api
+
+SUPPLY_TIMEZONE_PARAM = 'custom_supply.supply_timezone'
+# عدد الأسابيع القادمة التي تبقى محسوبة مسبقاً في الجدول
+OCCURRENCE_WEEKS = 8
+
+
+class SupplyWindowOccurrence(models.Model):
+    """تكرار فعلي لنافذة توريد: (فرع، بداية، نهاية) بتوقيت UTC.
+
+    يُولَّد بالـ SQL من custom_supply.branch_supply_window لكل يوم مطابق،
+    والـ cron يمدّ الجدول يومياً حتى OCCURRENCE_WEEKS أسبوعاً للأمام.
+    موعد التسليم المتوقع والتأخير يصبحان بحثاً واحداً على فهرس (branch_id, start_datetime).
+    حذف نافذة يحذف تكراراتها القادمة فقط؛ الماضية تبقى (window_id فارغ) لحساب تأخير الطلبات القديمة.
+    """
+    _name = "custom_supply.supply_window_occurrence"
+    _description = "Supply Window Occurrence"
+    _order = "start_datetime"
+    _rec_name = "branch_id"
+    _log_access = False
+
+    window_id = fields.Many2one('custom_supply.branch_supply_window', string="Window",
+                                ondelete='set null', index=True, readonly=True)
+    branch_id = fields.Many2one('custom_supply.branch', string="Branch", required=True,
+                                ondelete='cascade', readonly=True)
+    local_date = fields.Date(string="Day", required=True, readonly=True)
+    start_datetime = fields.Datetime(string="Start", required=True, readonly=True)
+    end_datetime = fields.Datetime(string="End", required=True, readonly=True)
+    color = fields.Integer(related='branch_id.color')
+
+    # NULL لا يتعارض مع NULL: تكرارات النوافذ المحذوفة لا تخضع للقيد
+    _sql_constraints = [
+        ('window_start_uniq', 'unique(window_id, start_datetime)',
+         'A supply window can only occur once at a given time.'),
+    ]
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS custom_supply_supply_window_occurrence_branch_start_idx
+            ON custom_supply_supply_window_occurrence (branch_id, start_datetime)
+        """)
+
+    # ============================
+    # Timezone
+    # ============================
+    @api.model
+    def _get_supply_tz(self):
+        """المنطقة الزمنية لساعات النوافذ (start_time / end_time مسجّلة بالتوقيت المحلي)."""
+        tz = self.env['ir.config_parameter'].sudo().get_param(SUPPLY_TIMEZONE_PARAM)
+        if not tz:
+            admin = self.env.ref('base.user_admin', raise_if_not_found=False)
+            tz = (admin and admin.tz) or self.env.user.tz or 'UTC'
+        return tz
+
+    @api.model
+    def _to_local_date(self, dt):
+        """تاريخ اليوم المحلي لوقت UTC مخزّن."""
+        tz = pytz.timezone(self._get_supply_tz())
+        return pytz.utc.localize(dt).astimezone(tz).date()
+
+    # ============================
+    # Materialization
+    # ============================
+    @api.model
+    def _materialize(self, date_from, date_to, window_ids=None):
+        """🗓️ توليد تكرارات النوافذ بين تاريخين محليين (شاملين) باستعلام واحد.
+
+        التكرارات الموجودة مسبقاً لا تتغير (ON CONFLICT DO NOTHING).
+        """
+        self.env['custom_supply.branch_supply_window'].flush_model(
+            ['branch_id', 'supply_day_id', 'start_time', 'end_time'])
+        where = ""
+        params = {
+            'tz': self._get_supply_tz(),
+            'date_from': date_from,
+            'date_to': date_to,
+        }
+        if window_ids is not None:
+            if not window_ids:
+                return
+            where = "AND w.id = ANY(%(window_ids)s)"
+            params['window_ids'] = list(window_ids)
+        # day_of_week: 0 = الإثنين، مثل isodow - 1
+        # d.day بدون منطقة زمنية (timestamp) حتى يُفسَّر AT TIME ZONE كوقت محلي ثم يُحوَّل إلى UTC
+        self.env.cr.execute(f"""
+            INSERT INTO custom_supply_supply_window_occurrence
+                (window_id, branch_id, local_date, start_datetime, end_datetime)
+            SELECT w.id, w.branch_id, d.day::date,
+                   ((d.day + make_interval(mins => round(w.start_time * 60)::int)) AT TIME ZONE %(tz)s) AT TIME ZONE 'UTC',
+                   ((d.day + make_interval(mins => round(w.end_time * 60)::int)) AT TIME ZONE %(tz)s) AT TIME ZONE 'UTC'
+            FROM custom_supply_branch_supply_window w
+            JOIN custom_supply_supply_day sd ON sd.id = w.supply_day_id
+            CROSS JOIN generate_series(%(date_from)s::timestamp, %(date_to)s::timestamp, interval '1 day') AS d(day)
+            WHERE EXTRACT(ISODOW FROM d.day) - 1 = sd.day_of_week
+              AND w.end_time > w.start_time
+              {where}
+            ON CONFLICT (window_id, start_datetime) DO NOTHING
+        """, params)
+        self.invalidate_model()
+
+    @api.model
+    def _horizon(self):
+        today = fields.Date.context_today(self)
+        return today, today + timedelta(weeks=OCCURRENCE_WEEKS)
+
+    @api.model
+    def _refresh_windows(self, windows):
+        """إعادة توليد التكرارات القادمة لنوافذ تغيّرت؛ التكرارات الماضية تبقى كما هي لحساب التأخير."""
+        if not windows:
+            return
+        today, horizon = self._horizon()
+        self.flush_model()
+        self.env.cr.execute("""
+            DELETE FROM custom_supply_supply_window_occurrence
+            WHERE window_id = ANY(%s) AND local_date >= %s
+        """, (windows.ids, today))
+        self._materialize(today, horizon, window_ids=windows.ids)
+
+    @api.model
+    def cron_extend_occurrences(self):
+        """🔁 مدّ الجدول حتى OCCURRENCE_WEEKS أسبوعاً من اليوم."""
+        today, horizon = self._horizon()
+        self._materialize(today, horizon)
+
+    @api.model
+    def action_rebuild_occurrences(self):
+        """بناء كامل: من أقدم طلب توريد حتى نهاية الأفق، ليغطي حساب التأخير للطلبات القديمة.
+
+        تكرارات النوافذ المحذوفة تبقى كما هي.
+        """
+        today, horizon = self._horizon()
+        self.env.cr.execute("SELECT MIN(request_date) FROM custom_supply_supply_request")
+        first = self.env.cr.fetchone()[0]
+        date_from = min(first.date(), today) if first else today
+        self.flush_model()
+        self.env.cr.execute("DELETE FROM custom_supply_supply_window_occurrence WHERE window_id IS NOT NULL")
+        self._materialize(date_from, horizon)
+        return True
+
+    # ============================
+    # Lookups
+    # ============================
+    @api.model
+    def _next_start_by_branch(self, branch_ids, after):
+        """{branch_id: أول بداية نافذة بعد ``after``} باستعلام واحد."""
+        if not branch_ids:
+            return {}
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (branch_id) branch_id, start_datetime
+            FROM custom_supply_supply_window_occurrence
+            WHERE branch_id = ANY(%s) AND start_datetime >= %s
+            ORDER BY branch_id, start_datetime
+        """, (list(branch_ids), after))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _on_time_keys(self, keys):
+        """من بين أزواج (branch_id, datetime) يعيد الأزواج التي تقع داخل نافذة توريد."""
+        keys = [(b, dt) for b, dt in keys if b and dt]
+        if not keys:
+            return set()
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT k.branch_id, k.at
+            FROM unnest(%s::int[], %s::timestamp[]) AS k(branch_id, at)
+            WHERE EXISTS (
+                SELECT 1 FROM custom_supply_supply_window_occurrence o
+                WHERE o.branch_id = k.branch_id
+                  AND o.start_datetime <= k.at
+                  AND o.end_datetime >= k.at
+            )
+        """, ([k[0] for k in keys], [k[1] for k in keys]))
+        return set(self.env.cr.fetchall())
+
+    @api.model
+    def _occurrences_on_day(self, branch_id, dt):
+        """تكرارات نوافذ الفرع في اليوم المحلي الذي يقع فيه ``dt``."""
+        return self.search([
+            ('branch_id', '=', branch_id),
+            ('local_date', '=', self._to_local_date(dt)),
+        ])
+
+
+class BranchSupplyWindow(models.Model):
+    _inherit = "custom_supply.branch_supply_window"
+
+    occurrence_ids = fields.One2many('custom_supply.supply_window_occurrence', 'window_id', string="Occurrences")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        windows = super().create(vals_list)
+        self.env['custom_supply.supply_window_occurrence'].sudo()._refresh_windows(windows)
+        return windows
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'branch_id', 'supply_day_id', 'start_time', 'end_time'} & set(vals):
+            self.env['custom_supply.supply_window_occurrence'].sudo()._refresh_windows(self)
+        return res
+
+    def unlink(self):
+        # التكرارات القادمة تُحذف مع النافذة، والماضية تبقى (ondelete='set null')
+        Occurrence = self.env['custom_supply.supply_window_occurrence'].sudo()
+        Occurrence.flush_model()
+        self.env.cr.execute("""
+            DELETE FROM custom_supply_supply_window_occurrence
+            WHERE window_id = ANY(%s) AND local_date >= %s
+        """, (self.ids, Occurrence._horizon()[0]))
+        Occurrence.invalidate_model()
+        return super().unlink()
@@ -1 +1,6 @@
-from . import test_late_requests
\ No newline at end of file
+from . import test_late_requests
+from . import test_forecast_backtest
+from . import test_supply_benchmark
+from . import test_query_budget
+from . import test_branch_stock_ledger
+from . import test_stock_count
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from odoo import fields, Command
+
+
+class SupplyLoadGenerator:
+    """📦 بيانات اصطناعية قابلة للضبط لدورة التوريد الكاملة.
+
+    الإعداد (فروع، مستخدمون، منتجات، نوافذ) عبر الـ ORM حتى تعمل كل الـ hooks،
+    أما أشهر الطلبات التاريخية وأسطرها فبـ SQL مباشرة لأن حجمها كبير.
+    """
+
+    def __init__(self, env, branches=10, products=60, basic_ratio=0.3, windows_per_branch=2,
+                 months=3, requests_per_week=2, stuck_ratio=0.1, seed=0):
+        self.env = env
+        self.branch_count = branches
+        self.product_count = products
+        self.basic_ratio = basic_ratio
+        self.windows_per_branch = windows_per_branch
+        self.months = months
+        self.requests_per_week = requests_per_week
+        self.stuck_ratio = stuck_ratio
+        self.rng = random.Random(seed)
+        self.tag = f"bench{seed}"
+
+        self.branches = env['custom_supply.branch']
+        self.branch_users = env['res.users']
+        self.products = env['product.product']
+        self.supply_manager = env['res.users']
+        self.warehouse_user = env['res.users']
+
+    # ============================
+    # Setup (ORM)
+    # ============================
+    def _create_user(self, login, group_xmlid):
+        return self.env['res.users'].with_context(no_reset_password=True).create({
+            'name': login,
+            'login': login,
+            'groups_id': [Command.set([self.env.ref('base.group_user').id, self.env.ref(group_xmlid).id])],
+        })
+
+    def _create_users(self):
+        self.supply_manager = self._create_user(f'{self.tag}_supply', 'custom_supply.group_supply_manager')
+        self.warehouse_user = self._create_user(f'{self.tag}_warehouse', 'custom_supply.group_warehouse_employee')
+        group_ids = [self.env.ref('base.group_user').id, self.env.ref('custom_supply.group_branch_employee').id]
+        self.branch_users = self.env['res.users'].with_context(no_reset_password=True).create([{
+            'name': f'{self.tag}_branch_{i}',
+            'login': f'{self.tag}_branch_{i}',
+            'groups_id': [Command.set(group_ids)],
+        } for i in range(self.branch_count)])
+
+    def _create_products(self):
+        unit = self.env['custom_supply.unit'].create({'name': f'{self.tag} Carton'})
+        categories = self.env['product.category'].create([
+            {'name': f'{self.tag} Category {c}'} for c in range(5)
+        ])
+        basic_count = max(1, int(self.product_count * self.basic_ratio))
+        templates = self.env['product.template'].create([{
+            'name': f'{self.tag} Product {p:04d}',
+            'categ_id': categories[p % len(categories)].id,
+            'product_for_supply': True,
+            'custom_supply_field_1': 'basic' if p < basic_count else 'secondary',
+            'supply_unit_id': unit.id,
+        } for p in range(self.product_count)])
+        self.products = templates.product_variant_ids
+
+    def _create_branches(self):
+        branch_type = self.env['custom_supply.branch.type'].create({'name': f'{self.tag} Type', 'code': self.tag})
+        Branch = self.env['custom_supply.branch']
+        for i, user in enumerate(self.branch_users):
+            Branch |= Branch.create({
+                'name': f'{self.tag} Branch {i:04d}',
+                'branch_type_id': branch_type.id,
+                'user_id': user.id,
+                'state': 'active',
+            })
+        self.branches = Branch
+
+    def _create_branch_products(self):
+        rng = self.rng
+        vals_list = []
+        for branch in self.branches:
+            for product in self.products:
+                # current > 0 و max > current حتى يبقى للسطر اقتراح موجب بعد الإرسال
+                current = rng.randint(1, 10)
+                vals_list.append({
+                    'branch_id': branch.id,
+                    'product_id': product.id,
+                    'current_quantity': current,
+                    'min_quantity': current,
+                    'max_quantity': current + rng.randint(5, 40),
+                    'activate': True,
+                })
+        self.env['custom_supply.branch_product'].create(vals_list)
+
+    def _create_windows(self):
+        days = self.env['custom_supply.supply_day'].search([])
+        vals_list = []
+        for branch in self.branches:
+            for day in self.rng.sample(list(days), min(self.windows_per_branch, len(days))):
+                start = self.rng.choice([7.0, 8.0, 9.0, 13.0])
+                vals_list.append({
+                    'branch_id': branch.id,
+                    'supply_day_id': day.id,
+                    'start_time': start,
+                    'end_time': start + 3.0,
+                })
+        self.env['custom_supply.branch_supply_window'].create(vals_list)
+
+    # ============================
+    # History (SQL)
+    # ============================
+    def _insert_history(self):
+        """طلبات منتهية لعدة أشهر + نسبة stuck_ratio عالقة في Supply / InWarehouse للـ cron."""
+        self.env.flush_all()
+        cr = self.env.cr
+        now = fields.Datetime.now()
+        days = self.months * 30
+        per_branch = max(1, int(days / 7.0 * self.requests_per_week))
+
+        request_rows = []
+        for branch, user in zip(self.branches, self.branch_users):
+            for k in range(per_branch):
+                requested = now - timedelta(days=days * (k + 1) / per_branch, hours=self.rng.randint(0, 12))
+                confirmed = requested + timedelta(hours=self.rng.randint(2, 36))
+                exported = confirmed + timedelta(hours=self.rng.randint(2, 36))
+                received = exported + timedelta(hours=self.rng.randint(1, 10))
+                request_rows.append((
+                    f'{self.tag}-H{branch.id}-{k}', branch.id, 'Done', requested,
+                    confirmed, exported, received, self.supply_manager.id, self.warehouse_user.id, user.id,
+                ))
+            if self.rng.random() < self.stuck_ratio:
+                requested = now - timedelta(hours=self.rng.randint(26, 72))
+                if self.rng.random() < 0.5:
+                    request_rows.append((f'{self.tag}-S{branch.id}', branch.id, 'Supply', requested,
+                                         None, None, None, None, None, None))
+                else:
+                    request_rows.append((f'{self.tag}-W{branch.id}', branch.id, 'InWarehouse', requested,
+                                         requested + timedelta(hours=1), None, None,
+                                         self.supply_manager.id, self.warehouse_user.id, None))
+        columns = list(zip(*request_rows))
+        cr.execute("""
+            INSERT INTO custom_supply_supply_request (
+                name, branch_id, status, request_date, supply_confirm_date, warehouse_export_date,
+                received_date, supply_manager_id, warehouse_user_id, received_user_id,
+                create_uid, write_uid, create_date, write_date
+            )
+            SELECT r.*, %s, %s, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+            FROM unnest(%s::varchar[], %s::int[], %s::varchar[], %s::timestamp[], %s::timestamp[],
+                        %s::timestamp[], %s::timestamp[], %s::int[], %s::int[], %s::int[])
+                 AS r(name, branch_id, status, request_date, supply_confirm_date, warehouse_export_date,
+                      received_date, supply_manager_id, warehouse_user_id, received_user_id)
+        """, [self.env.uid, self.env.uid] + [list(c) for c in columns])
+
+        # الأسطر: كل منتجات الفرع الأساسية + عينة من الثانوية لكل طلب
+        cr.execute("""
+            INSERT INTO custom_supply_supply_request_line (
+                request_id, branch_id, request_date, request_name, product_id, category_id,
+                branch_product_id, sequence, unit_name, current_qty, requested_qty,
+                suggested_qty, supply_qty, export_qty, received_qty,
+                create_uid, write_uid, create_date, write_date
+            )
+            SELECT r.id, r.branch_id, r.request_date, r.name, bp.product_id, bp.category_id,
+                   bp.id, 0, '', bp.current_quantity, 0,
+                   bp.max_quantity - bp.current_quantity,
+                   round((bp.max_quantity - bp.current_quantity) * (0.5 + random())),
+                   round((bp.max_quantity - bp.current_quantity) * (0.5 + random())),
+                   0, %s, %s, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+            FROM custom_supply_supply_request r
+            JOIN custom_supply_branch_product bp ON bp.branch_id = r.branch_id
+            JOIN product_product pp ON pp.id = bp.product_id
+            JOIN product_template pt ON pt.id = pp.product_tmpl_id
+            WHERE r.name LIKE %s
+              AND (pt.custom_supply_field_1 = 'basic' OR random() < 0.2)
+        """, (self.env.uid, self.env.uid, f'{self.tag}-%'))
+        self.env.invalidate_all()
+
+    def generate(self):
+        self._create_users()
+        self._create_products()
+        self._create_branches()
+        self._create_branch_products()
+        self._create_windows()
+        self._insert_history()
+        return self
+
+
+class QueryTimer:
+    """⏱️ زمن التنفيذ وعدد الاستعلامات لكل خطوة (مع flush حتى تُحسب الكتابات المؤجلة)."""
+
+    def __init__(self, env):
+        self.env = env
+        self.steps = []
+
+    @contextmanager
+    def step(self, name):
+        self.env.flush_all()
+        cr = self.env.cr
+        queries = cr.sql_log_count
+        started = time.perf_counter()
+        yield
+        self.env.flush_all()
+        self.steps.append((name, time.perf_counter() - started, cr.sql_log_count - queries))
+
+    def format(self, title):
+        lines = [title, f"{'step':<28}{'seconds':>10}{'queries':>10}"]
+        lines += [f"{name:<28}{seconds:>10.3f}{queries:>10}" for name, seconds, queries in self.steps]
+        return "\n".join(lines)
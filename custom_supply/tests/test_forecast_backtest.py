@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase
+
+from ..models.forecast_backtest import VARIANT_SELECTION, SYNTHETIC_PATTERNS
+
+
+class TestForecastBacktest(TransactionCase):
+
+    def test_synthetic_backtest(self):
+        """Synthetic mode runs without any supply data and scores every engine"""
+        run = self.env['custom_supply.forecast_backtest'].create({
+            'mode': 'synthetic',
+            'synthetic_series': 60,
+            'origin_count': 6,
+            'seed': 1,
+        })
+        run.action_run()
+
+        self.assertEqual(run.state, 'done')
+        self.assertEqual(set(run.variant_ids.mapped('variant')), {v for v, _label in VARIANT_SELECTION})
+        for variant in run.variant_ids:
+            self.assertEqual(variant.count, run.point_count)
+            self.assertGreater(variant.per_second, 0.0)
+            self.assertGreaterEqual(variant.mae, 0.0)
+
+        # نتيجة لكل نمط اصطناعي ولكل محرك
+        self.assertEqual(len(run.result_ids), len(VARIANT_SELECTION) * len(SYNTHETIC_PATTERNS))
+        self.assertEqual(set(run.result_ids.mapped('segment')), set(SYNTHETIC_PATTERNS))
+
+    def test_rerun_replaces_results(self):
+        run = self.env['custom_supply.forecast_backtest'].create({
+            'mode': 'synthetic',
+            'synthetic_series': 30,
+            'origin_count': 4,
+        })
+        run.action_run()
+        first = run.result_ids
+        run.action_run()
+        self.assertFalse(first.exists())
+        self.assertEqual(len(run.variant_ids), len(VARIANT_SELECTION))
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.query_budget import QUERY_BUDGETS, count_queries, get_budget
+from .common import SupplyLoadGenerator
+
+# فرق مسموح بين طلب بـ 20 سطراً وطلب بـ 200 سطر (الـ ORM يُدرج الأسطر على دفعات من 100)
+LINE_SLACK = 3
+
+
+@tagged('post_install', '-at_install')
+class TestQueryBudget(TransactionCase):
+
+    def _lifecycle_counters(self, lines, seed):
+        """دورة طلب واحد بعدد ``lines`` من الأسطر، مع عدّاد لكل عملية."""
+        data = SupplyLoadGenerator(self.env, branches=1, products=lines, basic_ratio=1.0,
+                                   months=1, stuck_ratio=0.0, seed=seed).generate()
+        branch, user = data.branches, data.branch_users
+        Request = self.env['custom_supply.supply_request']
+        counters = {}
+
+        with count_queries(self.env, 'supply_request.create') as counters['supply_request.create']:
+            request = Request.with_user(user).sudo().create({'branch_id': branch.id})
+        self.assertEqual(len(request.line_ids), lines)
+
+        with count_queries(self.env, 'supply_request.submit') as counters['supply_request.submit']:
+            request.with_user(user).sudo().action_submit_request()
+        self.assertTrue(all(request.line_ids.mapped('supply_qty')), "Every line should get its suggestion")
+
+        with count_queries(self.env, 'supply_request.mark_in_warehouse') as counters['supply_request.mark_in_warehouse']:
+            request.with_user(data.supply_manager).sudo().action_mark_in_warehouse()
+
+        with count_queries(self.env, 'supply_request.export') as counters['supply_request.export']:
+            request.with_user(data.warehouse_user).sudo().action_export()
+
+        with count_queries(self.env, 'supply_request.order_received') as counters['supply_request.order_received']:
+            request.with_user(user).sudo().action_order_received()
+
+        self.assertEqual(request.status, 'Done')
+        return counters
+
+    def test_counter(self):
+        with count_queries(self.env, 'test.select') as counter:
+            self.env.cr.execute("SELECT 1")
+            self.env.cr.execute("SELECT 2")
+        self.assertEqual(counter.queries, 2)
+        self.assertIsNone(counter.budget)
+        self.assertFalse(counter.over_budget)
+
+        fixed, per_record = QUERY_BUDGETS['supply_request.submit']
+        self.assertEqual(get_budget('supply_request.submit', 3), fixed + 3 * per_record)
+
+    def test_budgets_200_lines(self):
+        """طلب بـ 200 سطر يبقى ضمن ميزانية كل مرحلة"""
+        for operation, counter in self._lifecycle_counters(200, seed=11).items():
+            self.assertLessEqual(counter.queries, counter.budget,
+                                 f"{operation}: {counter.queries} queries, budget {counter.budget}")
+
+    def test_queries_do_not_grow_with_lines(self):
+        """عدد الاستعلامات لا يتبع عدد الأسطر"""
+        small = self._lifecycle_counters(20, seed=12)
+        large = self._lifecycle_counters(200, seed=13)
+        for operation in small:
+            self.assertLessEqual(
+                large[operation].queries - small[operation].queries, LINE_SLACK,
+                f"{operation}: {small[operation].queries} queries for 20 lines, "
+                f"{large[operation].queries} for 200 lines",
+            )
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.query_budget import count_queries
+from .common import SupplyLoadGenerator
+from .test_query_budget import LINE_SLACK
+
+
+@tagged('post_install', '-at_install')
+class TestStockCount(TransactionCase):
+
+    def _count(self, products, seed):
+        """جرد كل منتجات فرع بـ ``products`` منتجاً (نصفها أسطر موجودة والنصف الآخر جديد)."""
+        data = SupplyLoadGenerator(self.env, branches=1, products=products, basic_ratio=0.5,
+                                   months=1, stuck_ratio=0.0, seed=seed).generate()
+        Request = self.env['custom_supply.supply_request'].with_user(data.branch_users).sudo()
+        request = Request.create({'branch_id': data.branches.id})
+        counts = [[product.id, index % 7] for index, product in enumerate(data.products)]
+
+        with count_queries(self.env, 'supply_request.stock_count') as counter:
+            result = request.apply_stock_count(counts)
+        return data, request, result, counter
+
+    def test_bulk_count_300_products(self):
+        data, request, result, counter = self._count(300, seed=31)
+        self.assertLessEqual(counter.queries, counter.budget)
+        self.assertEqual(result['updated'] + result['created'], 300)
+        self.assertEqual(len(request.line_ids), 300)
+
+        branch_products = self.env['custom_supply.branch_product'].search([('branch_id', '=', data.branches.id)])
+        max_of = {bp.product_id.id: bp.max_quantity for bp in branch_products}
+        for line in request.line_ids:
+            self.assertEqual(line.suggested_qty, max(0.0, max_of[line.product_id.id] - line.current_qty))
+        self.assertEqual(dict(map(tuple, result['suggestions'])),
+                         {line.product_id.id: line.suggested_qty for line in request.line_ids})
+
+    def test_queries_do_not_grow_with_products(self):
+        small = self._count(30, seed=32)[3]
+        large = self._count(300, seed=33)[3]
+        self.assertLessEqual(large.queries - small.queries, LINE_SLACK,
+                             f"{small.queries} queries for 30 products, {large.queries} for 300")
+
+    def test_unedited_grid_creates_no_lines(self):
+        """تطبيق جدول الجرد دون تعديل لا يضيف أسطراً ولا يغيّر الكميات"""
+        data = SupplyLoadGenerator(self.env, branches=1, products=10, basic_ratio=0.5,
+                                   months=1, stuck_ratio=0.0, seed=35).generate()
+        request = self.env['custom_supply.supply_request'].with_user(data.branch_users).sudo().create({
+            'branch_id': data.branches.id,
+        })
+        before = {line.id: line.current_qty for line in request.line_ids}
+
+        action = request.action_open_stock_count()
+        # الجدول يُطبَّق كمستخدم الفرع (مثل الواجهة)، لا كالمستخدم الأعلى للاختبار
+        wizard = request.env['custom_supply.stock_count_wizard'].browse(action['res_id'])
+        self.assertEqual(wizard.env.user, data.branch_users)
+        self.assertEqual(len(wizard.line_ids), 10)
+        wizard.action_apply()
+
+        self.assertEqual({line.id: line.current_qty for line in request.line_ids}, before)
+
+    def test_rejects_products_outside_catalogue(self):
+        data = SupplyLoadGenerator(self.env, branches=1, products=5, months=1, stuck_ratio=0.0, seed=34).generate()
+        request = self.env['custom_supply.supply_request'].with_user(data.branch_users).sudo().create({
+            'branch_id': data.branches.id,
+        })
+        stranger = self.env['product.product'].create({'name': 'Not in catalogue'})
+        with self.assertRaises(UserError):
+            request.apply_stock_count([(data.products[0].id, 3), (stranger.id, 1)])
+
+        # مدخلات JSON-RPC غير صالحة → UserError وليس ValueError
+        with self.assertRaises(UserError):
+            request.apply_stock_count([(data.products[0].id,)])
+        with self.assertRaises(UserError):
+            request._get_stock_count_request(request.id + 1000000)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+
+from odoo.tests.common import TransactionCase, tagged
+
+from .common import SupplyLoadGenerator, QueryTimer
+
+_logger = logging.getLogger(__name__)
+
+# نماذج التقارير (SQL views) التي تفتحها قوائم المدير الأعلى
+REPORT_MODELS = (
+    'custom_supply.high_manager_report_avg_duration',
+    'custom_supply.branch_product_supply_report',
+    'custom_supply.supply_vs_export_report',
+    'custom_supply.supply_vs_suggestion_report',
+    'custom_supply.late_report',
+    'custom_supply.branch_product_monthly_report',
+    'custom_supply.branch_monthly_request_count',
+)
+
+
+@tagged('-standard', 'post_install', '-at_install', 'supply_benchmark')
+class TestSupplyBenchmark(TransactionCase):
+    """⏱️ قياس دورة الطلب الكاملة على بيانات اصطناعية بأحجام 10 / 100 / 1000 فرع.
+
+    لا يعمل مع الاختبارات العادية؛ يُشغَّل بـ ``--test-tags supply_benchmark``.
+    حجم البيانات قابل للضبط بمتغيرات البيئة CUSTOM_SUPPLY_BENCH_PRODUCTS و CUSTOM_SUPPLY_BENCH_MONTHS.
+    كل اختبار يطبع جدول (الخطوة، الثواني، عدد الاستعلامات) في السجل.
+    كل خطوة تُنفَّذ بمستخدم الدور المناسب مع sudo: التحقق من الأدوار يبقى فعّالاً،
+    وقواعد السجلات (record rules) خارج القياس.
+    """
+
+    def _generate(self, branches):
+        return SupplyLoadGenerator(
+            self.env,
+            branches=branches,
+            products=int(os.environ.get('CUSTOM_SUPPLY_BENCH_PRODUCTS', 60)),
+            months=int(os.environ.get('CUSTOM_SUPPLY_BENCH_MONTHS', 3)),
+        ).generate()
+
+    def _run_lifecycle(self, branches):
+        data = self._generate(branches)
+        timer = QueryTimer(self.env)
+        Request = self.env['custom_supply.supply_request']
+
+        # 1️⃣ إنشاء طلب لكل فرع من مستخدم الفرع (يملأ المنتجات الأساسية)
+        requests = Request
+        with timer.step('create + basic lines'):
+            for branch, user in zip(data.branches, data.branch_users):
+                requests |= Request.with_user(user).sudo().create({'branch_id': branch.id})
+
+        with timer.step('action_submit_request'):
+            for request, user in zip(requests, data.branch_users):
+                request.with_user(user).sudo().action_submit_request()
+
+        with timer.step('action_mark_in_warehouse'):
+            requests.with_user(data.supply_manager).sudo().action_mark_in_warehouse()
+
+        with timer.step('action_export'):
+            requests.with_user(data.warehouse_user).sudo().action_export()
+
+        with timer.step('action_order_received'):
+            for request, user in zip(requests, data.branch_users):
+                request.with_user(user).sudo().action_order_received()
+
+        with timer.step('cron_check_late_requests'):
+            Request.cron_check_late_requests()
+
+        with timer.step('report views'):
+            for model in REPORT_MODELS:
+                Report = self.env[model]
+                Report.search_count([])
+                Report.search_read([], limit=80)
+
+        _logger.info(timer.format(f"Supply benchmark: {branches} branches"))
+
+        # الدورة اكتملت لكل الفروع
+        self.assertEqual(set(requests.mapped('status')), {'Done'})
+        self.assertTrue(all(requests.mapped('line_ids')))
+        return timer
+
+    def test_benchmark_10_branches(self):
+        self._run_lifecycle(10)
+
+    def test_benchmark_100_branches(self):
+        self._run_lifecycle(100)
+
+    def test_benchmark_1000_branches(self):
+        self._run_lifecycle(1000)
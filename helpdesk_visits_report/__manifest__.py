@@ -1,7 +1,7 @@
 {
     "name": "Help Desk Visits Report",
     "summary": "Website form + back-office for Help Desk Visit Reports",
-    "version": "17.0.1.0.1",
+    "version": "17.0.1.0.2",
     "license": "LGPL-3",
     "depends": ["base", "website", "mail"],
     "data": [
@@ -14,6 +14,8 @@
         "views/helpdesk_report_views.xml",
         "views/helpdesk_report_kanban.xml",
         "views/website_templates.xml",
+        "views/device_health_views.xml",
+        "data/device_metric_data.xml",
     ],
     "application": True,
 }
@@ -0,0 +1,51 @@
+# migrations/17.0.1.0.2/pre-migrate.py
+import logging
+
+_logger = logging.getLogger(__name__)
+
+TICKET_SEQUENCE_CODE = "helpdesk.visit.report.ticket"
+
+
+def migrate(cr, version):
+    """Renumber duplicate ticket numbers before ticket_number_uniq is created.
+
+    The old read-then-increment numbering could hand the same number to
+    concurrent submissions. The oldest report keeps the number, the others
+    get fresh numbers after the highest one issued, and the sequence is
+    moved past them.
+    """
+    if not version:
+        return
+    cr.execute("""
+        WITH ranked AS (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY ticket_number ORDER BY id) AS rn
+            FROM helpdesk_visit_report
+            WHERE ticket_number IS NOT NULL
+        ),
+        renumber AS (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS n
+            FROM ranked
+            WHERE rn > 1
+        ),
+        base AS (
+            SELECT GREATEST(
+                (SELECT COALESCE(MAX(substring(ticket_number FROM '^([0-9]+)VN$')::bigint), 0)
+                   FROM helpdesk_visit_report),
+                (SELECT COALESCE(MAX(number_next) - 1, 0) FROM ir_sequence WHERE code = %s)
+            ) AS last
+        )
+        UPDATE helpdesk_visit_report r
+           SET ticket_number = CASE WHEN base.last + renumber.n < 10 THEN '0' ELSE '' END
+                               || (base.last + renumber.n)::text || 'VN'
+          FROM renumber, base
+         WHERE r.id = renumber.id
+     RETURNING base.last + renumber.n
+    """, (TICKET_SEQUENCE_CODE,))
+    numbers = [row[0] for row in cr.fetchall()]
+    if not numbers:
+        return
+    cr.execute("""
+        UPDATE ir_sequence SET number_next = %s
+         WHERE code = %s AND number_next <= %s
+    """, (max(numbers) + 1, TICKET_SEQUENCE_CODE, max(numbers)))
+    _logger.info("Renumbered %s visit reports with duplicate ticket numbers", len(numbers))
@@ -1,2 +1,4 @@
 from . import config_models
+from . import visit_numbering
 from . import visit_report
+from . import device_metric
@@ -0,0 +1,216 @@
+# models/device_metric.py
+from odoo import api, fields, models, _
+
+METRICS = [
+    ("pos_hdd_usage", "POS HDD Usage (%)"),
+    ("pos_cpu_usage", "POS CPU Usage (%)"),
+    ("pos_os_activated", "POS OS Activated"),
+    ("pos_working", "POS Working"),
+    ("device_working", "Device Working"),
+]
+PERIODS = [("day", "Day"), ("week", "Week")]
+
+# Report fields that feed the time-series; touching any of them re-appends the report's samples
+METRIC_SOURCE_FIELDS = {
+    "branch_id", "visit_datetime", "pos_hdd_usage", "pos_cpu_usage",
+    "pos_os_status", "pos_overall_status", "device_line_ids",
+}
+
+
+class HelpdeskDeviceMetric(models.Model):
+    """One sample per (branch, device, metric, timestamp), taken from a visit report.
+
+    device_id is empty for the POS itself. Samples are written in bulk with SQL
+    and never edited; changing a report replaces its samples.
+    """
+    _name = "helpdesk.device.metric"
+    _description = "Help Desk Device Health Sample"
+    _order = "timestamp desc"
+    _log_access = False
+
+    report_id = fields.Many2one("helpdesk.visit.report", ondelete="cascade", required=True, index=True, readonly=True)
+    branch_id = fields.Many2one("helpdesk.branch", string="Branch", required=True, readonly=True)
+    device_id = fields.Many2one("helpdesk.device", string="Device", readonly=True)
+    metric = fields.Selection(METRICS, required=True, readonly=True)
+    value = fields.Float(readonly=True, group_operator="avg")
+    timestamp = fields.Datetime(required=True, readonly=True)
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS helpdesk_device_metric_branch_metric_ts_idx
+            ON helpdesk_device_metric (branch_id, metric, timestamp)
+        """)
+
+    @api.model
+    def _append_for_reports(self, report_ids):
+        """(Re)write the samples of the given reports and refresh their rollups."""
+        if not report_ids:
+            return
+        report_ids = list(report_ids)
+        self.env["helpdesk.visit.report"].flush_model()
+        self.env["helpdesk.visit.device.line"].flush_model()
+        cr = self.env.cr
+        cr.execute("""
+            DELETE FROM helpdesk_device_metric
+            WHERE report_id = ANY(%s)
+            RETURNING branch_id, timestamp::date
+        """, (report_ids,))
+        keys = set(cr.fetchall())
+        # Usage fields default to 0 when the technician leaves them blank, so 0 means "not measured"
+        cr.execute("""
+            INSERT INTO helpdesk_device_metric (report_id, branch_id, device_id, metric, value, timestamp)
+            SELECT r.id, r.branch_id, NULL, m.metric, m.value, r.visit_datetime
+            FROM helpdesk_visit_report r
+            CROSS JOIN LATERAL (VALUES
+                ('pos_hdd_usage', NULLIF(r.pos_hdd_usage, 0)),
+                ('pos_cpu_usage', NULLIF(r.pos_cpu_usage, 0)),
+                ('pos_os_activated', CASE r.pos_os_status WHEN 'activated' THEN 1.0 WHEN 'not_activated' THEN 0.0 END),
+                ('pos_working', CASE r.pos_overall_status WHEN 'working' THEN 1.0 WHEN 'not_working' THEN 0.0 END)
+            ) AS m(metric, value)
+            WHERE r.id = ANY(%s) AND m.value IS NOT NULL AND r.visit_datetime IS NOT NULL
+
+            UNION ALL
+
+            SELECT r.id, r.branch_id, l.device_id, 'device_working',
+                   CASE l.overall_status WHEN 'working' THEN 1.0 ELSE 0.0 END,
+                   r.visit_datetime
+            FROM helpdesk_visit_device_line l
+            JOIN helpdesk_visit_report r ON r.id = l.report_id
+            WHERE r.id = ANY(%s) AND r.visit_datetime IS NOT NULL
+            RETURNING branch_id, timestamp::date
+        """, (report_ids, report_ids))
+        keys.update(cr.fetchall())
+        self.invalidate_model()
+        self.env["helpdesk.device.metric.rollup"]._rebuild_keys(keys)
+
+    @api.model
+    def action_rebuild_metrics(self):
+        """Backfill samples and rollups from every existing visit report."""
+        self.env.cr.execute("SELECT id FROM helpdesk_visit_report")
+        self._append_for_reports([r[0] for r in self.env.cr.fetchall()])
+        return True
+
+
+class HelpdeskDeviceMetricRollup(models.Model):
+    _name = "helpdesk.device.metric.rollup"
+    _description = "Help Desk Device Health Rollup"
+    _order = "period_start desc, branch_id"
+    _rec_name = "branch_id"
+
+    period = fields.Selection(PERIODS, required=True, readonly=True)
+    period_start = fields.Date(required=True, readonly=True)
+    branch_id = fields.Many2one("helpdesk.branch", string="Branch", readonly=True)
+    device_id = fields.Many2one("helpdesk.device", string="Device", readonly=True)
+    metric = fields.Selection(METRICS, required=True, readonly=True)
+    sample_count = fields.Integer(string="Samples", readonly=True)
+    value_avg = fields.Float(string="Average", readonly=True, group_operator="avg")
+    value_min = fields.Float(string="Minimum", readonly=True, group_operator="min")
+    value_max = fields.Float(string="Maximum", readonly=True, group_operator="max")
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS helpdesk_device_metric_rollup_lookup_idx
+            ON helpdesk_device_metric_rollup (period, metric, branch_id, period_start)
+        """)
+
+    @api.model
+    def _rebuild_keys(self, keys):
+        """Recompute day and week rollups covering the given (branch_id, date) keys."""
+        keys = [(b, d) for b, d in keys if b and d]
+        if not keys:
+            return
+        self.flush_model()
+        cr = self.env.cr
+        branch_ids = [k[0] for k in keys]
+        dates = [k[1] for k in keys]
+        for period in ("day", "week"):
+            cr.execute("""
+                DELETE FROM helpdesk_device_metric_rollup ru
+                USING (
+                    SELECT DISTINCT b AS branch_id, date_trunc(%s, d)::date AS period_start
+                    FROM unnest(%s::int[], %s::date[]) AS k(b, d)
+                ) k
+                WHERE ru.period = %s AND ru.branch_id = k.branch_id AND ru.period_start = k.period_start
+            """, (period, branch_ids, dates, period))
+            cr.execute("""
+                WITH k AS (
+                    SELECT DISTINCT b AS branch_id, date_trunc(%s, d)::date AS period_start
+                    FROM unnest(%s::int[], %s::date[]) AS k(b, d)
+                )
+                INSERT INTO helpdesk_device_metric_rollup (
+                    period, period_start, branch_id, device_id, metric,
+                    sample_count, value_avg, value_min, value_max,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT %s, k.period_start, m.branch_id, m.device_id, m.metric,
+                       COUNT(*), AVG(m.value), MIN(m.value), MAX(m.value),
+                       %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC'
+                FROM k
+                JOIN helpdesk_device_metric m
+                  ON m.branch_id = k.branch_id
+                 AND m.timestamp >= k.period_start
+                 AND m.timestamp < k.period_start + ('1 ' || %s)::interval
+                GROUP BY k.period_start, m.branch_id, m.device_id, m.metric
+            """, (period, branch_ids, dates, period, self.env.uid, self.env.uid, period))
+        self.invalidate_model()
+
+    @api.model
+    def get_series(self, branch_id, metric, date_from, date_to, period="day", device_id=False):
+        """Rolled-up values for one branch/metric, oldest first."""
+        domain = [
+            ("period", "=", period),
+            ("branch_id", "=", branch_id),
+            ("metric", "=", metric),
+            ("device_id", "=", device_id),
+            ("period_start", ">=", date_from),
+            ("period_start", "<=", date_to),
+        ]
+        return self.search_read(
+            domain,
+            ["period_start", "sample_count", "value_avg", "value_min", "value_max"],
+            order="period_start asc",
+        )
+
+    @api.model
+    def get_trending_branches(self, metric="pos_hdd_usage", threshold=90.0, weeks=4):
+        """Branches whose weekly average is above ``threshold`` and not going down.
+
+        Looks at the last ``weeks`` weekly rollups of each branch and returns
+        dicts with the branch, its latest average and the weekly slope.
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            WITH recent AS (
+                SELECT branch_id, period_start, value_avg,
+                       ROW_NUMBER() OVER (PARTITION BY branch_id ORDER BY period_start DESC) AS rn
+                FROM helpdesk_device_metric_rollup
+                WHERE period = 'week' AND metric = %s AND device_id IS NULL
+                  AND period_start >= (CURRENT_DATE - (%s * 7))
+            )
+            SELECT branch_id,
+                   MAX(value_avg) FILTER (WHERE rn = 1) AS last_avg,
+                   COALESCE(regr_slope(value_avg, EXTRACT(EPOCH FROM period_start) / 604800.0), 0) AS weekly_slope
+            FROM recent
+            WHERE rn <= %s
+            GROUP BY branch_id
+            HAVING MAX(value_avg) FILTER (WHERE rn = 1) > %s
+               AND COALESCE(regr_slope(value_avg, EXTRACT(EPOCH FROM period_start) / 604800.0), 0) >= 0
+            ORDER BY last_avg DESC
+        """, (metric, weeks, weeks, threshold))
+        return self.env.cr.dictfetchall()
+
+    @api.model
+    def action_open_hdd_trending(self):
+        rows = self.get_trending_branches()
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Branches with HDD Usage Trending over 90%"),
+            "res_model": self._name,
+            "view_mode": "graph,tree",
+            "domain": [
+                ("period", "=", "week"),
+                ("metric", "=", "pos_hdd_usage"),
+                ("device_id", "=", False),
+                ("branch_id", "in", [r["branch_id"] for r in rows]),
+            ],
+        }
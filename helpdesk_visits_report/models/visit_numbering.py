@@ -0,0 +1,53 @@
+# models/visit_numbering.py
+from odoo import api, models
+
+TICKET_SEQUENCE_CODE = "helpdesk.visit.report.ticket"
+TICKET_SUFFIX = "VN"
+
+
+class HelpdeskVisitNumbering(models.AbstractModel):
+    _name = "helpdesk.visit.numbering"
+    _description = "Help Desk Visit Report - Ticket Numbering"
+
+    @api.model
+    def format_ticket_number(self, number):
+        return f"{int(number):02d}{TICKET_SUFFIX}"
+
+    @api.model
+    def _get_ticket_sequence(self):
+        seq = self.env["ir.sequence"].sudo().search([("code", "=", TICKET_SEQUENCE_CODE)], limit=1)
+        if seq:
+            return seq
+        # Sequence record was deleted: recreate it after the highest number already issued
+        self.env.cr.execute("""
+            SELECT COALESCE(MAX(substring(ticket_number FROM '^([0-9]+)VN$')::bigint), 0)
+            FROM helpdesk_visit_report
+        """)
+        last = self.env.cr.fetchone()[0]
+        return self.env["ir.sequence"].sudo().create({
+            "name": "Helpdesk Visit Ticket",
+            "code": TICKET_SEQUENCE_CODE,
+            "padding": 1,
+            "number_next": last + 1,
+            "implementation": "no_gap",
+        })
+
+    @api.model
+    def allocate_ticket_numbers(self, count):
+        """Reserve ``count`` consecutive ticket numbers in a single statement.
+
+        The UPDATE takes the sequence row lock until commit, so concurrent
+        website submissions queue up instead of reading the same value.
+        """
+        if count <= 0:
+            return []
+        seq = self._get_ticket_sequence()
+        self.env.cr.execute("""
+            UPDATE ir_sequence
+               SET number_next = number_next + %s
+             WHERE id = %s
+         RETURNING number_next - %s
+        """, (count, seq.id, count))
+        first = self.env.cr.fetchone()[0]
+        seq.invalidate_recordset(["number_next"])
+        return [self.format_ticket_number(first + i) for i in range(count)]
@@ -2,6 +2,8 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
 
+from .device_metric import METRIC_SOURCE_FIELDS
+
 POS_STATUS = [("working", "Working"), ("not_working", "Not Working")]
 OS_STATUS = [("activated", "Activated"), ("not_activated", "Not Activated")]
 REPORT_STATE = [("draft", "Draft"), ("authorized", "Authorized")]
@@ -62,6 +64,10 @@ class HelpdeskVisitReport(models.Model):
     # State
     state = fields.Selection(REPORT_STATE, default="draft", tracking=True)
 
+    _sql_constraints = [
+        ("ticket_number_uniq", "unique(ticket_number)", "Ticket number must be unique."),
+    ]
+
     @api.constrains("pos_hdd_usage", "pos_cpu_usage")
     def _check_percentages(self):
         for rec in self:
@@ -77,22 +83,36 @@ class HelpdeskVisitReport(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
+        # Number the whole batch before insert: one sequence hit, no per-record write
+        pending = [vals for vals in vals_list if vals.get("ticket_number") in (None, False, "", "/", "New")]
+        numbers = self.env["helpdesk.visit.numbering"].allocate_ticket_numbers(len(pending))
+        for vals, number in zip(pending, numbers):
+            vals["ticket_number"] = number
         records = super().create(vals_list)
-        for rec in records.sudo():
-            if not rec.ticket_number or rec.ticket_number in ("/", "New"):
-                seq = self.env["ir.sequence"].next_by_code("helpdesk.visit.report.ticket")
-                if not seq:
-                    # Fallback to keep it monotonic even if the sequence record is missing
-                    last = self.search([], order="create_date desc", limit=1)
-                    try:
-                        cur = int((last.ticket_number or "0").rstrip("VN")) if (last and last.ticket_number and last.ticket_number.endswith("VN")) else 0
-                    except Exception:
-                        cur = 0
-                    seq = str(cur + 1)
-                rec.ticket_number = f"{int(seq):02d}VN"
-            rec.message_post(body=_("Ticket created from website."))
+        self.env["helpdesk.device.metric"].sudo()._append_for_reports(records.ids)
+        if not self.env.context.get("import_file"):
+            for rec in records.sudo():
+                rec.message_post(body=_("Ticket created from website."))
         return records
 
+    def write(self, vals):
+        res = super().write(vals)
+        if METRIC_SOURCE_FIELDS & set(vals):
+            self.env["helpdesk.device.metric"].sudo()._append_for_reports(self.ids)
+        return res
+
+    def unlink(self):
+        # Samples go away with the report (ondelete cascade); keep the rollups in step
+        self.env.cr.execute("""
+            SELECT DISTINCT branch_id, timestamp::date
+            FROM helpdesk_device_metric
+            WHERE report_id = ANY(%s)
+        """, (self.ids,))
+        keys = self.env.cr.fetchall()
+        res = super().unlink()
+        self.env["helpdesk.device.metric.rollup"].sudo()._rebuild_keys(keys)
+        return res
+
 
 class HelpdeskVisitDeviceLine(models.Model):
     _name = "helpdesk.visit.device.line"
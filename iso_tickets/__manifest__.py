@@ -25,10 +25,12 @@
 
         # Reporting (now safe to reference the root menu)
         "views/reporting_views.xml",
+        "views/compliance_views.xml",
 
         # Data / sequences
         "data/iso_ticket_sequences.xml",
         "data/iso_default_shifts.xml",
+        "data/iso_compliance_cron.xml",
         # "data/iso_sections.xml",
 
         # Website
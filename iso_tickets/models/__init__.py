@@ -4,4 +4,5 @@ from . import iso_section
 from . import iso_statement
 from . import iso_ticket
 from . import res_config_settings
-from . import iso_config
\ No newline at end of file
+from . import iso_config
+from . import iso_compliance
\ No newline at end of file
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+WATERMARK_PARAM = "iso_tickets.compliance_last_run"
+# Lines committed late by a transaction still open at the previous run carry a
+# create_date before it; rescanning this far back picks them up (rebuilds are idempotent)
+WATERMARK_MARGIN = timedelta(hours=1)
+
+
+class IsoComplianceFact(models.Model):
+    """Daily compliance facts per (branch, section, shift, statement, date).
+
+    Rows are derived from iso.ticket.line and never edited by hand: the cron
+    picks up lines created since the last run (minus WATERMARK_MARGIN), and edits/deletes on tickets or
+    lines rebuild the (branch, date) buckets they touch.
+    """
+    _name = "iso.compliance.fact"
+    _description = "ISO Compliance Daily Fact"
+    _order = "date desc, branch_id, section_id"
+    _rec_name = "statement_id"
+
+    branch_id = fields.Many2one("iso.branch", readonly=True, index=True)
+    section_id = fields.Many2one("iso.section", readonly=True, index=True)
+    shift_id = fields.Many2one("iso.shift", readonly=True)
+    statement_id = fields.Many2one("iso.statement", readonly=True)
+    date = fields.Date(readonly=True, index=True)
+
+    line_count = fields.Integer(string="Checks", readonly=True)
+    exist_count = fields.Integer(string="Exist", readonly=True)
+    not_exist_count = fields.Integer(string="Not Exist", readonly=True)
+    exist_qty = fields.Float(string="Exist Qty", digits=(16, 2), readonly=True)
+    not_exist_qty = fields.Float(string="Not Exist Qty", digits=(16, 2), readonly=True)
+    # Re-derived from the summed counts in read_group, so it stays correct at any grouping level
+    compliance_rate = fields.Float(string="Compliance %", digits=(16, 2), readonly=True, group_operator="avg")
+
+    _sql_constraints = [
+        ("iso_compliance_fact_key_uniq",
+         "unique(branch_id, section_id, shift_id, statement_id, date)",
+         "Only one compliance fact per branch, section, shift, statement and day."),
+    ]
+
+    def init(self):
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS iso_compliance_fact_branch_section_date_idx
+            ON iso_compliance_fact (branch_id, section_id, date)
+        """)
+
+    # ===== Refresh =====
+
+    @api.model
+    def _rebuild_keys(self, keys):
+        """Recompute every fact row of the given (branch_id, date) buckets."""
+        keys = [(b, d) for b, d in keys if b and d]
+        if not keys:
+            return
+        self.flush_model()
+        self.env["iso.ticket"].flush_model(["branch_id", "shift_id", "date"])
+        self.env["iso.ticket.line"].flush_model(["ticket_id", "statement_id", "section_id", "selection", "quantity"])
+        branch_ids = [k[0] for k in keys]
+        dates = [k[1] for k in keys]
+        self._cr.execute("""
+            DELETE FROM iso_compliance_fact f
+            USING unnest(%s::int[], %s::date[]) AS k(branch_id, date)
+            WHERE f.branch_id = k.branch_id AND f.date = k.date
+        """, (branch_ids, dates))
+        self._cr.execute("""
+            WITH k AS (
+                SELECT DISTINCT * FROM unnest(%s::int[], %s::date[]) AS k(branch_id, date)
+            )
+            INSERT INTO iso_compliance_fact (
+                branch_id, section_id, shift_id, statement_id, date,
+                line_count, exist_count, not_exist_count, exist_qty, not_exist_qty,
+                compliance_rate, create_uid, create_date, write_uid, write_date
+            )
+            SELECT
+                t.branch_id, l.section_id, t.shift_id, l.statement_id, t.date,
+                COUNT(*),
+                COUNT(*) FILTER (WHERE l.selection = 'exist'),
+                COUNT(*) FILTER (WHERE l.selection = 'not_exist'),
+                COALESCE(SUM(l.quantity) FILTER (WHERE l.selection = 'exist'), 0),
+                COALESCE(SUM(l.quantity) FILTER (WHERE l.selection = 'not_exist'), 0),
+                ROUND(100.0 * COUNT(*) FILTER (WHERE l.selection = 'exist') / COUNT(*), 2),
+                %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC'
+            FROM iso_ticket_line l
+            JOIN iso_ticket t ON t.id = l.ticket_id
+            JOIN k ON k.branch_id = t.branch_id AND k.date = t.date
+            GROUP BY t.branch_id, l.section_id, t.shift_id, l.statement_id, t.date
+        """, (branch_ids, dates, self.env.uid, self.env.uid))
+        self.invalidate_model()
+
+    @api.model
+    def _keys_for_lines(self, lines):
+        return {(l.ticket_id.branch_id.id, l.ticket_id.date) for l in lines}
+
+    @api.model
+    def cron_refresh_compliance_facts(self):
+        """Fold ticket lines created since the previous run into the fact table."""
+        icp = self.env["ir.config_parameter"].sudo()
+        last_run = fields.Datetime.to_datetime(icp.get_param(WATERMARK_PARAM))
+        # Transaction start: lines committed after this run's snapshot are newer or within the margin
+        now = self._cr.now()
+        self.env["iso.ticket.line"].flush_model(["ticket_id"])
+        self._cr.execute("""
+            SELECT DISTINCT t.branch_id, t.date
+            FROM iso_ticket_line l
+            JOIN iso_ticket t ON t.id = l.ticket_id
+            WHERE l.create_date >= COALESCE(%s::timestamp, '-infinity')
+        """, (last_run and last_run - WATERMARK_MARGIN,))
+        self.sudo()._rebuild_keys(self._cr.fetchall())
+        icp.set_param(WATERMARK_PARAM, fields.Datetime.to_string(now))
+
+    @api.model
+    def action_rebuild_all(self):
+        """Full rebuild, e.g. after restoring old checklists."""
+        self._cr.execute("SELECT DISTINCT branch_id, date FROM iso_ticket")
+        self.sudo()._rebuild_keys(self._cr.fetchall())
+        self.env["ir.config_parameter"].sudo().set_param(WATERMARK_PARAM, fields.Datetime.to_string(self._cr.now()))
+        return True
+
+    # ===== Reporting =====
+
+    @api.model
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        wants_rate = any(f.split(":")[0] == "compliance_rate" for f in fields)
+        if wants_rate:
+            # A weighted ratio needs the group sums, which the pivot may not have asked for
+            requested = {f.split(":")[0] for f in fields}
+            fields = list(fields) + [f"{f}:sum" for f in ("line_count", "exist_count") if f not in requested]
+        res = super().read_group(domain, fields, groupby, offset=offset, limit=limit, orderby=orderby, lazy=lazy)
+        if wants_rate:
+            for g in res:
+                checks = g.get("line_count") or 0
+                g["compliance_rate"] = round(100.0 * (g.get("exist_count") or 0) / checks, 2) if checks else 0.0
+        return res
+
+    @api.model
+    def get_compliance_trend(self, date_from, date_to, interval="month", branch_ids=None, section_ids=None):
+        """Compliance percentage per (period, branch, section).
+
+        :param interval: 'day', 'week', 'month' or 'year'
+        :return: list of dicts ordered by period
+        """
+        if interval not in ("day", "week", "month", "year"):
+            interval = "month"
+        where = ["f.date >= %s", "f.date <= %s"]
+        params = [interval, date_from, date_to]
+        if branch_ids:
+            where.append("f.branch_id = ANY(%s)")
+            params.append(list(branch_ids))
+        if section_ids:
+            where.append("f.section_id = ANY(%s)")
+            params.append(list(section_ids))
+        self._cr.execute(f"""
+            SELECT
+                date_trunc(%s, f.date)::date AS period,
+                f.branch_id,
+                f.section_id,
+                SUM(f.line_count) AS checks,
+                SUM(f.exist_count) AS exist,
+                SUM(f.not_exist_count) AS not_exist
+            FROM iso_compliance_fact f
+            WHERE {" AND ".join(where)}
+            GROUP BY 1, f.branch_id, f.section_id
+            ORDER BY 1, f.branch_id, f.section_id
+        """, params)
+        result = []
+        for row in self._cr.dictfetchall():
+            row["period"] = fields.Date.to_string(row["period"])
+            row["compliance_rate"] = round(100.0 * row["exist"] / row["checks"], 2) if row["checks"] else 0.0
+            result.append(row)
+        return result
+
+
+class IsoTicketCompliance(models.Model):
+    _inherit = "iso.ticket"
+
+    def write(self, vals):
+        tracked = {"branch_id", "shift_id", "date"}
+        if not tracked & set(vals):
+            return super().write(vals)
+        Fact = self.env["iso.compliance.fact"].sudo()
+        keys = {(t.branch_id.id, t.date) for t in self}
+        res = super().write(vals)
+        Fact._rebuild_keys(keys | {(t.branch_id.id, t.date) for t in self})
+        return res
+
+    def unlink(self):
+        keys = {(t.branch_id.id, t.date) for t in self}
+        res = super().unlink()
+        self.env["iso.compliance.fact"].sudo()._rebuild_keys(keys)
+        return res
+
+
+class IsoTicketLineCompliance(models.Model):
+    _inherit = "iso.ticket.line"
+
+    def init(self):
+        super().init()
+        # The compliance cron scans lines by creation time
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS iso_ticket_line_create_date_idx
+            ON iso_ticket_line (create_date)
+        """)
+
+    def write(self, vals):
+        Fact = self.env["iso.compliance.fact"].sudo()
+        keys = Fact._keys_for_lines(self)
+        res = super().write(vals)
+        Fact._rebuild_keys(keys | Fact._keys_for_lines(self))
+        return res
+
+    def unlink(self):
+        Fact = self.env["iso.compliance.fact"].sudo()
+        keys = Fact._keys_for_lines(self)
+        res = super().unlink()
+        Fact._rebuild_keys(keys)
+        return res
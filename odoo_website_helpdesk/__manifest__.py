@@ -21,7 +21,7 @@
 ############################################################################
 {
     'name': "Website Helpdesk Support Ticket Management",
-    'version': '17.0.1.0.4',
+    'version': '17.0.1.0.5',
     'category': 'Website',
     'summary': """The website allows for the creation of tickets, which can 
     then be controlled from the backend. Furthermore, a bill that includes 
@@ -46,6 +46,9 @@
         'data/ir_sequence_data.xml',
         'data/mail_template_data.xml',
         'data/ticket_stage_data.xml',
+        'data/helpdesk_sla_data.xml',
+        'data/res_partner_data.xml',
+        'data/helpdesk_duplicate_data.xml',
         'views/helpdesk_category_views.xml',
         'views/helpdesk_tag_views.xml',
         'views/helpdesk_type_views.xml',
@@ -58,6 +61,10 @@
         'views/team_helpdesk_views.xml',
         'views/ticket_helpdesk_views.xml',
         'views/ticket_stage_views.xml',
+        'views/helpdesk_sla_views.xml',
+        'views/helpdesk_assignment_views.xml',
+        'views/helpdesk_duplicate_views.xml',
+        'views/ticket_batch_invoice_views.xml',
         'views/website_form.xml',
         'views/helpdesk_views.xml',
     ],
@@ -1,11 +1,14 @@
-
+import io
+import zipfile
 from werkzeug.utils import redirect
 
-from odoo import http
+from odoo import http, _
 from odoo.addons.portal.controllers import portal
+from odoo.addons.portal.controllers.portal import pager as portal_pager
 
 from odoo.exceptions import AccessError
 from odoo.http import request
+from odoo.tools import pdf
 
 
 class TicketPortal(portal.CustomerPortal):
@@ -18,8 +21,9 @@ class TicketPortal(portal.CustomerPortal):
         """
         values = super()._prepare_home_portal_values(counters)
         if 'ticket_count' in counters:
-            ticket_count = request.env['ticket.helpdesk'].search_count(
-                self._get_tickets_domain()) if request.env[
+            # Maintained on the partner by ticket create/write/unlink
+            ticket_count = request.env.user.partner_id.sudo(
+            ).helpdesk_ticket_count if request.env[
                 'ticket.helpdesk'].check_access_rights(
                 'read', raise_exception=False) else 0
             values['ticket_count'] = ticket_count
@@ -33,19 +37,73 @@ class TicketPortal(portal.CustomerPortal):
         """
         return [('customer_id', '=', request.env.user.partner_id.id)]
 
-    @http.route(['/my/tickets'], type='http', auth="user", website=True)
-    def portal_my_tickets(self):
+    def _get_tickets_searchbar_sortings(self):
+        """Sort options of the portal ticket list"""
+        return {
+            'date': {'label': _('Newest'), 'order': 'create_date desc, id desc'},
+            'date_asc': {'label': _('Oldest'),
+                         'order': 'create_date asc, id asc'},
+            'name': {'label': _('Reference'), 'order': 'name desc'},
+        }
+
+    def _get_tickets_searchbar_filters(self):
+        """Filter options of the portal ticket list"""
+        return {
+            'all': {'label': _('All'), 'domain': []},
+            'open': {'label': _('Open'), 'domain': [
+                ('stage_id.closing_stage', '=', False),
+                ('stage_id.cancel_stage', '=', False)]},
+            'closed': {'label': _('Closed'), 'domain': [
+                ('stage_id.closing_stage', '=', True)]},
+        }
+
+    @http.route(['/my/tickets', '/my/tickets/page/<int:page>'], type='http',
+                auth="user", website=True)
+    def portal_my_tickets(self, page=1, sortby=None, filterby=None, **kw):
         """
-        Route to display the tickets associated with the current customer.
+        Route to display the tickets associated with the current customer,
+        one page at a time.
+        Args:
+            page (int): Page of the list to show.
+            sortby (str): Key of _get_tickets_searchbar_sortings.
+            filterby (str): Key of _get_tickets_searchbar_filters.
         Returns:
             http.Response: The HTTP response rendering the tickets page.
         """
-        domain = self._get_tickets_domain()
-        tickets = request.env['ticket.helpdesk'].sudo().search(domain)
+        Ticket = request.env['ticket.helpdesk'].sudo()
+        searchbar_sortings = self._get_tickets_searchbar_sortings()
+        searchbar_filters = self._get_tickets_searchbar_filters()
+        if sortby not in searchbar_sortings:
+            sortby = 'date'
+        if filterby not in searchbar_filters:
+            filterby = 'all'
+        domain = self._get_tickets_domain() + \
+            searchbar_filters[filterby]['domain']
+        if filterby == 'all':
+            ticket_count = request.env.user.partner_id.sudo(
+            ).helpdesk_ticket_count
+        else:
+            ticket_count = Ticket.search_count(domain)
+        pager = portal_pager(
+            url='/my/tickets',
+            url_args={'sortby': sortby, 'filterby': filterby},
+            total=ticket_count,
+            page=page,
+            step=self._items_per_page,
+        )
+        tickets = Ticket.search(domain,
+                                order=searchbar_sortings[sortby]['order'],
+                                limit=self._items_per_page,
+                                offset=pager['offset'])
         values = {
             'default_url': "/my/tickets",
             'tickets': tickets,
             'page_name': 'ticket',
+            'pager': pager,
+            'searchbar_sortings': searchbar_sortings,
+            'sortby': sortby,
+            'searchbar_filters': searchbar_filters,
+            'filterby': filterby,
         }
         return request.render("odoo_website_helpdesk.portal_my_tickets", values)
 
@@ -76,21 +134,58 @@ class TicketPortal(portal.CustomerPortal):
                 website=True)
     def ticket_download_portal(self, **kwargs):
         """
-        Route to download a PDF version of a specific ticket.
+        Route to download a PDF version of a specific ticket. The PDF is
+        served from the ticket's cached attachment when it is up to date.
         Args:
             ticket (str): The ID of the ticket to be downloaded.
         Returns:
             http.Response: The HTTP response with the PDF file for download.
         """
-        ticket_id = int(kwargs.get('id'))
-        data = {
-            'help': request.env['ticket.helpdesk'].sudo().browse(ticket_id)}
-        report = request.env.ref(
-            'odoo_website_helpdesk.report_ticket')
-        pdf, _ = report.sudo()._render_qweb_pdf(
-            report, res_ids=ticket_id, data=data)
+        ticket = request.env['ticket.helpdesk'].sudo().browse(
+            int(kwargs.get('id'))).exists()
+        if not ticket or ticket.customer_id != request.env.user.partner_id:
+            return redirect('/my/tickets')
+        content = ticket._get_pdf_streams()[ticket]
         pdf_http_headers = [('Content-Type', 'application/pdf'),
-                            ('Content-Length', len(pdf)),
+                            ('Content-Length', len(content)),
                             ('Content-Disposition',
                              'attachment; filename="Helpdesk Ticket.pdf"')]
-        return request.make_response(pdf, headers=pdf_http_headers)
+        return request.make_response(content, headers=pdf_http_headers)
+
+    @http.route('/helpdesk/tickets/export', auth='user', type='http')
+    def ticket_export_pdf(self, ids='', format='zip', **kwargs):
+        """
+        Route to export many tickets at once, for audits.
+        Args:
+            ids (str): Comma separated ticket IDs.
+            format (str): 'zip' for one PDF per ticket, 'pdf' for a single
+                merged PDF.
+        Returns:
+            http.Response: The ZIP or PDF file.
+        """
+        tickets = request.env['ticket.helpdesk'].browse(
+            [int(i) for i in ids.split(',') if i.strip().isdigit()]).exists()
+        # Read access of the current user decides what may be exported
+        tickets.check_access_rights('read')
+        tickets.check_access_rule('read')
+        streams = tickets.sudo()._get_pdf_streams()
+        if format == 'pdf':
+            content = pdf.merge_pdf([streams[t] for t in tickets.sudo()
+                                     if streams[t]])
+            return request.make_response(content, headers=[
+                ('Content-Type', 'application/pdf'),
+                ('Content-Length', len(content)),
+                ('Content-Disposition',
+                 'attachment; filename="Helpdesk Tickets.pdf"')])
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for ticket, content in streams.items():
+                if content:
+                    archive.writestr(
+                        '%s.pdf' % ticket.name.replace('/', '_'), content)
+        content = buffer.getvalue()
+        return request.make_response(content, headers=[
+            ('Content-Type', 'application/zip'),
+            ('Content-Length', len(content)),
+            ('Content-Disposition',
+             'attachment; filename="Helpdesk Tickets.zip"')])
@@ -19,13 +19,57 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 ##############################################################################
+import json
 from odoo import http
 from odoo.http import request
+from odoo.osv import expression
+
+# Tickets rendered per group; the rest come through "Load more"
+GROUP_PAGE_SIZE = 20
 
 
 class TicketGroupBy(http.Controller):
     """Controller for handling ticket grouping based on different criteria."""
 
+    # Dropdown value -> read_group groupby spec (False means no grouping).
+    # Inherit the controller and extend this to add dimensions.
+    _group_dimensions = {
+        '0': False,
+        '1': 'stage_id',
+        '2': 'ticket_type_id',
+        '3': 'team_id',
+        '4': 'priority',
+        '5': 'create_date:month',
+    }
+
+    def _get_group_base_domain(self):
+        """Tickets the current portal user may group."""
+        return [('user_id', '=', request.env.user.id)]
+
+    def _get_group_label(self, groupby, value):
+        """Readable header for a read_group value."""
+        if not value:
+            return 'Undefined'
+        if isinstance(value, tuple):
+            return value[1]
+        field = request.env['ticket.helpdesk']._fields[groupby.split(':')[0]]
+        if field.type == 'selection':
+            return dict(field._description_selection(request.env)).get(
+                value, value)
+        return str(value)
+
+    def _render_group_rows(self, tickets, domain, offset, count):
+        """Rows of one group, followed by a "Load more" row if needed."""
+        values = {
+            'tickets': tickets,
+            'group_domain': json.dumps(domain),
+            'next_offset': offset + len(tickets),
+            'has_more': offset + len(tickets) < count,
+            'group_count': count,
+        }
+        return request.env['ir.qweb']._render(
+            'odoo_website_helpdesk.ticket_group_by_rows', values)
+
     @http.route(['/ticketgroupby'], type='json', auth="public", website=True)
     def ticket_group_by(self, **kwargs):
         """grouping tickets based on user-defined criteria.
@@ -34,43 +78,37 @@ class TicketGroupBy(http.Controller):
         Returns:
         - http.Response: Rendered HTTP response containing grouped ticket information.
         """
+        Ticket = request.env['ticket.helpdesk']
+        base_domain = self._get_group_base_domain()
+        groupby = self._group_dimensions.get(kwargs.get("search_value"))
         context = []
-        group_value = kwargs.get("search_value")
-        if group_value == '0':
-            context = []
-            tickets = request.env["ticket.helpdesk"].search(
-                [('user_id', '=', request.env.user.id)])
-            if tickets:
+        if not groupby:
+            count = Ticket.search_count(base_domain)
+            if count:
+                tickets = Ticket.search(base_domain, limit=GROUP_PAGE_SIZE,
+                                        order='id desc')
                 context.append({
                     'name': '',
-                    'data': tickets
+                    'rows': self._render_group_rows(tickets, [], 0, count),
+                })
+        else:
+            # One grouped query for the counts, then only the first page of
+            # each group; the pages are fetched together for rendering
+            groups = Ticket.read_group(base_domain, ['__count'], [groupby],
+                                       orderby=groupby, lazy=False)
+            pages = [(group, Ticket.search(group['__domain'],
+                                           limit=GROUP_PAGE_SIZE,
+                                           order='id desc'))
+                     for group in groups]
+            Ticket.browse([i for _group, page in pages for i in page.ids]
+                          ).fetch(['name', 'subject', 'description', 'cost',
+                                   'priority', 'create_date', 'stage_id'])
+            for group, page in pages:
+                context.append({
+                    'name': self._get_group_label(groupby, group[groupby]),
+                    'rows': self._render_group_rows(
+                        page, group['__domain'], 0, group['__count']),
                 })
-        if group_value == '1':
-            context = []
-            stage_ids = request.env['ticket.stage'].search([])
-            for stage in stage_ids:
-                ticket_ids = request.env['ticket.helpdesk'].search([
-                    ('stage_id', '=', stage.id),
-                    ('user_id', '=', request.env.user.id)
-                ])
-                if ticket_ids:
-                    context.append({
-                        'name': stage.name,
-                        'data': ticket_ids
-                    })
-        if group_value == '2':
-            context = []
-            type_ids = request.env['helpdesk.type'].search([])
-            for types in type_ids:
-                ticket_ids_1 = request.env['ticket.helpdesk'].search([
-                    ('ticket_type_id', '=', types.id),
-                    ('user_id', '=', request.env.user.id)
-                ])
-                if ticket_ids_1:
-                    context.append({
-                        'name': types.name,
-                        'data': ticket_ids_1
-                    })
         values = {
             'tickets': context,
         }
@@ -78,3 +116,24 @@ class TicketGroupBy(http.Controller):
             template='odoo_website_helpdesk.ticket_group_by_table',
             qcontext=values)
         return response.render()
+
+    @http.route(['/ticketgroupby/more'], type='json', auth="public",
+                website=True)
+    def ticket_group_by_more(self, group_domain='[]', offset=0, **kwargs):
+        """Next page of tickets of one group, rendered as table rows.
+        Args:
+        - group_domain (str): JSON domain of the group, as rendered. It is
+          always narrowed to the user's own tickets again here.
+        - offset (int): Number of tickets of the group already shown.
+        Returns:
+        - str: The rendered rows.
+        """
+        offset = int(offset or 0)
+        domain = expression.AND([self._get_group_base_domain(),
+                                 json.loads(group_domain)])
+        Ticket = request.env['ticket.helpdesk']
+        count = Ticket.search_count(domain)
+        tickets = Ticket.search(domain, offset=offset,
+                                limit=GROUP_PAGE_SIZE, order='id desc')
+        return self._render_group_rows(tickets, json.loads(group_domain),
+                                       offset, count)
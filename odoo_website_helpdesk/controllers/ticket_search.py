@@ -21,25 +21,33 @@
 ##############################################################################
 from odoo import http
 from odoo.http import request
+from odoo.addons.odoo_website_helpdesk.models.ticket_search import \
+    SEARCH_RESULT_CAP
 
 
 class TicketSearch(http.Controller):
     @http.route(['/ticketsearch'], type='json', auth="public", website=True)
     def ticket_search(self, **kwargs):
         """
-        Search for tickets based on the provided search value.
-        :param search_value: The value to search for in the ticket name or subject.
+        Search the current customer's tickets by number, subject,
+        description or customer name.
+        :param search_value: Free text; every word is prefix matched.
         :type search_value: str
-        :return: A JSON response containing the matching tickets.
+        :param page: Page of the ranked results to render (1-based).
+        :type page: int
+        :return: The rendered ticket table for that page.
         :rtype: http.Response
         """
-        search_value = kwargs.get("search_value")
-        tickets = request.env["ticket.helpdesk"].search(
-            ['|', ('name', 'ilike', search_value),
-             ('subject', 'ilike', search_value)])
-        values = {
-            'tickets': tickets,
-        }
+        search_value = str(kwargs.get("search_value") or '')
+        partner = request.env.user.partner_id
+        if not search_value.strip():
+            tickets = request.env["ticket.helpdesk"].sudo().search(
+                [('customer_id', '=', partner.id)], limit=SEARCH_RESULT_CAP)
+            values = {'tickets': tickets}
+        else:
+            values = request.env["ticket.helpdesk"].sudo()._portal_search(
+                partner.id, search_value, page=kwargs.get('page') or 1)
+            values['search_value'] = search_value
         response = http.Response(template='odoo_website_helpdesk.ticket_table',
                                  qcontext=values)
         return response.render()
@@ -0,0 +1,16 @@
+# migrations/17.0.1.0.5/post-migrate.py
+
+
+def migrate(cr, version):
+    """Fill search_vector for tickets that predate the search trigger.
+
+    The trigger only runs on insert and update, so existing rows are
+    touched once here. New databases start with an empty table and need
+    no backfill.
+    """
+    if not version:
+        return
+    cr.execute("""
+        UPDATE ticket_helpdesk SET name = name
+        WHERE search_vector IS NULL
+    """)
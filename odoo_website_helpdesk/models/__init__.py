@@ -21,14 +21,20 @@
 ##############################################################################
 from . import account_move
 from . import helpdesk_category
+from . import helpdesk_duplicate
+from . import helpdesk_sla
 from . import helpdesk_tag
 from . import helpdesk_type
+from . import helpdesk_workload
 from . import mail_compose_message
 from . import merge_ticket
 from . import project_task
+from . import res_partner
 from . import res_config_settings
 from . import support_ticket
 from . import team_helpdesk
+from . import ticket_batch_invoice
 from . import ticket_helpdesk
+from . import ticket_search
 from . import ticket_stage
 from . import website_menu
@@ -28,3 +28,12 @@ class AccountMove(models.Model):
 
     ticket_id = fields.Many2one('ticket.helpdesk',
                                 string='Ticket', help='ID of the ticket.')
+
+
+class AccountMoveLine(models.Model):
+    """Inheriting the account.move.line model"""
+    _inherit = 'account.move.line'
+
+    helpdesk_ticket_id = fields.Many2one('ticket.helpdesk', string='Ticket',
+                                         index='btree_not_null',
+                                         help='Ticket billed on this line.')
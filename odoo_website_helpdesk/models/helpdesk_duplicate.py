@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Dhanya Babu (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+WATERMARK_PARAM = 'odoo_website_helpdesk.duplicate_last_run'
+# Tickets committed late by a transaction still open at the previous run have
+# a create_date before it; rescanning this far back picks them up
+WATERMARK_MARGIN = timedelta(hours=1)
+
+
+class HelpdeskTicketDuplicate(models.Model):
+    """Pair of tickets that look like the same request.
+
+    Pairs are found by the detection cron in one SQL statement: tickets of
+    the same customer or phone number opened within a few days of each
+    other, scored on the trigram similarity of subject and description.
+    """
+    _name = 'helpdesk.ticket.duplicate'
+    _description = 'Helpdesk Duplicate Ticket Candidate'
+    _order = 'score desc, id desc'
+    _rec_name = 'duplicate_id'
+
+    ticket_id = fields.Many2one('ticket.helpdesk', string='Ticket',
+                                required=True, ondelete='cascade',
+                                readonly=True, index=True,
+                                help='Older ticket of the pair, kept when '
+                                     'merging.')
+    duplicate_id = fields.Many2one('ticket.helpdesk', string='Duplicate',
+                                   required=True, ondelete='cascade',
+                                   readonly=True, index=True,
+                                   help='Newer ticket of the pair.')
+    customer_id = fields.Many2one(related='ticket_id.customer_id',
+                                  string='Customer')
+    match_reason = fields.Selection([('customer', 'Same Customer'),
+                                     ('phone', 'Same Phone')],
+                                    string='Matched On', readonly=True,
+                                    help='Contact detail both tickets share.')
+    score = fields.Float(string='Similarity', digits=(16, 2), readonly=True,
+                         group_operator='max',
+                         help='Best trigram similarity of subject or '
+                              'description (0-1).')
+    state = fields.Selection([('candidate', 'Candidate'),
+                              ('merged', 'Merged'),
+                              ('dismissed', 'Dismissed')],
+                             default='candidate', readonly=True,
+                             help='Candidates are waiting for an agent.')
+
+    _sql_constraints = [
+        ('pair_uniq', 'unique(ticket_id, duplicate_id)',
+         'This pair of tickets is already recorded.'),
+        ('pair_order', 'CHECK(ticket_id < duplicate_id)',
+         'The older ticket must come first in a pair.'),
+    ]
+
+    @api.model
+    def _has_trigram(self):
+        self.env.cr.execute(
+            "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return bool(self.env.cr.fetchone())
+
+    @api.model
+    def _detect(self, since=None, window_days=7, threshold=0.4):
+        """Record candidate pairs involving tickets created since ``since``.
+
+        Scanning a ticket again is harmless: known pairs only get their
+        score refreshed, and dismissed or merged pairs are left alone.
+
+        :param since: datetime, or None to scan every ticket
+        """
+        Ticket = self.env['ticket.helpdesk']
+        Ticket.flush_model(['customer_id', 'phone', 'subject', 'description',
+                            'active', 'merged_into_id', 'create_date'])
+        cr = self.env.cr
+        if self._has_trigram():
+            similarity = """GREATEST(
+                similarity(coalesce(a.subject, ''), coalesce(b.subject, '')),
+                similarity(coalesce(a.description, ''),
+                           coalesce(b.description, '')))"""
+        else:
+            # Without pg_trgm only identical texts count as similar
+            similarity = """CASE WHEN lower(a.subject) = lower(b.subject)
+                OR lower(a.description) = lower(b.description)
+                THEN 1.0 ELSE 0.0 END"""
+        cr.execute("""
+            WITH fresh AS (
+                SELECT id, customer_id, phone, subject, description,
+                       create_date
+                FROM ticket_helpdesk
+                WHERE create_date >= COALESCE(%(since)s::timestamp,
+                                              '-infinity')
+                  AND active AND merged_into_id IS NULL
+            ), pairs AS (
+                SELECT LEAST(f.id, o.id) AS a_id, GREATEST(f.id, o.id) AS b_id,
+                       CASE WHEN f.customer_id = o.customer_id
+                            THEN 'customer' ELSE 'phone' END AS reason
+                FROM fresh f
+                JOIN ticket_helpdesk o
+                  ON o.id <> f.id
+                 AND o.active AND o.merged_into_id IS NULL
+                 AND o.create_date BETWEEN
+                        f.create_date - make_interval(days => %(days)s)
+                    AND f.create_date + make_interval(days => %(days)s)
+                 AND (o.customer_id = f.customer_id OR o.phone = f.phone)
+            ), scored AS (
+                SELECT DISTINCT ON (p.a_id, p.b_id)
+                       p.a_id, p.b_id, p.reason, """ + similarity + """ AS score
+                FROM pairs p
+                JOIN ticket_helpdesk a ON a.id = p.a_id
+                JOIN ticket_helpdesk b ON b.id = p.b_id
+                ORDER BY p.a_id, p.b_id, p.reason
+            )
+            INSERT INTO helpdesk_ticket_duplicate (
+                ticket_id, duplicate_id, match_reason, score, state,
+                create_uid, create_date, write_uid, write_date)
+            SELECT a_id, b_id, reason, score, 'candidate',
+                   %(uid)s, now() AT TIME ZONE 'UTC',
+                   %(uid)s, now() AT TIME ZONE 'UTC'
+            FROM scored
+            WHERE score >= %(threshold)s
+            ON CONFLICT (ticket_id, duplicate_id) DO UPDATE
+               SET score = EXCLUDED.score,
+                   write_date = EXCLUDED.write_date
+             WHERE helpdesk_ticket_duplicate.state = 'candidate'
+        """, {
+            'since': since,
+            'days': window_days,
+            'threshold': threshold,
+            'uid': self.env.uid,
+        })
+        self.invalidate_model()
+
+    @api.model
+    def cron_detect_duplicates(self):
+        """Look for duplicates of the tickets created since the last run"""
+        icp = self.env['ir.config_parameter'].sudo()
+        last_run = fields.Datetime.to_datetime(icp.get_param(WATERMARK_PARAM))
+        # Transaction start: tickets committed after this run's snapshot
+        # are newer, or within the margin
+        now = self.env.cr.now()
+        self.sudo()._detect(last_run and last_run - WATERMARK_MARGIN)
+        icp.set_param(WATERMARK_PARAM, fields.Datetime.to_string(now))
+
+    def action_dismiss(self):
+        self.write({'state': 'dismissed'})
+
+    def action_merge(self):
+        """Merge every selected pair, chaining pairs that share a ticket.
+
+        Each connected group of tickets is merged into its oldest ticket.
+        """
+        pairs = self.filtered(lambda p: p.state == 'candidate')
+        if not pairs:
+            raise UserError(_('Select at least one candidate pair.'))
+        parent = {}
+
+        def find(ticket_id):
+            while parent.get(ticket_id, ticket_id) != ticket_id:
+                ticket_id = parent[ticket_id]
+            return ticket_id
+
+        for pair in pairs:
+            root_a, root_b = find(pair.ticket_id.id), find(pair.duplicate_id.id)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+        groups = {}
+        for ticket_id in set(pairs.ticket_id.ids + pairs.duplicate_id.ids):
+            groups.setdefault(find(ticket_id), []).append(ticket_id)
+        Ticket = self.env['ticket.helpdesk']
+        for target_id, ticket_ids in groups.items():
+            Ticket.browse(ticket_ids).filtered(
+                lambda t: t.id != target_id)._merge_into(
+                Ticket.browse(target_id))
+        pairs.write({'state': 'merged'})
+        return True
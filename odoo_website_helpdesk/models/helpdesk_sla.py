@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Dhanya Babu (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+from odoo import api, fields, models
+from odoo.osv import expression
+
+from .ticket_helpdesk import PRIORITIES
+
+
+class HelpdeskSlaPolicy(models.Model):
+    """SLA policy applied to tickets by team, type and priority"""
+    _name = 'helpdesk.sla.policy'
+    _description = 'Helpdesk SLA Policy'
+    _order = 'sequence, id'
+
+    name = fields.Char(string='Name', required=True, help='Name of the SLA '
+                                                           'policy.')
+    sequence = fields.Integer(string='Sequence', default=10,
+                              help='Order used when several policies are '
+                                   'equally specific.')
+    active = fields.Boolean(string='Active', default=True,
+                            help='Active option for the SLA policy.')
+    team_id = fields.Many2one('team.helpdesk', string='Helpdesk Team',
+                              help='Leave empty to match every team.')
+    ticket_type_id = fields.Many2one('helpdesk.type', string='Ticket Type',
+                                     help='Leave empty to match every type.')
+    priority = fields.Selection(PRIORITIES, string='Priority',
+                                help='Leave empty to match every priority.')
+    start_hours = fields.Float(string='Start Within (Hours)',
+                               help='Hours after creation by which the ticket '
+                                    'must reach a starting stage.')
+    close_hours = fields.Float(string='Close Within (Hours)',
+                               help='Hours after creation by which the ticket '
+                                    'must reach a closing stage.')
+    escalate_user_id = fields.Many2one('res.users', string='Escalate To',
+                                       help='Notified when the SLA is '
+                                            'breached. Defaults to the team '
+                                            'leader.')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Re-match the open tickets the new policies may apply to"""
+        policies = super().create(vals_list)
+        policies._recompute_open_tickets(policies._open_tickets_domain())
+        return policies
+
+    def write(self, vals):
+        """Re-match the open tickets of the teams before and after the
+        change, so stored deadlines follow the policy"""
+        domain = self._open_tickets_domain()
+        res = super().write(vals)
+        self._recompute_open_tickets(expression.OR(
+            [domain, self._open_tickets_domain()]))
+        return res
+
+    def unlink(self):
+        """Tickets of a removed policy fall back to the next matching one"""
+        domain = self._open_tickets_domain()
+        res = super().unlink()
+        self._recompute_open_tickets(domain)
+        return res
+
+    def _open_tickets_domain(self):
+        """Open tickets the policies of self can match"""
+        domain = [('end_date', '=', False)]
+        if not self or not all(self.mapped('team_id')):
+            return domain
+        return expression.AND([domain, [('team_id', 'in', self.team_id.ids)]])
+
+    def _recompute_open_tickets(self, domain):
+        """Recompute SLA policy and deadlines of the tickets in domain"""
+        tickets = self.env['ticket.helpdesk'].search(domain)
+        if not tickets:
+            return
+        for fname in ('sla_policy_id', 'sla_start_deadline',
+                      'sla_close_deadline', 'sla_next_deadline'):
+            self.env.add_to_compute(tickets._fields[fname], tickets)
+        tickets.flush_recordset()
+
+    def _specificity(self):
+        """Number of criteria set on the policy"""
+        self.ensure_one()
+        return bool(self.team_id) + bool(self.ticket_type_id) + bool(
+            self.priority)
+
+    def _match_ticket(self, ticket):
+        """Return the most specific policy of self matching the ticket.
+        self is expected to be sorted by _get_sorted_policies()."""
+        for policy in self:
+            if policy.team_id and policy.team_id != ticket.team_id:
+                continue
+            if policy.ticket_type_id and \
+                    policy.ticket_type_id != ticket.ticket_type_id:
+                continue
+            if policy.priority and policy.priority != ticket.priority:
+                continue
+            return policy
+        return self.browse()
+
+    def _get_sorted_policies(self):
+        """All active policies, most specific first"""
+        policies = self.search([])
+        return policies.sorted(
+            key=lambda p: (-p._specificity(), p.sequence, p.id))
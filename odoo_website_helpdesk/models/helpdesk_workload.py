@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Dhanya Babu (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+from odoo import api, fields, models
+
+
+class HelpdeskUserWorkload(models.Model):
+    """Open ticket counter per helpdesk user, kept in step with the tickets"""
+    _name = 'helpdesk.user.workload'
+    _description = 'Helpdesk User Workload'
+    _order = 'open_ticket_count desc'
+    _rec_name = 'user_id'
+
+    user_id = fields.Many2one('res.users', string='User', required=True,
+                              ondelete='cascade', readonly=True,
+                              help='Helpdesk user')
+    open_ticket_count = fields.Integer(string='Open Tickets', readonly=True,
+                                       help='Assigned tickets that are '
+                                            'neither closed nor cancelled.')
+    last_assigned_date = fields.Datetime(string='Last Assigned',
+                                         readonly=True,
+                                         help='Last automatic assignment, '
+                                              'used by round robin.')
+
+    _sql_constraints = [
+        ('user_uniq', 'unique(user_id)',
+         'Only one workload counter per user.'),
+    ]
+
+    @api.model
+    def _refresh_users(self, user_ids, assigned_now=False):
+        """Recount the open tickets of the given users in one statement"""
+        user_ids = [uid for uid in set(user_ids) if uid]
+        if not user_ids:
+            return
+        self.env['ticket.helpdesk'].flush_model(
+            ['assigned_user_id', 'stage_id', 'active'])
+        self.env['ticket.stage'].flush_model(['closing_stage', 'cancel_stage'])
+        self.env.cr.execute("""
+            INSERT INTO helpdesk_user_workload (
+                user_id, open_ticket_count, last_assigned_date,
+                create_uid, create_date, write_uid, write_date)
+            SELECT u.id, COUNT(t.id), %(assigned)s,
+                   %(uid)s, now() AT TIME ZONE 'UTC',
+                   %(uid)s, now() AT TIME ZONE 'UTC'
+            FROM unnest(%(users)s::int[]) AS u(id)
+            LEFT JOIN ticket_helpdesk t
+                   ON t.assigned_user_id = u.id
+                  AND t.active
+                  AND NOT EXISTS (
+                        SELECT 1 FROM ticket_stage s
+                        WHERE s.id = t.stage_id
+                          AND (s.closing_stage OR s.cancel_stage))
+            GROUP BY u.id
+            ON CONFLICT (user_id) DO UPDATE
+               SET open_ticket_count = EXCLUDED.open_ticket_count,
+                   last_assigned_date = COALESCE(
+                        EXCLUDED.last_assigned_date,
+                        helpdesk_user_workload.last_assigned_date),
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'users': user_ids,
+            'assigned': assigned_now or None,
+            'uid': self.env.uid,
+        })
+        self.invalidate_model()
+
+    @api.model
+    def _get_loads(self, user_ids):
+        """{user_id: (open_ticket_count, last_assigned_date)}"""
+        missing = set(user_ids) - set(
+            self.search([('user_id', 'in', user_ids)]).user_id.ids)
+        if missing:
+            self._refresh_users(missing)
+        return {
+            rec.user_id.id: (rec.open_ticket_count, rec.last_assigned_date)
+            for rec in self.search([('user_id', 'in', user_ids)])
+        }
+
+    @api.model
+    def action_recompute_all(self):
+        """Rebuild every counter, e.g. after stage flags changed"""
+        self.env.cr.execute("""
+            SELECT DISTINCT assigned_user_id FROM ticket_helpdesk
+            WHERE assigned_user_id IS NOT NULL
+            UNION
+            SELECT user_id FROM helpdesk_user_workload
+        """)
+        self._refresh_users([row[0] for row in self.env.cr.fetchall()])
+        return True
@@ -60,21 +60,17 @@ class MergeTicket(models.Model):
         active_ids = self._context.get('active_ids', [])
         selected_tickets = self.env['ticket.helpdesk'].browse(active_ids)
         customer_ids = selected_tickets.mapped('customer_id')
-        subjects = selected_tickets.mapped('subject')
-        display_names = selected_tickets.mapped('display_name')
         helpdesk_team = selected_tickets.mapped('team_id')
-        descriptions = selected_tickets.mapped('description')
         if len(customer_ids):
             defaults.update({
                 'customer_id': customer_ids[0].id,
                 'support_team_id': helpdesk_team,
                 'support_ticket_ids': [(0, 0, {
-                    'subject': subject,
-                    'display_name': display_name,
-                    'description': description,
-                }) for subject, display_name, description in
-                                       zip(subjects, display_names,
-                                           descriptions)]
+                    'subject': ticket.subject,
+                    'display_name': ticket.display_name,
+                    'description': ticket.description,
+                    'ticket_id': ticket.id,
+                }) for ticket in selected_tickets]
             })
         return defaults
 
@@ -85,12 +81,13 @@ class MergeTicket(models.Model):
                 f"{ticket.subject}\n{'-' * len(ticket.subject)}\n{ticket.description}"
                 for ticket in self.support_ticket_ids
             )
-            self.env['ticket.helpdesk'].create({
+            target = self.env['ticket.helpdesk'].create({
                 'subject': self.subject,
                 'description': description,
                 'customer_id': self.customer_id.id,
                 'team_id': self.support_team_id.id,
             })
+            self.support_ticket_ids.ticket_id._merge_into(target)
         else:
             if len(self.support_ticket_ids):
                 description = "\n\n".join(
@@ -99,9 +96,9 @@ class MergeTicket(models.Model):
                 )
                 self.support_ticket_id.write({
                     'description': description,
-                    'merge_ticket_invisible': True,
-                    'merge_count': len(self.support_ticket_ids),
                 })
+                self.support_ticket_ids.ticket_id._merge_into(
+                    self.support_ticket_id)
 
     @api.onchange('support_ticket_id')
     def _onchange_support_ticket_id(self):
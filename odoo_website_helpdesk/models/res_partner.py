@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Dhanya Babu (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+from odoo import api, fields, models
+
+
+class ResPartner(models.Model):
+    """Helpdesk ticket counter on the customer, for the portal home page"""
+    _inherit = 'res.partner'
+
+    helpdesk_ticket_count = fields.Integer(string='Helpdesk Tickets',
+                                           readonly=True, copy=False,
+                                           help='Active helpdesk tickets of '
+                                                'this customer, maintained '
+                                                'on ticket changes.')
+
+    @api.model
+    def _bump_helpdesk_ticket_count(self, deltas):
+        """Apply {partner_id: delta} to the ticket counters in one statement"""
+        deltas = {pid: delta for pid, delta in deltas.items()
+                  if pid and delta}
+        if not deltas:
+            return
+        self.flush_model(['helpdesk_ticket_count'])
+        self.env.cr.execute("""
+            UPDATE res_partner p
+               SET helpdesk_ticket_count =
+                   GREATEST(COALESCE(p.helpdesk_ticket_count, 0) + d.delta, 0)
+              FROM unnest(%s::int[], %s::int[]) AS d(partner_id, delta)
+             WHERE p.id = d.partner_id
+        """, (list(deltas), list(deltas.values())))
+        self.browse(list(deltas)).invalidate_recordset(
+            ['helpdesk_ticket_count'])
+
+    @api.model
+    def action_recompute_helpdesk_ticket_count(self):
+        """Recount every customer's tickets, e.g. right after install"""
+        self.env['ticket.helpdesk'].flush_model(['customer_id', 'active'])
+        self.env.cr.execute("""
+            UPDATE res_partner p
+               SET helpdesk_ticket_count = COALESCE(c.total, 0)
+              FROM res_partner p2
+              LEFT JOIN (
+                    SELECT customer_id, COUNT(*) AS total
+                    FROM ticket_helpdesk
+                    WHERE active
+                    GROUP BY customer_id
+              ) c ON c.customer_id = p2.id
+             WHERE p.id = p2.id
+               AND COALESCE(p.helpdesk_ticket_count, 0) <> COALESCE(c.total, 0)
+        """)
+        self.invalidate_model(['helpdesk_ticket_count'])
+        return True
@@ -38,3 +38,6 @@ class SupportTicket(models.Model):
                                         help='Support tickets')
     merged_ticket = fields.Integer(string='Merged Ticket ID',
                                    help='Storing merged ticket id')
+    ticket_id = fields.Many2one('ticket.helpdesk', string='Ticket',
+                                ondelete='cascade',
+                                help='Ticket being merged')
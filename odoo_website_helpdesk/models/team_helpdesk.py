@@ -44,6 +44,12 @@ class TeamHelpDesk(models.Model):
                                  help='Projects related helpdesk team.')
     create_task = fields.Boolean(string="Create Task",
                                  help="Task created or not")
+    assignment_method = fields.Selection(
+        [('manual', 'Manual'),
+         ('round_robin', 'Round Robin'),
+         ('least_loaded', 'Least Loaded')],
+        string='Assignment', default='manual', required=True,
+        help='How new tickets are spread over the team members.')
 
     @api.onchange('team_lead_id')
     def _onchange_team_lead_id(self):
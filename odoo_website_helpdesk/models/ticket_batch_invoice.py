@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Dhanya Babu (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+
+class TicketBatchInvoice(models.TransientModel):
+    """Invoice many tickets at once, one invoice per customer"""
+    _name = 'ticket.batch.invoice'
+    _description = 'Helpdesk Batch Invoicing'
+
+    ticket_ids = fields.Many2many('ticket.helpdesk', string='Tickets',
+                                  help='Tickets to invoice. Leave empty to '
+                                       'invoice every ticket of the period.')
+    date_from = fields.Date(string='From', help='Tickets created from')
+    date_to = fields.Date(string='To', help='Tickets created until')
+    team_ids = fields.Many2many('team.helpdesk', string='Teams',
+                                help='Limit the period to these teams')
+
+    @api.model
+    def default_get(self, fields_list):
+        """Preselect the tickets the wizard was opened from"""
+        defaults = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'ticket.helpdesk':
+            defaults['ticket_ids'] = [fields.Command.set(
+                self.env.context.get('active_ids', []))]
+        return defaults
+
+    def _get_tickets(self):
+        if self.ticket_ids:
+            return self.ticket_ids
+        if not self.date_from or not self.date_to:
+            raise UserError(_('Select tickets or a period to invoice.'))
+        # Tickets of the period that still have unbilled tasks
+        domain = [
+            ('ticket_billed', '=', False),
+            ('ticket_id.create_date', '>=', self.date_from),
+            ('ticket_id.create_date', '<',
+             fields.Date.add(self.date_to, days=1)),
+        ]
+        if self.team_ids:
+            domain.append(('ticket_id.team_id', 'in', self.team_ids.ids))
+        groups = self.env['project.task']._read_group(domain, ['ticket_id'])
+        return self.env['ticket.helpdesk'].browse(
+            [ticket.id for ticket, in groups])
+
+    def action_create_invoices(self):
+        """Create the invoices and open them"""
+        invoices = self._get_tickets()._create_batch_invoices()
+        if not invoices:
+            raise UserError(_('No Tasks to Bill'))
+        return {
+            'name': _('Invoices'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', invoices.ids)],
+        }
@@ -19,7 +19,11 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 ##############################################################################
+import heapq
+import itertools
 import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 from odoo.exceptions import ValidationError
@@ -33,6 +37,17 @@ PRIORITIES = [
     ('3', 'High'),
     ('4', 'Very High'),
 ]
+# Ticket fields that change the open-ticket counters of helpdesk.user.workload
+WORKLOAD_FIELDS = {'assigned_user_id', 'stage_id', 'active'}
+# Prefix of the cached ticket PDFs (see report_ticket's attachment)
+PDF_CACHE_PREFIX = 'Ticket-'
+# Ticket fields printed on report_ticket, a change makes the cached PDFs stale
+PDF_FIELDS = {'name', 'subject', 'description', 'priority', 'customer_id',
+              'product_ids'}
+# Tickets rendered per wkhtmltopdf run by the bulk export
+PDF_EXPORT_BATCH = 200
+# Fields that move a ticket in or out of its customer's portal counter
+CUSTOMER_COUNT_FIELDS = {'customer_id', 'active'}
 RATING = [
     ('0', 'Very Low'),
     ('1', 'Low'),
@@ -125,6 +140,7 @@ class TicketHelpDesk(models.Model):
                                    compute='_compute_team_head_id',
                                    help='Team Leader Name')
     assigned_user_id = fields.Many2one('res.users', string='Assigned User',
+                                       index=True,
                                        domain=lambda self: [('groups_id', 'in',
                                                              self.env.ref(
                                                                  'odoo_website_helpdesk.helpdesk_user').id)],
@@ -135,6 +151,10 @@ class TicketHelpDesk(models.Model):
     assign_user = fields.Boolean(default=False, help='Assign User',
                                  string='Assign User')
     attachment_ids = fields.One2many('ir.attachment', 'res_id',
+                                     domain=[('res_model', '=',
+                                              'ticket.helpdesk'),
+                                             ('name', 'not like',
+                                              PDF_CACHE_PREFIX + '%.pdf')],
                                      help='Attachment Line',
                                      string='Attachments')
     merge_ticket_invisible = fields.Boolean(string='Merge Ticket',
@@ -142,6 +162,14 @@ class TicketHelpDesk(models.Model):
                                                  'Not', default=False)
     merge_count = fields.Integer(string='Merge Count', help='Merged Tickets '
                                                             'Count')
+    merged_into_id = fields.Many2one('ticket.helpdesk', string='Merged Into',
+                                     readonly=True, copy=False,
+                                     index='btree_not_null',
+                                     help='Ticket this one was merged into')
+    merged_ticket_ids = fields.One2many('ticket.helpdesk', 'merged_into_id',
+                                        string='Merged Tickets',
+                                        context={'active_test': False},
+                                        help='Tickets merged into this one')
     active = fields.Boolean(default=True, help='Active', string='Active')
 
     show_create_task = fields.Boolean(string="Show Create Task",
@@ -163,6 +191,50 @@ class TicketHelpDesk(models.Model):
         ('normal', 'Ready'),
         ('done', 'In Progress'),
         ('blocked', 'Blocked'), ], default='normal')
+    sla_policy_id = fields.Many2one('helpdesk.sla.policy', string='SLA Policy',
+                                    compute='_compute_sla_policy_id',
+                                    store=True, help='SLA policy matching the '
+                                                     'team, type and priority')
+    sla_start_deadline = fields.Datetime(string='Start Deadline',
+                                         compute='_compute_sla_deadlines',
+                                         store=True, index=True,
+                                         help='Ticket must be started before '
+                                              'this date.')
+    sla_close_deadline = fields.Datetime(string='Close Deadline',
+                                         compute='_compute_sla_deadlines',
+                                         store=True, index=True,
+                                         help='Ticket must be closed before '
+                                              'this date.')
+    sla_start_breached = fields.Boolean(string='Start SLA Breached',
+                                        readonly=True, copy=False,
+                                        help='Start deadline was missed.')
+    sla_close_breached = fields.Boolean(string='Close SLA Breached',
+                                        readonly=True, copy=False,
+                                        help='Close deadline was missed.')
+    sla_next_deadline = fields.Datetime(string='Next SLA Deadline',
+                                        compute='_compute_sla_next_deadline',
+                                        store=True, index='btree_not_null',
+                                        help='Earliest deadline still '
+                                             'pending, used by the breach '
+                                             'cron.')
+
+    def init(self):
+        # Portal listing: one customer's tickets, newest first
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS ticket_helpdesk_customer_create_date_idx
+            ON ticket_helpdesk (customer_id, create_date DESC)
+        """)
+        # Duplicate detection joins tickets on phone within a time window
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS ticket_helpdesk_phone_create_date_idx
+            ON ticket_helpdesk (phone, create_date)
+            WHERE phone IS NOT NULL
+        """)
+        # Duplicate detection scans the tickets created since its last run
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS ticket_helpdesk_create_date_idx
+            ON ticket_helpdesk (create_date)
+        """)
 
     @api.onchange('team_id', 'team_head_id')
     def _onchange_team_id(self):
@@ -175,19 +247,60 @@ class TicketHelpDesk(models.Model):
         """Compute the team head function"""
         self.team_head_id = self.team_id.team_lead_id.id
 
-    @api.onchange('stage_id')
-    def _onchange_stage_id(self):
-        """Sending mail to the user function"""
-        rec_id = self._origin.id
-        data = self.env['ticket.helpdesk'].search([('id', '=', rec_id)])
-        data.last_update_date = fields.Datetime.now()
-        if self.stage_id.starting_stage:
-            data.start_date = fields.Datetime.now()
-        if self.stage_id.closing_stage or self.stage_id.cancel_stage:
-            data.end_date = fields.Datetime.now()
-        if self.stage_id.template_id:
-            mail_template = self.stage_id.template_id
-            mail_template.send_mail(self._origin.id, force_send=True)
+    @api.depends('team_id', 'ticket_type_id', 'priority')
+    def _compute_sla_policy_id(self):
+        """Match the SLA policy, loading the policies once per batch"""
+        policies = self.env['helpdesk.sla.policy']._get_sorted_policies()
+        for rec in self:
+            rec.sla_policy_id = policies._match_ticket(rec)
+
+    @api.depends('sla_policy_id', 'sla_policy_id.start_hours',
+                 'sla_policy_id.close_hours', 'create_date')
+    def _compute_sla_deadlines(self):
+        """Deadlines counted from the ticket creation"""
+        for rec in self:
+            policy = rec.sla_policy_id
+            created = rec.create_date or fields.Datetime.now()
+            rec.sla_start_deadline = created + timedelta(
+                hours=policy.start_hours) if policy.start_hours else False
+            rec.sla_close_deadline = created + timedelta(
+                hours=policy.close_hours) if policy.close_hours else False
+
+    @api.depends('sla_start_deadline', 'sla_close_deadline', 'start_date',
+                 'end_date', 'sla_start_breached', 'sla_close_breached')
+    def _compute_sla_next_deadline(self):
+        """Earliest deadline that is neither met nor already escalated"""
+        for rec in self:
+            pending = []
+            if rec.sla_start_deadline and not rec.start_date and \
+                    not rec.sla_start_breached:
+                pending.append(rec.sla_start_deadline)
+            if rec.sla_close_deadline and not rec.end_date and \
+                    not rec.sla_close_breached:
+                pending.append(rec.sla_close_deadline)
+            rec.sla_next_deadline = min(pending) if pending else False
+
+    @api.model
+    def cron_escalate_sla_breaches(self, batch_size=500):
+        """Flag tickets past their SLA deadline and queue escalation mails"""
+        now = fields.Datetime.now()
+        template = self.env.ref('odoo_website_helpdesk.ticket_sla_breach',
+                                raise_if_not_found=False)
+        while True:
+            tickets = self.search([('sla_next_deadline', '<=', now)],
+                                  order='sla_next_deadline', limit=batch_size)
+            start_breached = tickets.filtered(
+                lambda t: not t.start_date and not t.sla_start_breached and
+                t.sla_start_deadline and t.sla_start_deadline <= now)
+            close_breached = tickets.filtered(
+                lambda t: not t.end_date and not t.sla_close_breached and
+                t.sla_close_deadline and t.sla_close_deadline <= now)
+            if not start_breached and not close_breached:
+                break
+            start_breached.write({'sla_start_breached': True})
+            close_breached.write({'sla_close_breached': True})
+            if template:
+                template.send_mail_batch((start_breached | close_breached).ids)
 
     def assign_to_teamleader(self):
         """Assigning team leader function"""
@@ -195,14 +308,80 @@ class TicketHelpDesk(models.Model):
             self.team_head_id = self.team_id.team_lead_id.id
             mail_template = self.env.ref(
                 'odoo_website_helpdesk.odoo_website_helpdesk_assign')
-            mail_template.sudo().write({
+            # Per-mail values: the shared template itself stays untouched
+            mail_template.sudo().send_mail(self.id, email_values={
                 'email_to': self.team_head_id.email,
                 'subject': self.name
             })
-            mail_template.sudo().send_mail(self.id, force_send=True)
         else:
             raise ValidationError("Please choose a Helpdesk Team")
 
+    def action_auto_assign(self):
+        """Assign the selected unassigned tickets across their team members"""
+        self._auto_assign(force=True)
+        return True
+
+    def _auto_assign(self, force=False):
+        """Spread unassigned tickets over team members in bulk, round robin
+        or least loaded as set on the team. Teams in manual mode are only
+        handled when force is set, using least loaded."""
+        Workload = self.env['helpdesk.user.workload'].sudo()
+        tickets = self.filtered(
+            lambda t: not t.assigned_user_id and t.team_id.member_ids)
+        assignment = defaultdict(list)
+        added = defaultdict(int)
+        for team, team_tickets in tickets.grouped('team_id').items():
+            method = team.assignment_method
+            if method == 'manual':
+                if not force:
+                    continue
+                method = 'least_loaded'
+            loads = Workload._get_loads(team.member_ids.ids)
+            members = team.member_ids.sorted(
+                lambda u: (loads.get(u.id, (0, False))[1] or datetime.min,
+                           u.id))
+            if method == 'round_robin':
+                for ticket, user in zip(team_tickets,
+                                        itertools.cycle(members)):
+                    assignment[user].append(ticket.id)
+                    added[user.id] += 1
+                continue
+            heap = [(loads.get(user.id, (0, False))[0] + added[user.id],
+                     rank, user.id) for rank, user in enumerate(members)]
+            heapq.heapify(heap)
+            for ticket in team_tickets:
+                count, rank, user_id = heapq.heappop(heap)
+                assignment[members[rank]].append(ticket.id)
+                added[user_id] += 1
+                heapq.heappush(heap, (count + 1, rank, user_id))
+        if not assignment:
+            return
+        for user, ticket_ids in assignment.items():
+            self.browse(ticket_ids).with_context(
+                skip_workload_refresh=True).write(
+                {'assigned_user_id': user.id})
+        Workload._refresh_users([user.id for user in assignment],
+                                assigned_now=fields.Datetime.now())
+        self._notify_assignment(assignment)
+
+    def _notify_assignment(self, assignment):
+        """Queue one digest mail per assignee listing their new tickets"""
+        mails = []
+        for user, ticket_ids in assignment.items():
+            if not user.email:
+                continue
+            tickets = self.browse(ticket_ids)
+            mails.append({
+                'subject': _('%s ticket(s) assigned to you', len(tickets)),
+                'email_to': user.email_formatted,
+                'body_html': self.env['ir.qweb']._render(
+                    'odoo_website_helpdesk.ticket_assignment_digest',
+                    {'user': user, 'tickets': tickets}),
+                'auto_delete': True,
+            })
+        if mails:
+            self.env['mail.mail'].sudo().create(mails)
+
     def _compute_show_category(self):
         """Compute show category"""
         show_category = self._default_show_category()
@@ -251,45 +430,253 @@ class TicketHelpDesk(models.Model):
             if vals.get('name', _('New')) == _('New'):
                 vals['name'] = self.env['ir.sequence'].next_by_code(
                     'ticket.helpdesk')
-        return super(TicketHelpDesk, self).create(vals_list)
+        records = super(TicketHelpDesk, self).create(vals_list)
+        self.env['res.partner'].sudo()._bump_helpdesk_ticket_count(
+            records._count_by_customer())
+        self.env['helpdesk.user.workload'].sudo()._refresh_users(
+            records.assigned_user_id.ids)
+        records._auto_assign()
+        return records
 
     def write(self, vals):
-        """Write function"""
+        """Write function. Stage changes stamp the ticket dates and queue the
+        stage template in the mail queue instead of sending it inline."""
+        stage = moved = None
+        if vals.get('stage_id'):
+            stage = self.env['ticket.stage'].browse(vals['stage_id'])
+            moved = self.filtered(lambda t: t.stage_id != stage)
+            now = fields.Datetime.now()
+            vals = dict(vals, last_update_date=now)
+            if stage.starting_stage:
+                vals.setdefault('start_date', now)
+            if stage.closing_stage or stage.cancel_stage:
+                vals.setdefault('end_date', now)
+        refresh_workload = WORKLOAD_FIELDS & set(vals) and \
+            not self.env.context.get('skip_workload_refresh')
+        users_before = self.assigned_user_id.ids if refresh_workload else []
+        counts_before = self._count_by_customer() \
+            if CUSTOMER_COUNT_FIELDS & set(vals) else None
         result = super(TicketHelpDesk, self).write(vals)
+        # Cached PDFs are keyed on what they print, older versions are dead
+        # weight. Other writes leave theirs to the next export
+        # (_get_pdf_streams).
+        if PDF_FIELDS & set(vals):
+            self._purge_pdf_cache()
+        if counts_before is not None:
+            deltas = self._count_by_customer()
+            deltas.subtract(counts_before)
+            self.env['res.partner'].sudo()._bump_helpdesk_ticket_count(deltas)
+        if refresh_workload:
+            self.env['helpdesk.user.workload'].sudo()._refresh_users(
+                users_before + self.assigned_user_id.ids)
+        if stage and stage.template_id and moved:
+            stage.template_id.send_mail_batch(moved.ids)
         return result
 
+    def _get_pdf_cache_names(self):
+        """Attachment name of the current PDF of each ticket, {id: name}.
+
+        The version hashes everything report_ticket prints: the ticket, its
+        customer and products, and its tasks with their analytic account,
+        assignees and timesheet lines. Counts and hours are part of the
+        hash so that deletions are seen too. One query for all tickets.
+        """
+        if not self.ids:
+            return {}
+        Task = self.env['project.task']
+        for model in ('ticket.helpdesk', 'res.partner', 'product.template',
+                      'project.task', 'account.analytic.account',
+                      'account.analytic.line', 'res.users'):
+            self.env[model].flush_model()
+        products = self._fields['product_ids']
+        assignees = Task._fields['user_ids']
+        self.env.cr.execute("""
+            WITH tasks AS (
+                SELECT pt.ticket_id, COUNT(*) AS n,
+                       MAX(pt.write_date) AS task_date,
+                       MAX(aa.write_date) AS account_date
+                FROM project_task pt
+                LEFT JOIN account_analytic_account aa
+                       ON aa.id = pt.analytic_account_id
+                WHERE pt.ticket_id = ANY(%(ids)s)
+                GROUP BY pt.ticket_id
+            ), timesheets AS (
+                SELECT pt.ticket_id, COUNT(*) AS n,
+                       MAX(l.write_date) AS line_date,
+                       SUM(l.unit_amount) AS hours
+                FROM account_analytic_line l
+                JOIN project_task pt ON pt.id = l.task_id
+                WHERE pt.ticket_id = ANY(%(ids)s)
+                GROUP BY pt.ticket_id
+            ), users AS (
+                SELECT pt.ticket_id, COUNT(*) AS n,
+                       MAX(up.write_date) AS user_date
+                FROM project_task pt
+                JOIN {assignee_rel} r ON r.{assignee_task} = pt.id
+                JOIN res_users u ON u.id = r.{assignee_user}
+                JOIN res_partner up ON up.id = u.partner_id
+                WHERE pt.ticket_id = ANY(%(ids)s)
+                GROUP BY pt.ticket_id
+            ), products AS (
+                SELECT r.{product_ticket} AS ticket_id, COUNT(*) AS n,
+                       MAX(tmpl.write_date) AS product_date
+                FROM {product_rel} r
+                JOIN product_template tmpl ON tmpl.id = r.{product_tmpl}
+                WHERE r.{product_ticket} = ANY(%(ids)s)
+                GROUP BY r.{product_ticket}
+            )
+            SELECT t.id, md5(concat_ws('|', t.write_date, p.write_date,
+                   tk.n, tk.task_date, tk.account_date,
+                   ts.n, ts.line_date, ts.hours,
+                   us.n, us.user_date, pr.n, pr.product_date))
+            FROM ticket_helpdesk t
+            LEFT JOIN res_partner p ON p.id = t.customer_id
+            LEFT JOIN tasks tk ON tk.ticket_id = t.id
+            LEFT JOIN timesheets ts ON ts.ticket_id = t.id
+            LEFT JOIN users us ON us.ticket_id = t.id
+            LEFT JOIN products pr ON pr.ticket_id = t.id
+            WHERE t.id = ANY(%(ids)s)
+        """.format(assignee_rel=assignees.relation,
+                   assignee_task=assignees.column1,
+                   assignee_user=assignees.column2,
+                   product_rel=products.relation,
+                   product_ticket=products.column1,
+                   product_tmpl=products.column2), {'ids': self.ids})
+        versions = dict(self.env.cr.fetchall())
+        return {ticket.id: '%s%s-%s.pdf' % (PDF_CACHE_PREFIX, ticket.name,
+                                            versions[ticket.id][:16])
+                for ticket in self}
+
+    def _get_pdf_cache_name(self):
+        """Attachment name of this version of the ticket PDF"""
+        self.ensure_one()
+        return self._get_pdf_cache_names()[self.id]
+
+    def _purge_pdf_cache(self):
+        """Drop the cached PDFs of these tickets that are out of date"""
+        if not self.ids:
+            return
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('name', '=like', PDF_CACHE_PREFIX + '%.pdf'),
+        ])
+        if attachments:
+            current = set(self._get_pdf_cache_names().values())
+            attachments.filtered(lambda a: a.name not in current).unlink()
+
+    def _get_pdf_streams(self):
+        """Cached PDF of each ticket as {ticket: bytes}.
+
+        Tickets without an up to date cache are rendered together, one
+        wkhtmltopdf run per PDF_EXPORT_BATCH tickets, which also stores
+        them as attachments.
+        """
+        self._purge_pdf_cache()
+        report = self.env.ref('odoo_website_helpdesk.report_ticket').sudo()
+        for start in range(0, len(self.ids), PDF_EXPORT_BATCH):
+            report._render_qweb_pdf(
+                report, res_ids=self.ids[start:start + PDF_EXPORT_BATCH])
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('name', 'in', list(self._get_pdf_cache_names().values())),
+        ])
+        by_ticket = {att.res_id: att.raw for att in attachments}
+        return {ticket: by_ticket.get(ticket.id) for ticket in self}
+
+    def action_export_pdf(self):
+        """Download the selected tickets as a ZIP of PDFs"""
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/helpdesk/tickets/export?ids=%s&format=zip' % ','.join(
+                map(str, self.ids)),
+            'target': 'self',
+        }
+
+    def _count_by_customer(self):
+        """Active tickets per customer id, for the portal counters"""
+        return Counter(ticket.customer_id.id
+                       for ticket in self.with_context(active_test=False)
+                       if ticket.active and ticket.customer_id)
+
+    def unlink(self):
+        """Unlink function"""
+        users = self.assigned_user_id.ids
+        deltas = Counter({partner_id: -count for partner_id, count
+                          in self._count_by_customer().items()})
+        result = super(TicketHelpDesk, self).unlink()
+        self.env['res.partner'].sudo()._bump_helpdesk_ticket_count(deltas)
+        self.env['helpdesk.user.workload'].sudo()._refresh_users(users)
+        return result
+
+    def _get_unbilled_hours(self):
+        """Unbilled task hours of these tickets in one grouped query.
+
+        Only tasks of the ticket's project count, as in single invoicing.
+        :return: {ticket: (hours, tasks)}
+        """
+        self.env['project.task'].flush_model(
+            ['ticket_id', 'project_id', 'ticket_billed', 'effective_hours'])
+        groups = self.env['project.task'].sudo()._read_group(
+            [('ticket_id', 'in', self.ids), ('ticket_billed', '=', False)],
+            ['ticket_id', 'project_id'],
+            ['effective_hours:sum', 'id:recordset'])
+        result = {}
+        for ticket, project, hours, tasks in groups:
+            if project == ticket.project_id:
+                result[ticket] = (hours, tasks)
+        return result
+
+    def _create_batch_invoices(self):
+        """Invoice the unbilled task hours of these tickets.
+
+        One invoice per customer with one line per ticket; the billed tasks
+        are flagged with a single write.
+        :return: the created invoices
+        """
+        unbilled = self._get_unbilled_hours()
+        by_customer = defaultdict(list)
+        for ticket, (hours, tasks) in unbilled.items():
+            if ticket.customer_id and ticket.service_product_id:
+                by_customer[ticket.customer_id].append(ticket)
+        if not by_customer:
+            return self.env['account.move']
+        today = fields.Date.today()
+        vals_list = []
+        for customer, tickets in by_customer.items():
+            vals_list.append({
+                'name': self.env['ir.sequence'].next_by_code('ticket.invoice'),
+                'move_type': 'out_invoice',
+                'partner_id': customer.id,
+                'ticket_id': tickets[0].id if len(tickets) == 1 else False,
+                'date': today,
+                'invoice_date': today,
+                'invoice_line_ids': [fields.Command.create({
+                    'product_id': ticket.service_product_id.id,
+                    'name': '%s - %s' % (ticket.name,
+                                         ticket.service_product_id.name),
+                    'quantity': unbilled[ticket][0],
+                    'product_uom_id': ticket.service_product_id.uom_id.id,
+                    'price_unit': ticket.cost,
+                    'account_id': ticket.service_product_id.categ_id.property_account_income_categ_id.id,
+                    'helpdesk_ticket_id': ticket.id,
+                }) for ticket in tickets],
+            })
+        invoices = self.env['account.move'].create(vals_list)
+        billed = self.env['project.task']
+        for invoice, tickets in zip(invoices, by_customer.values()):
+            ticket_ids = self.browse([ticket.id for ticket in tickets])
+            ticket_ids.write({'invoice_ids': [fields.Command.link(invoice.id)]})
+            for ticket in tickets:
+                billed |= unbilled[ticket][1]
+        billed.write({'ticket_billed': True})
+        return invoices
+
     def action_create_invoice(self):
         """Create Invoice based on the ticket"""
-        tasks = self.env['project.task'].search(
-            [('project_id', '=', self.project_id.id),
-             ('ticket_id', '=', self.id)]).filtered(
-            lambda line: not line.ticket_billed)
-        if not tasks:
+        if not self._create_batch_invoices():
             raise UserError('No Tasks to Bill')
-        total = sum(x.effective_hours for x in tasks if
-                     x.effective_hours > 0 and not x.some_flag)
-        invoice_no = self.env['ir.sequence'].next_by_code(
-            'ticket.invoice')
-        self.env['account.move'].create([
-            {
-                'name': invoice_no,
-                'move_type': 'out_invoice',
-                'partner_id': self.customer_id.id,
-                'ticket_id': self.id,
-                'date': fields.Date.today(),
-                'invoice_date': fields.Date.today(),
-                'invoice_line_ids': [(0, 0,
-                                      {
-                                          'product_id': self.service_product_id.id,
-                                          'name': self.service_product_id.name,
-                                          'quantity': total,
-                                          'product_uom_id': self.service_product_id.uom_id.id,
-                                          'price_unit': self.cost,
-                                          'account_id': self.service_product_id.categ_id.property_account_income_categ_id.id,
-                                      })],
-            }, ])
-        for task in tasks:
-            task.ticket_billed = True
         return {
             'effect': {
                 'fadeout': 'medium',
@@ -334,7 +721,8 @@ class TicketHelpDesk(models.Model):
         """View the Created invoice"""
         return {
             'name': 'Invoice',
-            'domain': [('ticket_id', '=', self.id)],
+            'domain': ['|', ('ticket_id', '=', self.id),
+                       ('invoice_line_ids.helpdesk_ticket_id', '=', self.id)],
             'res_model': 'account.move',
             'view_id': False,
             'view_mode': 'tree,form',
@@ -343,20 +731,51 @@ class TicketHelpDesk(models.Model):
 
     def action_open_merged_tickets(self):
         """Open the merged tickets tree view"""
-        ticket_ids = self.env['support.ticket'].search(
-            [('merged_ticket', '=', self.id)])
-        helpdesk_ticket_ids = ticket_ids.mapped('display_name')
-        help_ticket_records = self.env['ticket.helpdesk'].search(
-            [('name', 'in', helpdesk_ticket_ids)])
         return {
             'type': 'ir.actions.act_window',
             'name': 'Helpdesk Ticket',
             'view_mode': 'tree,form',
             'res_model': 'ticket.helpdesk',
-            'domain': [('id', 'in', help_ticket_records.ids)],
-            'context': self.env.context,
+            'domain': [('merged_into_id', '=', self.id)],
+            'context': dict(self.env.context, active_test=False),
         }
 
+    def _merge_into(self, target):
+        """Merge these tickets into target.
+
+        Messages, attachments and tasks are moved to the target in bulk and
+        the merged tickets are archived with a link to it.
+        """
+        sources = self - target
+        if not sources:
+            return
+        target.ensure_one()
+        self.env['mail.message'].flush_model(['model', 'res_id'])
+        self.env['ir.attachment'].flush_model(['res_model', 'res_id'])
+        self.env.cr.execute("""
+            UPDATE mail_message SET res_id = %s
+            WHERE model = %s AND res_id = ANY(%s)
+        """, (target.id, self._name, sources.ids))
+        # Cached PDFs belong to the old tickets and are left to go with them
+        self.env.cr.execute("""
+            UPDATE ir_attachment SET res_id = %s
+            WHERE res_model = %s AND res_id = ANY(%s)
+              AND name NOT LIKE %s
+        """, (target.id, self._name, sources.ids, PDF_CACHE_PREFIX + '%'))
+        self.env['mail.message'].invalidate_model(['res_id'])
+        self.env['ir.attachment'].invalidate_model(['res_id'])
+        tasks = self.env['project.task'].search(
+            [('ticket_id', 'in', sources.ids)]) | sources.task_ids
+        tasks.write({'ticket_id': target.id})
+        target.write({
+            'task_ids': [fields.Command.link(task.id) for task in tasks],
+            'merge_ticket_invisible': True,
+            'merge_count': target.merge_count + len(sources),
+        })
+        sources.write({'merged_into_id': target.id, 'active': False})
+        target.message_post(body=_('Merged tickets: %s',
+                                   ', '.join(sources.mapped('name'))))
+
     def action_send_reply(self):
         """Action to sent reply button"""
         template_id = self.env['ir.config_parameter'].sudo().get_param(
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Dhanya Babu (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+import logging
+import re
+from markupsafe import Markup, escape
+from odoo import api, models, tools
+from odoo.tools import escape_psql, sql
+
+_logger = logging.getLogger(__name__)
+
+# Hard cap on ranked hits; the portal pages through these only
+SEARCH_RESULT_CAP = 200
+SEARCH_PAGE_SIZE = 20
+# ts_headline markers, swapped for <mark> once the text has been escaped
+_HL_START, _HL_STOP = '\x02', '\x03'
+
+
+class TicketHelpdeskSearch(models.Model):
+    """Full-text search over tickets for the website portal.
+
+    ``search_vector`` is a plain tsvector column kept up to date by a
+    database trigger, so it costs nothing on the ORM side and is covered
+    by a GIN index. Ticket numbers are additionally indexed with pg_trgm
+    when the extension can be installed, for partial number lookups.
+    """
+    _inherit = 'ticket.helpdesk'
+
+    def init(self):
+        super().init()
+        cr = self.env.cr
+        cr.execute("""
+            ALTER TABLE ticket_helpdesk
+            ADD COLUMN IF NOT EXISTS search_vector tsvector
+        """)
+        cr.execute("""
+            CREATE OR REPLACE FUNCTION ticket_helpdesk_search_vector()
+            RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.subject, '')), 'B') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.customer_name, '')), 'C') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'D');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        cr.execute("""
+            DROP TRIGGER IF EXISTS ticket_helpdesk_search_vector_trg
+            ON ticket_helpdesk
+        """)
+        cr.execute("""
+            CREATE TRIGGER ticket_helpdesk_search_vector_trg
+            BEFORE INSERT OR UPDATE OF name, subject, customer_name, description
+            ON ticket_helpdesk
+            FOR EACH ROW EXECUTE FUNCTION ticket_helpdesk_search_vector()
+        """)
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS ticket_helpdesk_search_vector_idx
+            ON ticket_helpdesk USING gin (search_vector)
+        """)
+        try:
+            with cr.savepoint():
+                cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cr.execute("""
+                    CREATE INDEX IF NOT EXISTS ticket_helpdesk_name_trgm_idx
+                    ON ticket_helpdesk USING gin (name gin_trgm_ops)
+                """)
+        except Exception:
+            _logger.info('pg_trgm is not available, ticket number search '
+                         'falls back to prefix matching')
+
+    @api.model
+    @tools.ormcache()
+    def _has_name_trgm_index(self):
+        """Whether init() could create the pg_trgm ticket number index.
+
+        Checked once per registry rather than on every search.
+        """
+        return sql.index_exists(self.env.cr, 'ticket_helpdesk_name_trgm_idx')
+
+    @api.model
+    def _portal_search_tsquery(self, search_value):
+        """Turn free text into a prefix-matching tsquery string.
+
+        Only word characters are kept, so user input can never produce a
+        tsquery syntax error.
+        """
+        terms = re.findall(r'\w+', (search_value or '').lower())
+        return ' & '.join('%s:*' % term for term in terms[:8])
+
+    @api.model
+    def _portal_search(self, partner_id, search_value, page=1,
+                       page_size=SEARCH_PAGE_SIZE):
+        """Ranked, paginated ticket search for one portal customer.
+
+        :return: dict with the page of ``tickets``, the matching subject
+            ``headlines`` (ticket id -> Markup), ``total`` hits (capped at
+            SEARCH_RESULT_CAP), ``page`` and ``page_count``
+        """
+        page = max(int(page or 1), 1)
+        tsquery = self._portal_search_tsquery(search_value)
+        result = {'tickets': self.browse(), 'headlines': {}, 'total': 0,
+                  'page': page, 'page_count': 0}
+        if not tsquery:
+            return result
+        self.flush_model(['name', 'subject', 'customer_name', 'description',
+                          'customer_id'])
+        cr = self.env.cr
+        match = "t.search_vector @@ q.query"
+        params = [tsquery]
+        if self._has_name_trgm_index():
+            match = "(%s OR t.name ILIKE %%s)" % match
+            params.append('%%%s%%' % escape_psql(search_value.strip()))
+        params += [partner_id, SEARCH_RESULT_CAP]
+        cr.execute("""
+            SELECT t.id
+            FROM ticket_helpdesk t, to_tsquery('simple', %%s) AS q(query)
+            WHERE %s AND t.customer_id = %%s
+            ORDER BY ts_rank_cd(t.search_vector, q.query) DESC,
+                     t.create_date DESC
+            LIMIT %%s
+        """ % match, params)
+        ids = [row[0] for row in cr.fetchall()]
+        result['total'] = len(ids)
+        result['page_count'] = -(-len(ids) // page_size)
+        page_ids = ids[(page - 1) * page_size:page * page_size]
+        if not page_ids:
+            return result
+        # Headlines are costly, so only build them for the rows shown
+        cr.execute("""
+            SELECT t.id,
+                   ts_headline('simple', coalesce(t.subject, ''), q.query,
+                               'StartSel=' || %s || ',StopSel=' || %s ||
+                               ',HighlightAll=true')
+            FROM ticket_helpdesk t, to_tsquery('simple', %s) AS q(query)
+            WHERE t.id = ANY(%s)
+        """, (_HL_START, _HL_STOP, tsquery, page_ids))
+        result['headlines'] = {
+            ticket_id: Markup(str(escape(text)).replace(
+                _HL_START, '<mark>').replace(_HL_STOP, '</mark>'))
+            for ticket_id, text in cr.fetchall()
+        }
+        result['tickets'] = self.browse(page_ids)
+        return result
@@ -50,6 +50,13 @@ class TicketStage(models.Model):
     group_ids = fields.Many2many('res.groups', help='Group', string='Groups')
     fold = fields.Boolean(string='Fold', help='Folded option in ticket.')
 
+    def write(self, vals):
+        """Open-ticket counters depend on the closing/cancel flags"""
+        result = super().write(vals)
+        if 'closing_stage' in vals or 'cancel_stage' in vals:
+            self.env['helpdesk.user.workload'].sudo().action_recompute_all()
+        return result
+
     def unlink(self):
         """Unlinking Function to unlink the stage"""
         for rec in self:
@@ -26,4 +26,32 @@ publicWidget.registry.TT = publicWidget.Widget.extend({
                 $('.search_ticket').html(result);
             });
     }
+});
+//        Paging search results and loading more tickets of a group
+publicWidget.registry.TicketSearchPager = publicWidget.Widget.extend({
+    selector: '.search_ticket',
+    events: {
+        'click .o_ticket_search_page': '_onPage',
+        'click .o_ticket_group_more': '_onLoadMore',
+    },
+    _onPage(ev) {
+        var self = this;
+        var $pager = $(ev.currentTarget).closest('.o_ticket_search_pager');
+        jsonrpc('/ticketsearch', {
+            'search_value': $pager.attr('data-search'),
+            'page': $(ev.currentTarget).data('page'),
+        }).then(function(result) {
+            self.$el.html(result);
+        });
+    },
+//        Lazily loading the next tickets of a group
+    _onLoadMore(ev) {
+        var $button = $(ev.currentTarget);
+        jsonrpc('/ticketgroupby/more', {
+            'group_domain': $button.attr('data-domain'),
+            'offset': $button.data('offset'),
+        }).then(function(result) {
+            $button.closest('tr').replaceWith(result);
+        });
+    }
 })